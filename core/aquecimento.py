@@ -0,0 +1,77 @@
+"""Aquecimento de um processo novo: as cargas iniciais rodam juntas, em segundo plano.
+
+Num processo recém-iniciado, a primeira visita pagaria em sequência o
+download da planilha, o processamento dos limites, a indexação e publicação
+das imagens e as miniaturas da galeria. O Aquecimento dispara essas tarefas
+ao mesmo tempo numa pool de threads e registra a duração (ou o erro) de cada
+uma. Ele não guarda resultados: cada tarefa só deixa pronto o cache do
+recurso, e quem pedir o recurso antes disso espera pela carga em andamento
+(as cargas têm travas próprias) em vez de repeti-la.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Aquecimento:
+    def __init__(self, tarefas: dict, ao_concluir=None, max_threads: int | None = None, relogio=time.perf_counter):
+        self.tarefas = dict(tarefas)
+        self._ao_concluir = ao_concluir
+        self._max_threads = max_threads or max(len(self.tarefas), 1)
+        self._relogio = relogio
+        self._resultados: dict[str, dict] = {}
+        self._trava = threading.Lock()
+        self._concluido = threading.Event()
+        self._inicio: float | None = None
+        self._fim: float | None = None
+
+    def iniciar(self) -> "Aquecimento":
+        """Dispara as tarefas e retorna na hora. Só a primeira chamada tem efeito."""
+        with self._trava:
+            if self._inicio is not None:
+                return self
+            self._inicio = self._relogio()
+        if not self.tarefas:
+            self._concluir()
+            return self
+        executor = ThreadPoolExecutor(max_workers=self._max_threads, thread_name_prefix="aquecimento")
+        for nome, tarefa in self.tarefas.items():
+            executor.submit(self._executar, nome, tarefa)
+        executor.shutdown(wait=False)
+        return self
+
+    def _executar(self, nome: str, tarefa) -> None:
+        inicio = self._relogio()
+        resultado = {"estado": "ok"}
+        try:
+            tarefa()
+        except Exception as e:
+            resultado = {"estado": "erro", "erro": f"{type(e).__name__}: {e}"}
+            print(f"Erro no aquecimento ({nome}): {e}")
+        resultado["ms"] = round((self._relogio() - inicio) * 1000, 2)
+        with self._trava:
+            self._resultados[nome] = resultado
+            terminou = len(self._resultados) == len(self.tarefas)
+        if terminou:
+            self._concluir()
+
+    def _concluir(self) -> None:
+        self._fim = self._relogio()
+        self._concluido.set()
+        if self._ao_concluir is not None:
+            self._ao_concluir(self.relatorio())
+
+    @property
+    def concluido(self) -> bool:
+        return self._concluido.is_set()
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        """Espera todas as tarefas terminarem. Retorna False se o timeout venceu antes."""
+        return self._concluido.wait(timeout)
+
+    def relatorio(self) -> dict:
+        """Estado e duração de cada tarefa; as que ainda rodam aparecem como "pendente"."""
+        with self._trava:
+            tarefas = {nome: dict(self._resultados.get(nome, {"estado": "pendente"})) for nome in self.tarefas}
+        total = round((self._fim - self._inicio) * 1000, 2) if self._fim is not None else None
+        return {"evento": "aquecimento", "ts": round(time.time(), 3), "total_ms": total, "tarefas": tarefas}
@@ -0,0 +1,173 @@
+"""Registro dos arquivos de imagem locais (ícones, logos e fotos).
+
+Na inicialização a árvore `images/` é indexada, cada arquivo recebe um hash do
+conteúdo e é publicado em `static/assets/` com o hash no nome
+(`logos/banner_pmc.<hash>.png`). O Streamlit serve essa pasta em
+`app/static/` quando `server.enableStaticServing` está ligado. Como o nome
+muda junto com o conteúdo, o navegador (ou um CDN na frente do app) pode
+guardar esses arquivos sem prazo. Vários processos do app podem publicar na
+mesma pasta ao mesmo tempo: cada cópia vai para um arquivo temporário próprio
+e a limpeza só apaga o que o manifesto da publicação anterior registra. As páginas pedem os arquivos pela chave,
+ou seja, pelo caminho relativo a `images/` (ex.: "icones/leaf_green.png").
+"""
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from core.caminhos import DIRETORIO_IMAGENS, RAIZ_PROJETO
+
+DIRETORIO_STATIC = RAIZ_PROJETO / "static"
+PASTA_ASSETS = "assets"
+URL_STATIC = "app/static"
+NOME_MANIFESTO = "manifesto.json"
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico')
+
+
+@dataclass(frozen=True)
+class Asset:
+    chave: str
+    caminho: Path
+    hash: str
+    tipo_mime: str
+    tamanho: int
+
+    @property
+    def nome_publicado(self) -> str:
+        base, extensao = os.path.splitext(self.chave)
+        return f"{base}.{self.hash}{extensao}"
+
+
+def hash_conteudo(caminho: Path) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloco)
+    return h.hexdigest()[:12]
+
+
+def _copiar_atomicamente(origem: Path, alvo: Path) -> None:
+    alvo.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=alvo.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, open(origem, "rb") as o:
+            shutil.copyfileobj(o, f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, alvo)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class RegistroAssets:
+    def __init__(self, raiz: Path = DIRETORIO_IMAGENS, destino: Path = DIRETORIO_STATIC / PASTA_ASSETS,
+                 url_base: str = f"{URL_STATIC}/{PASTA_ASSETS}", publicar: bool = True):
+        self.raiz = Path(raiz)
+        self.destino = Path(destino)
+        self.url_base = url_base.rstrip("/")
+        self._assets: dict[str, Asset] = {}
+        self._data_uris: dict[str, str] = {}
+        self._trava = threading.Lock()
+        self.publicado = False
+        self.indexar()
+        if publicar:
+            try:
+                self.publicar()
+            except OSError as e:
+                # Sem escrita na pasta static as imagens seguem embutidas como data URI.
+                print(f"Aviso: não foi possível publicar os assets em {self.destino}: {e}")
+
+    def indexar(self) -> None:
+        assets = {}
+        for caminho in sorted(self.raiz.rglob("*")):
+            if not caminho.is_file() or caminho.suffix.lower() not in EXTENSOES_IMAGEM:
+                continue
+            chave = caminho.relative_to(self.raiz).as_posix()
+            tipo = mimetypes.guess_type(caminho.name)[0] or "application/octet-stream"
+            assets[chave] = Asset(chave, caminho, hash_conteudo(caminho), tipo, caminho.stat().st_size)
+        with self._trava:
+            self._assets = assets
+            self._data_uris.clear()
+
+    def publicar(self) -> None:
+        """Copia os arquivos para a pasta servida com o hash no nome e remove as versões da publicação anterior.
+
+        Só apaga o que o manifesto anterior registra; outros arquivos da pasta não são tocados.
+        """
+        publicados = sorted(asset.nome_publicado for asset in self._assets.values())
+        for asset in self._assets.values():
+            alvo = self.destino / asset.nome_publicado
+            if not alvo.exists():
+                _copiar_atomicamente(asset.caminho, alvo)
+        for antigo in set(self._ler_manifesto()) - set(publicados):
+            (self.destino / antigo).unlink(missing_ok=True)
+        self.destino.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.destino, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"arquivos": publicados}, f, ensure_ascii=False, indent=1)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.destino / NOME_MANIFESTO)
+        self.publicado = True
+
+    def _ler_manifesto(self) -> list[str]:
+        try:
+            with open(self.destino / NOME_MANIFESTO, encoding="utf-8") as f:
+                return json.load(f).get("arquivos", [])
+        except (OSError, ValueError):
+            return []
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self._assets
+
+    def __getitem__(self, chave: str) -> Asset:
+        try:
+            return self._assets[chave]
+        except KeyError:
+            raise KeyError(f"Asset não encontrado em {self.raiz}: {chave}") from None
+
+    def chaves(self, prefixo: str = "") -> list[str]:
+        return [chave for chave in self._assets if chave.startswith(prefixo)]
+
+    def url(self, chave: str) -> str:
+        """URL relativa servida pelo static serving do Streamlit."""
+        return f"{self.url_base}/{self[chave].nome_publicado}"
+
+    def src(self, chave: str, static_habilitado: bool = True) -> str:
+        """Valor para o atributo src de um <img>: a URL publicada ou, sem static serving, o data URI."""
+        return self.url(chave) if static_habilitado and self.publicado else self.data_uri(chave)
+
+    def bytes(self, chave: str) -> bytes:
+        return self[chave].caminho.read_bytes()
+
+    def data_uri(self, chave: str) -> str:
+        """Conteúdo embutido como data URI, para HTML que roda fora da página (ex.: o iframe do mapa)."""
+        with self._trava:
+            uri = self._data_uris.get(chave)
+        if uri is None:
+            asset = self[chave]
+            uri = f"data:{asset.tipo_mime};base64,{base64.b64encode(self.bytes(chave)).decode()}"
+            with self._trava:
+                self._data_uris[chave] = uri
+        return uri
+
+
+_registro: RegistroAssets | None = None
+_trava_registro = threading.Lock()
+
+
+def registro_padrao() -> RegistroAssets:
+    """Registro único do processo, indexado e publicado no primeiro uso."""
+    global _registro
+    if _registro is None:
+        with _trava_registro:
+            if _registro is None:
+                _registro = RegistroAssets()
+    return _registro
@@ -0,0 +1,85 @@
+"""Índice de busca das unidades, insensível a acentos e maiúsculas.
+
+O índice é montado uma vez por carga de dados: cada campo pesquisável é
+normalizado (sem acentos, minúsculo), quebrado em tokens e cada token aponta
+para as linhas onde aparece. A consulta aceita prefixos ("comun" acha
+"Comunitária") e vários termos, que precisam aparecer todos (E lógico).
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import pandas as pd
+
+# Peso de cada campo na ordenação dos resultados.
+CAMPOS_PADRAO = {"Nome": 3.0, "Tipo": 2.0, "Regional": 1.0}
+BONUS_TOKEN_EXATO = 1.5
+
+_RE_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def normalizar(texto) -> str:
+    """Remove acentos e caixa: "São José" -> "sao jose"."""
+    if texto is None or (isinstance(texto, float) and texto != texto):
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def tokenizar(texto) -> list[str]:
+    return _RE_TOKEN.findall(normalizar(texto))
+
+
+class IndiceBusca:
+    def __init__(self, df: pd.DataFrame, campos: dict[str, float] = CAMPOS_PADRAO):
+        self.ids = df.index.to_list()
+        postagens: dict[str, dict[int, float]] = {}
+        for campo, peso in campos.items():
+            if campo not in df.columns:
+                continue
+            for posicao, valor in enumerate(df[campo].tolist()):
+                for token in tokenizar(valor):
+                    linhas = postagens.setdefault(token, {})
+                    if linhas.get(posicao, 0.0) < peso:
+                        linhas[posicao] = peso
+        self._postagens = postagens
+        self._tokens = sorted(postagens)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _tokens_com_prefixo(self, termo: str) -> list[str]:
+        # Tokens só têm [0-9a-z], então termo + "{" é o primeiro valor depois de todos os que começam com termo.
+        return self._tokens[bisect_left(self._tokens, termo):bisect_left(self._tokens, termo + "{")]
+
+    def _pontuar_termo(self, termo: str, tokens: list[str], candidatas=None) -> dict[int, float]:
+        """Melhor pontuação de cada linha que tem algum token começando pelo termo."""
+        pontos: dict[int, float] = {}
+        for token in tokens:
+            bonus = BONUS_TOKEN_EXATO if token == termo else 1.0
+            linhas = self._postagens[token]
+            if candidatas is not None and len(candidatas) < len(linhas):
+                linhas = {posicao: linhas[posicao] for posicao in candidatas if posicao in linhas}
+            for posicao, peso in linhas.items():
+                pontuacao = peso * bonus
+                if pontos.get(posicao, 0.0) < pontuacao:
+                    pontos[posicao] = pontuacao
+        return pontos
+
+    def buscar(self, consulta: str, limite: int | None = None) -> list:
+        """Ids (índice do DataFrame) das linhas que casam com todos os termos, do mais ao menos relevante."""
+        termos = [(termo, self._tokens_com_prefixo(termo)) for termo in dict.fromkeys(tokenizar(consulta))]
+        if not termos:
+            return []
+        # Começa pelo termo mais seletivo; os demais só pontuam as linhas que ainda restam.
+        termos.sort(key=lambda item: sum(len(self._postagens[t]) for t in item[1]))
+        total = self._pontuar_termo(*termos[0])
+        for termo, tokens in termos[1:]:
+            if not total:
+                break
+            pontos = self._pontuar_termo(termo, tokens, candidatas=total)
+            total = {posicao: total[posicao] + pontos[posicao] for posicao in total.keys() & pontos.keys()}
+        ordenadas = sorted(total, key=lambda posicao: (-total[posicao], posicao))
+        if limite is not None:
+            ordenadas = ordenadas[:limite]
+        return [self.ids[posicao] for posicao in ordenadas]
@@ -0,0 +1,115 @@
+"""Cache dos mapas já montados, compartilhado entre sessões.
+
+A chave é a versão dos dados (hash_dataframe, calculado uma vez por versão)
+somada ao que filtra as unidades (termos da busca), à versão dos limites e ao
+modo de renderização, então duas sessões com a mesma busca reaproveitam o
+mesmo mapa. O cache é limitado e descarta o item usado há mais tempo (LRU).
+
+Cada entrada guarda só o que sai do mapa já renderizado: o HTML e o que o
+componente do st_folium recebe (core.mapa.argumentos_componente). Tudo é
+calculado uma vez, na construção; depois as sessões só leem a entrada, sem
+trava e sem renderizar de novo.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from core.payload import relatorio_payload
+
+CAPACIDADE_PADRAO = 32
+
+
+def hash_dataframe(df: pd.DataFrame) -> str:
+    """Hash estável do conteúdo (valores, índice e colunas) de um DataFrame."""
+    h = hashlib.sha256()
+    h.update("\x1f".join(map(str, df.columns)).encode())
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def chave_mapa(versao_df: str, *partes) -> str:
+    """Chave de um mapa: a versão dos dados e tudo o que muda o mapa montado a partir dela (busca, modo, limites)."""
+    return ":".join([str(versao_df)[:24], *map(str, partes)])
+
+
+@dataclass(frozen=True)
+class EntradaMapa:
+    """Mapa renderizado. Não guarda o objeto folium: renderizá-lo de novo altera a árvore, e as sessões só leem a entrada."""
+    _html: str = field(repr=False)
+    componente: dict | None = field(default=None, repr=False)
+    _relatorio: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def de_mapa(cls, mapa, derivar=None) -> "EntradaMapa":
+        """Renderiza o mapa uma vez. derivar(mapa) roda depois do HTML, porque pode alterar o mapa (ex.: o st_folium)."""
+        html = mapa.get_root().render()
+        return cls(html, derivar(mapa) if derivar is not None else None, relatorio_payload(html))
+
+    def html(self) -> str:
+        return self._html
+
+    def relatorio(self) -> dict:
+        """Tamanho do HTML do mapa (ver core.payload)."""
+        return self._relatorio
+
+
+class CacheMapa:
+    def __init__(self, capacidade: int = CAPACIDADE_PADRAO, ao_construir=None, derivar=None):
+        if capacidade < 1:
+            raise ValueError("capacidade deve ser ao menos 1")
+        self.capacidade = capacidade
+        self._ao_construir = ao_construir
+        self._derivar = derivar
+        self._itens: OrderedDict[str, EntradaMapa] = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obter(self, chave: str, construir) -> EntradaMapa:
+        """Retorna a entrada da chave, chamando construir() (que devolve o mapa) só quando ela não está no cache."""
+        with self._trava:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return entrada
+            self.falhas += 1
+
+        # A construção e a renderização ficam fora da trava para não bloquear as outras sessões.
+        nova = EntradaMapa.de_mapa(construir(), self._derivar)
+        with self._trava:
+            entrada = self._itens.setdefault(chave, nova)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+                self.descartes += 1
+        if entrada is nova and self._ao_construir is not None:
+            self._ao_construir(chave, entrada)
+        return entrada
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self._itens
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "capacidade": self.capacidade,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "descartes": self.descartes,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
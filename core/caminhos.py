@@ -0,0 +1,10 @@
+"""Caminhos locais usados pelo app (dados versionados no repositório e caches gerados)."""
+import os
+from pathlib import Path
+
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+DIRETORIO_DADOS = RAIZ_PROJETO / "data"
+DIRETORIO_IMAGENS = RAIZ_PROJETO / "images"
+DIRETORIO_CACHE = Path(os.environ.get("PLANTA_DIRETORIO_CACHE") or DIRETORIO_DADOS / "cache")  # caches gerados; a variável muda a pasta
+
+CAMINHO_GEOJSON_REGIONAIS = DIRETORIO_DADOS / "regionais_contagem.geojson"
@@ -0,0 +1,72 @@
+"""Mapa já renderizado entregue ao componente do st_folium, sem renderizar o folium a cada rerun.
+
+A cada chamada o st_folium renderiza o mapa e deriva dele o HTML, o cabeçalho,
+o script do Leaflet e os links de CSS/JS, e isso altera o objeto folium. Para
+os mapas do cache (core.cache_mapa), compartilhados entre as sessões, esses
+textos são calculados uma vez por mapa (argumentos_componente) e cada rerun só
+os entrega ao componente (exibir). Os passos são os do st_folium da versão
+fixada em requirements.txt; tests/test_componente_mapa.py compara as duas
+saídas.
+"""
+import branca
+import folium
+import streamlit as st
+import streamlit_folium
+from streamlit_folium import _get_header, _get_html, _get_map_string, generate_js_hash, get_full_id
+
+# Valores iniciais de tudo o que o componente pode devolver, como no st_folium.
+RETORNOS_NULOS = ["last_clicked", "last_object_clicked", "last_object_clicked_count", "last_object_clicked_tooltip",
+                  "last_object_clicked_popup", "all_drawings", "last_active_drawing", "last_circle_radius",
+                  "last_circle_polygon", "selected_layers", "selected_tags", "last_geocoder_result"]
+
+
+def _com_recursos(elemento):
+    """Elementos que trazem CSS/JS próprios (plugins, escalas de cor), na ordem da árvore."""
+    if isinstance(elemento, branca.colormap.ColorMap):
+        yield elemento
+    if isinstance(elemento, folium.elements.JSCSSMixin):
+        yield elemento
+    for filho in getattr(elemento, "_children", {}).values():
+        yield from _com_recursos(filho)
+
+
+def argumentos_componente(mapa: folium.Map) -> dict:
+    """Tudo o que o st_folium deriva do mapa. Chamar depois de mapa.get_root().render(): altera o mapa."""
+    mapa.render()
+    html, header = _get_html(mapa), _get_header(mapa)
+    script = _get_map_string(mapa)
+    css_links, js_links = [], []
+    for elemento in _com_recursos(mapa):
+        if isinstance(elemento, branca.colormap.ColorMap):
+            js_links[:0] = ["https://d3js.org/d3.v4.min.js", "https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js"]
+        css_links += [href for _, href in getattr(elemento, "default_css", [])]
+        js_links += [src for _, src in getattr(elemento, "default_js", [])]
+    try:
+        limites = mapa.get_bounds()
+    except AttributeError:
+        limites = [[None, None], [None, None]]
+    return {"script": script, "header": header, "html": html, "id": get_full_id(mapa),
+            "css_links": list(dict.fromkeys(css_links)), "js_links": list(dict.fromkeys(js_links)),
+            "limites": limites, "zoom": mapa.options.get("zoom")}
+
+
+def exibir(componente: dict, key: str, center=None, zoom=None, height: int = 700, width=500,
+           returned_objects: list[str] | None = None, on_change=None):
+    """Mesmo que st_folium(mapa, render=False, ...) com os argumentos de argumentos_componente(mapa)."""
+    chave_componente = generate_js_hash(componente["script"], key, False)
+
+    def ao_mudar():
+        st.session_state[key] = st.session_state.get(chave_componente, {})
+        if on_change is not None:
+            on_change()
+
+    (sul, oeste), (norte, leste) = componente["limites"]
+    padroes = {**dict.fromkeys(RETORNOS_NULOS), "zoom": componente["zoom"],
+               "bounds": {"_southWest": {"lat": sul, "lng": oeste}, "_northEast": {"lat": norte, "lng": leste}}}
+    if returned_objects is not None:
+        padroes = {k: v for k, v in padroes.items() if k in returned_objects}
+    return streamlit_folium._component_func(
+        script=componente["script"], header=componente["header"], html=componente["html"], id=componente["id"],
+        key=chave_componente, height=height, width=width, returned_objects=returned_objects, default=padroes,
+        zoom=zoom, center=center, feature_group=None, return_on_hover=False, layer_control=None, pixelated=False,
+        css_links=componente["css_links"], js_links=componente["js_links"], on_change=ao_mudar, wrap_longitude=False)
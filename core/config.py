@@ -0,0 +1,53 @@
+"""Textos, pastas de imagens, links e parâmetros do mapa comuns às páginas do app.
+
+Só constantes, sem imports: a página "Saiba Mais" e o início do script
+principal leem daqui sem carregar pandas, folium ou as bibliotecas do mapa.
+"""
+
+APP_TITULO = "Planta Contagem"
+APP_SUBTITULO = "Mapa das Unidades Produtivas de Contagem"
+DESCRICAO_CMAUF = "Prefeitura Municipal de Contagem - MG, Mapeamento feito pelo Centro Municipal de Agricultura Urbana e Familiar (CMAUF)"
+
+PASTA_ICONES = "icones/"
+PASTA_LOGOS = "logos/"
+PASTA_FOTOS = "fotos/"
+LOGO_PMC = PASTA_LOGOS + "banner_pmc.png"
+
+PMC_PORTAL_URL = "https://portal.contagem.mg.gov.br"
+LINK_CONTAGEM_SEM_FOME = "https://portal.contagem.mg.gov.br/portal/noticias/0/3/67444/prefeitura-lanca-campanha-de-seguranca-alimentar-contagem-sem-fome"
+LINK_ALIMENTA_CIDADES = "https://www.gov.br/mds/pt-br/acoes-e-programas/promocao-da-alimentacao-adequada-e-saudavel/alimenta-cidades"
+LINK_GOVERNO_FEDERAL = "https://www.gov.br/pt-br"
+LINK_PAA = "https://www.gov.br/secom/pt-br/acesso-a-informacao/comunicabr/lista-de-acoes-e-programas/programa-de-aquisicao-de-alimentos-paa"
+
+# Banners do rodapé de todas as páginas: escala da altura (base de 50 px) e deslocamento vertical em px.
+RODAPE_PAGINA = [
+    {"asset": PASTA_LOGOS + "governo_federal.png", "link": LINK_GOVERNO_FEDERAL, "scale": 2.2, "offset_y": -5},
+    {"asset": PASTA_LOGOS + "alimenta_cidades.png", "link": LINK_ALIMENTA_CIDADES, "scale": 2.5, "offset_y": -25},
+    {"asset": PASTA_LOGOS + "contagem_sem_fome.png", "link": LINK_CONTAGEM_SEM_FOME, "scale": 1.0, "offset_y": 25},
+    {"asset": LOGO_PMC, "link": PMC_PORTAL_URL, "scale": 1.0, "offset_y": 25},
+]
+
+ICONES_DEFINIDOS = {
+    1: {"file": "leaf_green.png", "label": "Comunitária"},
+    2: {"file": "leaf_blue.png", "label": "Institucional"},
+    3: {"file": "leaf_orange.png", "label": "Comunitária/Institucional"},
+    4: {"file": "feira_cidade.png", "label": "Feira da Cidade"},
+    5: {"file": "banco_alimentos.png", "label": "Banco de Alimentos"},
+    6: {"file": "restaurante_pop.png", "label": "Restaurante Popular"},
+    9: {"file": "sede_cmauf.png", "label": "Sede CMAUF"}
+}
+ICONE_PADRAO_ARQUIVO = "leaf_green.png"
+
+MAPEAMENTO_CORES = {
+    1: "#fbb4ae", 2: "#b3cde3", 3: "#ccebc5", 4: "#decbe4",
+    5: "#fed9a6", 6: "#ffffcc", 7: "#e5d8bd"
+}
+
+CENTRO_INICIAL_MAPA = [-19.8888, -44.0535]
+ZOOM_INICIAL_MAPA = 12
+ZOOM_SELECIONADO_MAPA = 16
+# Abaixo deste zoom, o mapa completo mostra bolhas com a quantidade de unidades por área no lugar dos ícones (core.densidade).
+ZOOM_MARCADORES = 14
+# "camada": uma camada GeoJSON por categoria (padrão); "individual": um folium.Marker por unidade.
+MODO_MARCADORES = "camada"
+TEXTO_BUSCA = "Pesquisar por Nome, Tipo ou Regional"
@@ -0,0 +1,214 @@
+"""Carga da planilha de unidades e armazenamento compartilhado entre sessões.
+
+A LojaDados guarda a última versão boa dos dados para o processo inteiro.
+Quando a versão fica mais velha que o intervalo de atualização, quem pede os
+dados recebe a versão atual na hora e a atualização roda numa thread em
+segundo plano (stale-while-revalidate). O download usa ETag/Last-Modified,
+então uma planilha que não mudou custa só uma resposta 304, e passa pela
+sessão com novas tentativas de core.rede. Com um ArmazemSnapshots, cada
+versão nova vai para o disco e um processo novo começa servindo o snapshot
+mais recente enquanto confere a planilha (ver core.snapshots).
+
+Depois da leitura, core.ingestao valida e completa os dados (alertas, links
+prontos), antes do hash que identifica a versão.
+
+Como o DataFrame fica na memória do processo inteiro, os tipos são compactos:
+Tipo e Regional (a calculada e a da planilha) são categóricas (poucos valores, muito repetidos), Numeral é
+um inteiro de 32 bits e Info/Instagram guardam cada texto uma única vez quando
+a maioria das linhas repete o valor de outra (ex.: Info vazia).
+"""
+import io
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+import requests
+
+from core.cache_mapa import hash_dataframe
+from core.ingestao import COLUNA_LINK_INSTAGRAM, compilar
+from core.rede import sessao_http
+from core.regionais import COLUNA_PLANILHA
+from core.snapshots import ArmazemSnapshots
+
+COLUNAS_TEXTO = ['Nome', 'Tipo', 'Regional', 'Info', 'Instagram']
+COLUNAS_CATEGORICAS = ['Tipo', 'Regional', COLUNA_PLANILHA]
+COLUNAS_REPETITIVAS = ['Info', 'Instagram', COLUNA_LINK_INSTAGRAM]  # viram categóricas só se os valores se repetirem bastante
+FRACAO_MAXIMA_UNICOS = 0.5
+TIPO_NUMERAL = 'Int32'
+INTERVALO_ATUALIZACAO_S = 600
+INTERVALO_NOVA_TENTATIVA_S = 30  # sem nenhuma versão carregada, espera isso entre tentativas que falharam
+TIMEOUT_DOWNLOAD_S = 30
+
+
+def preparar_dados(fonte, regionais=None) -> pd.DataFrame:
+    """Lê o CSV da planilha (URL, caminho, bytes ou arquivo aberto), padroniza os tipos e compila (core.ingestao).
+
+    Com regionais (core.regionais.IndiceRegionais), as coordenadas são conferidas e a Regional recalculada.
+    """
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = io.BytesIO(fonte)
+    data = pd.read_csv(fonte, usecols=range(8))
+    numeral = pd.to_numeric(data['Numeral'], errors='coerce')
+    # Numeral fracionário ou fora da faixa do TIPO_NUMERAL é tratado como não numérico: a linha sai, em vez de a carga toda falhar.
+    limites = np.iinfo(TIPO_NUMERAL.lower())
+    data['Numeral'] = numeral.where((numeral % 1 == 0) & numeral.between(limites.min, limites.max))
+    data['lat'] = pd.to_numeric(data['lat'], errors='coerce')
+    data['lon'] = pd.to_numeric(data['lon'], errors='coerce')
+    data.dropna(subset=['Numeral', 'lat', 'lon'], inplace=True)
+    for col in COLUNAS_TEXTO:
+        if col in data.columns:
+            # fillna antes do astype: no pandas 3, astype(str) mantém NaN em vez de gerar 'nan'.
+            data[col] = data[col].fillna('').astype(str)
+    return compactar(compilar(data, regionais))
+
+
+def compactar(data: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas para os tipos compactos usados em memória (altera e retorna o próprio DataFrame)."""
+    data['Numeral'] = data['Numeral'].astype(TIPO_NUMERAL)
+    for col in COLUNAS_CATEGORICAS:
+        if col in data.columns:
+            data[col] = data[col].astype('category')
+    for col in COLUNAS_REPETITIVAS:
+        if col in data.columns and data[col].nunique() <= FRACAO_MAXIMA_UNICOS * len(data):
+            data[col] = data[col].astype('category')
+    return data
+
+
+def detalhes_unidade(data: pd.DataFrame, id_unidade) -> dict | None:
+    """Campos da unidade `id_unidade` como dicionário, ou None se ela não existe nesta versão dos dados."""
+    if id_unidade is None or id_unidade not in data.index:
+        return None
+    return {"id": id_unidade, **data.loc[id_unidade].to_dict()}
+
+
+@dataclass(frozen=True)
+class VersaoDados:
+    """Uma versão carregada da planilha. `dados` é compartilhado: não deve ser alterado."""
+    dados: pd.DataFrame
+    versao: str
+    etag: str | None = None
+    last_modified: str | None = None
+    carregado_em: float = field(default_factory=time.time)
+    origem: str = "planilha"  # "snapshot" até a planilha ser conferida
+
+
+class LojaDados:
+    def __init__(self, url: str, intervalo: float = INTERVALO_ATUALIZACAO_S, sessao: requests.Session | None = None,
+                 timeout: float = TIMEOUT_DOWNLOAD_S, preparar=preparar_dados, intervalo_nova_tentativa: float = INTERVALO_NOVA_TENTATIVA_S,
+                 snapshots: ArmazemSnapshots | None = None):
+        self.url = url
+        self.intervalo = intervalo
+        self.intervalo_nova_tentativa = intervalo_nova_tentativa
+        self.timeout = timeout
+        self._sessao = sessao or sessao_http()
+        self._preparar = preparar
+        self._snapshots = snapshots
+        self._snapshot_lido = False
+        self._versao: VersaoDados | None = None
+        self._verificado_em = 0.0
+        self._trava_carga = threading.Lock()
+        self._trava_estado = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.ultimo_erro: Exception | None = None
+        self.downloads = 0
+        self.nao_modificados = 0
+
+    @property
+    def versao(self) -> VersaoDados | None:
+        return self._versao
+
+    def atual(self) -> VersaoDados | None:
+        """Versão mais recente disponível. Só bloqueia quando ainda não há nenhuma versão carregada."""
+        if self._versao is None:
+            with self._trava_carga:
+                if self._versao is None and not self._carregar_snapshot():
+                    falhou_ha_pouco = self.ultimo_erro is not None and time.time() - self._verificado_em < self.intervalo_nova_tentativa
+                    if not falhou_ha_pouco:
+                        self._atualizar_com_trava()
+            if self._versao is None:
+                return None
+        # Uma versão vinda do snapshot nunca foi conferida (_verificado_em = 0): a conferência começa aqui.
+        if time.time() - self._verificado_em >= self.intervalo:
+            self.atualizar_em_segundo_plano()
+        return self._versao
+
+    def _carregar_snapshot(self) -> bool:
+        """Na primeira carga do processo, serve o snapshot mais recente, se houver."""
+        if self._snapshots is None or self._snapshot_lido:
+            return False
+        self._snapshot_lido = True
+        snapshot = self._snapshots.mais_recente()
+        if snapshot is None:
+            return False
+        self._versao = VersaoDados(snapshot.dados, snapshot.versao, snapshot.etag, snapshot.last_modified,
+                                   snapshot.carregado_em, origem="snapshot")
+        return True
+
+    def _gravar_snapshot(self, versao: VersaoDados) -> None:
+        if self._snapshots is None:
+            return
+        try:
+            self._snapshots.gravar(versao.dados, versao.versao, versao.carregado_em, versao.etag, versao.last_modified)
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar o snapshot dos dados: {e}")
+
+    def atualizar_em_segundo_plano(self) -> threading.Thread | None:
+        with self._trava_estado:
+            if self._thread is not None and self._thread.is_alive():
+                return None
+            self._thread = threading.Thread(target=self.atualizar, name="atualizar-planilha", daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def aguardar_atualizacao(self, timeout: float | None = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def atualizar(self) -> bool:
+        """Busca a planilha agora. Retorna True se uma nova versão passou a ser servida."""
+        with self._trava_carga:
+            return self._atualizar_com_trava()
+
+    def _atualizar_com_trava(self) -> bool:
+        anterior = self._versao
+        cabecalhos = {}
+        if anterior is not None:
+            if anterior.etag:
+                cabecalhos['If-None-Match'] = anterior.etag
+            if anterior.last_modified:
+                cabecalhos['If-Modified-Since'] = anterior.last_modified
+        try:
+            resposta = self._sessao.get(self.url, headers=cabecalhos, timeout=self.timeout)
+            if resposta.status_code == 304 and anterior is not None:
+                self.nao_modificados += 1
+                with self._trava_estado:
+                    if anterior.origem != "planilha":
+                        self._versao = replace(anterior, origem="planilha")
+                    self._verificado_em = time.time()
+                    self.ultimo_erro = None
+                return False
+            resposta.raise_for_status()
+            self.downloads += 1
+            dados = self._preparar(resposta.content)
+        except Exception as e:
+            # Continua servindo a última versão boa; a próxima consulta tenta de novo.
+            self.ultimo_erro = e
+            self._verificado_em = time.time()
+            print(f"Erro ao atualizar dados de {self.url}: {e}")
+            return False
+
+        versao = hash_dataframe(dados)
+        etag, last_modified = resposta.headers.get('ETag'), resposta.headers.get('Last-Modified')
+        with self._trava_estado:
+            self.ultimo_erro = None
+            self._verificado_em = time.time()
+            if anterior is not None and anterior.versao == versao:
+                # Conteúdo igual: mantém o mesmo objeto para não invalidar caches, só guarda os novos validadores.
+                self._versao = VersaoDados(anterior.dados, versao, etag, last_modified, anterior.carregado_em)
+                return False
+            self._versao = VersaoDados(dados, versao, etag, last_modified)
+        self._gravar_snapshot(self._versao)
+        return True
@@ -0,0 +1,93 @@
+"""Agregados de densidade das unidades por zoom, para o nível de detalhe do mapa.
+
+Em zoom baixo, a cidade inteira cabe na tela e os ícones se sobrepõem. Para
+cada zoom abaixo de ZOOM_SELECIONADO_MAPA, as unidades são somadas nas
+células da grade de core.viewport (tamanho fixo em pixels), separadas por
+categoria (Numeral). O cálculo é vetorizado e feito uma vez por versão dos
+dados: o mapa completo leva os níveis abaixo de ZOOM_MARCADORES e troca bolhas
+por ícones no navegador, e o modo por área visível recorta o nível do zoom
+atual em vez de agregar a cada rerun.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core.config import ICONES_DEFINIDOS, ZOOM_MARCADORES, ZOOM_SELECIONADO_MAPA
+from core.viewport import agrupar_celulas, tamanho_celula_agregacao
+
+ZOOM_MINIMO_AGREGADO = 8  # abaixo dele, vale o nível deste zoom
+PRECISAO_CENTROS = 5
+# Mesmas chaves de core.mapa.categoria_busca, para o filtro por tipo do navegador valer também para as bolhas.
+CATEGORIA_OUTRAS = "outras"
+ROTULO_OUTRAS = "Outras Categorias"
+
+
+def codigos_categoria(numerais) -> np.ndarray:
+    """Posição do Numeral de cada unidade em ICONES_DEFINIDOS; os desconhecidos ficam na última posição (outras)."""
+    valores = pd.to_numeric(pd.Series(numerais), errors="coerce").astype(float).to_numpy()
+    codigos = pd.Index(list(ICONES_DEFINIDOS), dtype=float).get_indexer(valores)
+    codigos[codigos < 0] = len(ICONES_DEFINIDOS)
+    return codigos
+
+
+def agregar_por_categoria(lats: np.ndarray, lons: np.ndarray, codigos: np.ndarray, categorias: int, tamanho_celula: float) -> pd.DataFrame:
+    """Uma linha por célula ocupada: posição média (lat, lon), quantidade e, em `contagens`, o total de cada código."""
+    grupo, quantidades = agrupar_celulas(lats, lons, tamanho_celula)
+    contagens = np.bincount(grupo * categorias + codigos, minlength=len(quantidades) * categorias).reshape(-1, categorias)
+    return pd.DataFrame({
+        "lat": np.bincount(grupo, weights=lats) / quantidades,
+        "lon": np.bincount(grupo, weights=lons) / quantidades,
+        "quantidade": quantidades,
+        "contagens": list(contagens),
+    })
+
+
+@dataclass(frozen=True)
+class NiveisDensidade:
+    """Agregados de uma versão dos dados, do zoom ZOOM_MINIMO_AGREGADO até o último antes de ZOOM_SELECIONADO_MAPA."""
+    categorias: tuple[str, ...]  # chave de cada posição de `contagens`
+    rotulos: tuple[str, ...]
+    niveis: dict  # zoom -> DataFrame de agregar_por_categoria
+    zoom_marcadores: int = ZOOM_MARCADORES
+
+    def nivel(self, zoom: float) -> pd.DataFrame | None:
+        """Células do zoom (abaixo do primeiro nível, vale ele); None a partir do último nível calculado."""
+        if not self.niveis or zoom >= max(self.niveis) + 1:
+            return None
+        return self.niveis[max(math.floor(zoom), min(self.niveis))]
+
+    def na_caixa(self, zoom: float, sul: float, oeste: float, norte: float, leste: float) -> pd.DataFrame | None:
+        nivel = self.nivel(zoom)
+        if nivel is None:
+            return None
+        dentro = nivel["lat"].between(sul, norte) & nivel["lon"].between(oeste, leste)
+        return nivel[dentro].reset_index(drop=True)
+
+    def para_navegador(self) -> dict:
+        """Níveis abaixo de zoom_marcadores em listas compactas: [lat, lon, contagem de cada categoria] por célula."""
+        niveis = {}
+        for zoom, nivel in self.niveis.items():
+            if zoom >= self.zoom_marcadores:
+                continue
+            centros = np.column_stack([nivel["lat"].round(PRECISAO_CENTROS), nivel["lon"].round(PRECISAO_CENTROS)]).tolist()
+            niveis[zoom] = [centro + contagens.tolist() for centro, contagens in zip(centros, nivel["contagens"])]
+        return {"zoomMarcadores": self.zoom_marcadores, "categorias": list(self.categorias), "rotulos": list(self.rotulos), "niveis": niveis}
+
+
+def calcular_niveis(df: pd.DataFrame, zoom_marcadores: int = ZOOM_MARCADORES,
+                    zoom_minimo: int = ZOOM_MINIMO_AGREGADO, zoom_maximo: int = ZOOM_SELECIONADO_MAPA - 1) -> NiveisDensidade:
+    """Agregados de todos os zooms de zoom_minimo a zoom_maximo. Só as categorias presentes nos dados entram."""
+    validas = df["lat"].notna() & df["lon"].notna()
+    lats, lons = df.loc[validas, "lat"].to_numpy(dtype=float), df.loc[validas, "lon"].to_numpy(dtype=float)
+    todos = codigos_categoria(df.loc[validas, "Numeral"])
+    presentes = np.flatnonzero(np.bincount(todos, minlength=len(ICONES_DEFINIDOS) + 1))
+    codigos = np.searchsorted(presentes, todos)
+    chaves = [str(num) for num in ICONES_DEFINIDOS] + [CATEGORIA_OUTRAS]
+    rotulos = [props["label"] for props in ICONES_DEFINIDOS.values()] + [ROTULO_OUTRAS]
+    niveis = {}
+    if len(lats):
+        for zoom in range(zoom_minimo, zoom_maximo + 1):
+            niveis[zoom] = agregar_por_categoria(lats, lons, codigos, len(presentes), tamanho_celula_agregacao(zoom))
+    return NiveisDensidade(tuple(chaves[i] for i in presentes), tuple(rotulos[i] for i in presentes), niveis, zoom_marcadores)
@@ -0,0 +1,114 @@
+"""Pacote estático incremental: arquivos prontos para qualquer hospedagem estática/CDN.
+
+Cada arquivo do pacote é registrado num manifesto com o hash das entradas
+que o geraram. Numa nova exportação, se o hash de entrada de um arquivo não
+mudou e ele continua no disco, o arquivo não é gerado de novo (o conteúdo é
+passado como função justamente para não ser calculado nesse caso). Junto de
+cada arquivo de texto são gravadas cópias .gz e, com o pacote `brotli`
+instalado, .br, para servidores que entregam versões pré-comprimidas.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele o pacote sai só com as cópias .gz
+    brotli = None
+
+NOME_MANIFESTO = "manifesto.json"
+EXTENSOES_COMPRIMIDAS = (".html", ".json", ".geojson", ".js", ".css", ".svg")
+
+
+def hash_entradas(*partes) -> str:
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()[:16]
+
+
+def _gravar_atomicamente(caminho: Path, conteudo: bytes) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(conteudo)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, caminho)
+
+
+def comprimidos(nome: str, conteudo: bytes) -> dict[str, bytes]:
+    """Cópias pré-comprimidas (nome -> bytes). gzip com mtime=0 para a saída não mudar entre builds."""
+    if not nome.endswith(EXTENSOES_COMPRIMIDAS):
+        return {}
+    copias = {nome + ".gz": gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        copias[nome + ".br"] = brotli.compress(conteudo, quality=11)
+    return copias
+
+
+class PacoteEstatico:
+    def __init__(self, destino: Path, forcar: bool = False):
+        self.destino = Path(destino)
+        self.forcar = forcar
+        self._anterior = {} if forcar else self._ler_manifesto()
+        self._arquivos: dict[str, dict] = {}
+        self.gerados: list[str] = []
+        self.mantidos: list[str] = []
+
+    def _ler_manifesto(self) -> dict:
+        try:
+            with open(self.destino / NOME_MANIFESTO, encoding="utf-8") as f:
+                return json.load(f).get("arquivos", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _atual(self, nome: str, entrada: str) -> bool:
+        anterior = self._anterior.get(nome)
+        if anterior is None or anterior.get("entrada") != entrada:
+            return False
+        return all((self.destino / arquivo).exists() for arquivo in [nome, *anterior.get("copias", [])])
+
+    def escrever(self, nome: str, entrada: str, gerar) -> bool:
+        """Grava gerar() em `nome` se o hash de entrada mudou. Retorna True se o arquivo foi gerado."""
+        if self._atual(nome, entrada):
+            self._arquivos[nome] = self._anterior[nome]
+            self.mantidos.append(nome)
+            return False
+        conteudo = gerar()
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode("utf-8")
+        _gravar_atomicamente(self.destino / nome, conteudo)
+        copias = comprimidos(nome, conteudo)
+        for nome_copia, dados in copias.items():
+            _gravar_atomicamente(self.destino / nome_copia, dados)
+        self._arquivos[nome] = {
+            "entrada": entrada,
+            "sha256": hashlib.sha256(conteudo).hexdigest(),
+            "bytes": len(conteudo),
+            "copias": sorted(copias),
+        }
+        self.gerados.append(nome)
+        return True
+
+    def copiar(self, nome: str, origem: Path, hash_origem: str) -> bool:
+        return self.escrever(nome, hash_origem, lambda: Path(origem).read_bytes())
+
+    def finalizar(self) -> dict:
+        """Remove os arquivos de exportações anteriores que saíram do pacote e grava o manifesto.
+
+        Só apaga o que o manifesto anterior registra; outros arquivos no destino não são tocados.
+        """
+        def arquivos(registro: dict) -> set[str]:
+            return {arquivo for nome, info in registro.items() for arquivo in [nome, *info.get("copias", [])]}
+
+        removidos = sorted(arquivos(self._ler_manifesto()) - arquivos(self._arquivos))
+        for relativo in removidos:
+            (self.destino / relativo).unlink(missing_ok=True)
+        _gravar_atomicamente(self.destino / NOME_MANIFESTO,
+                             json.dumps({"arquivos": self._arquivos}, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+        return {"gerados": self.gerados, "mantidos": self.mantidos, "removidos": removidos}
+
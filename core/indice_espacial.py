@@ -0,0 +1,139 @@
+"""Índice espacial em grade uniforme sobre as coordenadas das unidades.
+
+Substitui o dicionário de coordenadas arredondadas usado para descobrir qual
+unidade foi clicada: o clique é resolvido pela unidade mais próxima dentro de
+uma tolerância em pixels, convertida para metros conforme o zoom, e todas as
+unidades no mesmo ponto são devolvidas juntas. A mesma grade responde às
+consultas de proximidade ("unidades perto de mim"): as k mais próximas de um
+ponto, opcionalmente só de alguns grupos (tipos) e até um raio máximo.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+RAIO_TERRA_M = 6_371_008.8
+METROS_POR_PIXEL_ZOOM_0 = 156_543.03392  # tiles de 256 px na projeção Web Mercator
+
+TAMANHO_CELULA_GRAUS = 0.005  # ~550 m
+TOLERANCIA_CLIQUE_PX = 12
+TOLERANCIA_MINIMA_M = 2.0
+DISTANCIA_COLOCADOS_M = 1.0
+FATOR_EXPANSAO = 2.0  # a busca das k mais próximas dobra o raio até achar k unidades
+
+
+def metros_por_pixel(lat: float, zoom: float) -> float:
+    return METROS_POR_PIXEL_ZOOM_0 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def distancia_haversine_m(lat, lon, lats, lons):
+    """Distância em metros de (lat, lon) até cada ponto dos arrays."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class IndiceEspacial:
+    def __init__(self, lats, lons, ids, tamanho_celula: float = TAMANHO_CELULA_GRAUS, grupos=None):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.ids = np.asarray(ids)
+        self.tamanho_celula = tamanho_celula
+        # Grupo de cada ponto (ex.: o Tipo) guardado como códigos, para filtrar candidatos sem comparar textos.
+        self.grupos = pd.Categorical(grupos) if grupos is not None else None
+
+        linhas = np.floor(self.lats / tamanho_celula).astype(np.int64)
+        colunas = np.floor(self.lons / tamanho_celula).astype(np.int64)
+        ordem = np.lexsort((colunas, linhas))
+        celulas, inicios, contagens = np.unique(
+            np.stack([linhas[ordem], colunas[ordem]], axis=1), axis=0, return_index=True, return_counts=True
+        )
+        self._ordem = ordem
+        self._celulas = {(int(l), int(c)): (i, i + n) for (l, c), i, n in zip(celulas, inicios, contagens)}
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, coluna_grupo: str | None = None, **kwargs) -> "IndiceEspacial":
+        validas = df[df["lat"].notna() & df["lon"].notna()]
+        grupos = validas[coluna_grupo] if coluna_grupo is not None and coluna_grupo in validas else None
+        return cls(validas["lat"].to_numpy(dtype=float), validas["lon"].to_numpy(dtype=float), validas.index.to_numpy(), grupos=grupos, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _posicoes_no_retangulo(self, sul: float, oeste: float, norte: float, leste: float) -> np.ndarray:
+        """Posições dos pontos nas células que cobrem o retângulo (ainda sem o filtro fino)."""
+        l0, l1 = math.floor(sul / self.tamanho_celula), math.floor(norte / self.tamanho_celula)
+        c0, c1 = math.floor(oeste / self.tamanho_celula), math.floor(leste / self.tamanho_celula)
+        if (l1 - l0 + 1) * (c1 - c0 + 1) > len(self._celulas):
+            fatias = [v for (l, c), v in self._celulas.items() if l0 <= l <= l1 and c0 <= c <= c1]
+        else:
+            fatias = [self._celulas[(l, c)] for l in range(l0, l1 + 1) for c in range(c0, c1 + 1) if (l, c) in self._celulas]
+        if not fatias:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._ordem[i:f] for i, f in fatias])
+
+    def dentro_do_retangulo(self, sul: float, oeste: float, norte: float, leste: float) -> np.ndarray:
+        """Ids das unidades dentro do retângulo (bordas inclusas)."""
+        posicoes = self._posicoes_no_retangulo(sul, oeste, norte, leste)
+        lats, lons = self.lats[posicoes], self.lons[posicoes]
+        dentro = (lats >= sul) & (lats <= norte) & (lons >= oeste) & (lons <= leste)
+        return self.ids[np.sort(posicoes[dentro])]
+
+    def _vizinhos(self, lat: float, lon: float, raio_m: float) -> tuple[np.ndarray, np.ndarray]:
+        dlat = math.degrees(raio_m / RAIO_TERRA_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        posicoes = self._posicoes_no_retangulo(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distancias = distancia_haversine_m(lat, lon, self.lats[posicoes], self.lons[posicoes])
+        perto = distancias <= raio_m
+        posicoes, distancias = posicoes[perto], distancias[perto]
+        ordem = np.lexsort((posicoes, distancias))
+        return posicoes[ordem], distancias[ordem]
+
+    def vizinhos(self, lat: float, lon: float, raio_m: float) -> list[tuple[object, float]]:
+        """(id, distância em metros) das unidades a até raio_m do ponto, da mais próxima à mais distante."""
+        posicoes, distancias = self._vizinhos(lat, lon, raio_m)
+        return list(zip(self.ids[posicoes].tolist(), distancias.tolist()))
+
+    def _alcance_m(self, lat: float, lon: float) -> float:
+        """Raio que com certeza cobre todos os pontos a partir de (lat, lon): distância ao canto mais longe da caixa dos dados."""
+        cantos_lat = np.array([self.lats.min(), self.lats.min(), self.lats.max(), self.lats.max()])
+        cantos_lon = np.array([self.lons.min(), self.lons.max(), self.lons.min(), self.lons.max()])
+        return float(distancia_haversine_m(lat, lon, cantos_lat, cantos_lon).max()) * 1.01 + 1.0
+
+    def mais_proximos(self, lat: float, lon: float, k: int, raio_m: float | None = None, grupos=None) -> list[tuple[object, float]]:
+        """(id, distância em metros) das k unidades mais próximas do ponto, da mais próxima à mais distante.
+
+        Com raio_m, só as que estão até essa distância; com grupos, só as desses grupos.
+        O raio da busca começa em uma célula da grade e cresce até achar k unidades:
+        tudo dentro dele é conferido pela distância exata, então as k achadas são as k mais próximas.
+        """
+        if k <= 0 or len(self) == 0:
+            return []
+        permitidos = None
+        if grupos is not None:
+            if self.grupos is None:
+                raise ValueError("índice criado sem grupos")
+            permitidos = np.flatnonzero(self.grupos.categories.isin(list(grupos)))
+            if len(permitidos) == 0:
+                return []
+        limite = self._alcance_m(lat, lon) if raio_m is None else raio_m
+        raio = min(math.radians(self.tamanho_celula) * RAIO_TERRA_M, limite)
+        while True:
+            posicoes, distancias = self._vizinhos(lat, lon, raio)
+            if permitidos is not None:
+                manter = np.isin(self.grupos.codes[posicoes], permitidos)
+                posicoes, distancias = posicoes[manter], distancias[manter]
+            if len(posicoes) >= k or raio >= limite:
+                return list(zip(self.ids[posicoes[:k]].tolist(), distancias[:k].tolist()))
+            raio = min(raio * FATOR_EXPANSAO, limite)
+
+    def resolver_clique(self, lat: float, lon: float, zoom: float, tolerancia_px: float = TOLERANCIA_CLIQUE_PX) -> list:
+        """Ids das unidades no ponto clicado: a mais próxima primeiro, seguida das que estão no mesmo lugar."""
+        raio = max(tolerancia_px * metros_por_pixel(lat, zoom), TOLERANCIA_MINIMA_M)
+        posicoes, _ = self._vizinhos(lat, lon, raio)
+        if len(posicoes) == 0:
+            return []
+        mais_proxima = posicoes[0]
+        colocadas, _ = self._vizinhos(self.lats[mais_proxima], self.lons[mais_proxima], DISTANCIA_COLOCADOS_M)
+        return self.ids[np.concatenate([[mais_proxima], colocadas[colocadas != mais_proxima]])].tolist()
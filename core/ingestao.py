@@ -0,0 +1,120 @@
+"""Compilação da planilha: validação e campos de exibição calculados uma vez por versão dos dados.
+
+Roda na carga, entre a leitura do CSV e o hash da versão (core.dados), e
+tudo é vetorizado. Problemas da planilha viram bits da coluna `alertas`
+em vez de sumir em silêncio. Coordenadas trocadas (lon na coluna lat)
+são corrigidas. Coordenadas fora do município ou repetidas, Numeral
+desconhecido e Instagram que não é um perfil ficam só marcados. O Instagram
+sai pronto para exibição ("@perfil") e com o link em `link_instagram`. Quem
+desenha o mapa, o popup e a barra lateral usa essas colunas como estão.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.config import ICONES_DEFINIDOS
+
+COLUNA_ALERTAS = "alertas"
+COLUNA_LINK_INSTAGRAM = "link_instagram"
+COLUNAS_TEXTO_LIMPAS = ['Nome', 'Tipo', 'Regional', 'Info', 'Instagram']
+PRECISAO_DUPLICADAS = 5  # casas decimais (~1 m) para duas unidades contarem como no mesmo ponto
+
+ALERTA_FORA_MUNICIPIO = 1
+ALERTA_COORDENADAS_TROCADAS = 2
+ALERTA_COORDENADA_REPETIDA = 4
+ALERTA_NUMERAL_DESCONHECIDO = 8
+ALERTA_INSTAGRAM_INVALIDO = 16
+DESCRICAO_ALERTAS = {
+    ALERTA_FORA_MUNICIPIO: "coordenadas fora do município",
+    ALERTA_COORDENADAS_TROCADAS: "latitude e longitude trocadas na planilha (corrigidas)",
+    ALERTA_COORDENADA_REPETIDA: "mesmas coordenadas de outra unidade",
+    ALERTA_NUMERAL_DESCONHECIDO: "Numeral sem tipo definido",
+    ALERTA_INSTAGRAM_INVALIDO: "Instagram não é um perfil",
+}
+
+URL_INSTAGRAM = "https://www.instagram.com/"
+_PERFIL = r"([A-Za-z0-9_](?:[A-Za-z0-9._]{0,28}[A-Za-z0-9_])?)"
+# Endereço do perfil (com ou sem https://www.), "@perfil" ou o nome do perfil puro.
+_RE_URL_INSTAGRAM = re.compile(rf"^(?:https?://)?(?:www\.)?(?:instagram\.com|instagr\.am)/@?{_PERFIL}/?(?:[?#].*)?$", re.IGNORECASE)
+_RE_ARROBA = re.compile(rf"^@{_PERFIL}$")
+_RE_PERFIL_PURO = re.compile(rf"^{_PERFIL}$")
+# Um perfil pode ter pontos: sem http(s)://, só "horta.com.br" ou "site.org/pagina" contam como endereço de outro site.
+_RE_OUTRO_SITE = re.compile(r"^(?:https?://\S+|(?:[\w-]+\.)+(?:com|br|org|net|gov|edu|me|bio|link|site|app)(?:[/?#]\S*)?)$", re.IGNORECASE)
+
+
+def normalizar_instagram(valores: pd.Series) -> tuple[pd.Series, pd.Series, pd.Series]:
+    """(texto para exibir, link, inválido) de cada valor da coluna Instagram.
+
+    Perfis viram "@perfil" com o link do perfil. Endereços de outros sites continuam com link, mas marcados como
+    inválidos. O que não é nem perfil nem endereço fica só como texto.
+    """
+    texto = valores.fillna('').astype(str).str.strip()
+    perfil = texto.str.extract(_RE_URL_INSTAGRAM, expand=False)
+    perfil = perfil.fillna(texto.str.extract(_RE_ARROBA, expand=False))
+    outro_site = texto.str.match(_RE_OUTRO_SITE) & perfil.isna()
+    perfil = perfil.fillna(texto.where(~outro_site).str.extract(_RE_PERFIL_PURO, expand=False))
+    tem_perfil = perfil.notna()
+    exibicao = texto.where(~tem_perfil, "@" + perfil.fillna(''))
+    com_esquema = texto.where(texto.str.match(r"^https?://", case=False), "https://" + texto)
+    link = (URL_INSTAGRAM + perfil + "/").fillna(com_esquema.where(outro_site, ''))
+    invalido = (texto != '') & ~tem_perfil
+    return exibicao, link, invalido
+
+
+def coordenadas_repetidas(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """True para as unidades que dividem o ponto (arredondado em PRECISAO_DUPLICADAS) com alguma outra."""
+    pontos = pd.DataFrame({"lat": np.round(lats, PRECISAO_DUPLICADAS), "lon": np.round(lons, PRECISAO_DUPLICADAS)})
+    return pontos.duplicated(keep=False).to_numpy()
+
+
+def compilar(data: pd.DataFrame, regionais=None) -> pd.DataFrame:
+    """Valida e completa os dados lidos da planilha (colunas já convertidas, sem lat/lon/Numeral vazios).
+
+    Com regionais (core.regionais.IndiceRegionais), corrige coordenadas trocadas, marca as que caem fora do
+    município e recalcula a Regional pelas coordenadas. Retorna um novo DataFrame com `alertas` e `link_instagram`.
+    """
+    data = data.copy()
+    for col in COLUNAS_TEXTO_LIMPAS:
+        if col in data.columns:
+            data[col] = data[col].str.strip()
+    alertas = np.zeros(len(data), dtype=np.uint8)
+
+    if regionais is not None and len(data):
+        lats, lons = data['lat'].to_numpy(dtype=float), data['lon'].to_numpy(dtype=float)
+        fora = regionais.localizar(lats, lons) < 0
+        trocadas = np.zeros(len(data), dtype=bool)
+        if fora.any():
+            trocadas[fora] = regionais.localizar(lons[fora], lats[fora]) >= 0
+        if trocadas.any():
+            data.loc[trocadas, ['lat', 'lon']] = data.loc[trocadas, ['lon', 'lat']].to_numpy()
+        alertas |= np.where(trocadas, ALERTA_COORDENADAS_TROCADAS, 0).astype(np.uint8)
+        alertas |= np.where(fora & ~trocadas, ALERTA_FORA_MUNICIPIO, 0).astype(np.uint8)
+        data = regionais.atribuir(data)
+
+    alertas |= np.where(coordenadas_repetidas(data['lat'].to_numpy(dtype=float), data['lon'].to_numpy(dtype=float)),
+                        ALERTA_COORDENADA_REPETIDA, 0).astype(np.uint8)
+    alertas |= np.where(data['Numeral'].isin(list(ICONES_DEFINIDOS)).to_numpy(dtype=bool, na_value=False), 0,
+                        ALERTA_NUMERAL_DESCONHECIDO).astype(np.uint8)
+    instagram = data['Instagram'] if 'Instagram' in data.columns else pd.Series('', index=data.index)
+    exibicao, link, invalido = normalizar_instagram(instagram)
+    if 'Instagram' in data.columns:
+        data['Instagram'] = exibicao
+    data[COLUNA_LINK_INSTAGRAM] = link
+    alertas |= np.where(invalido.to_numpy(dtype=bool), ALERTA_INSTAGRAM_INVALIDO, 0).astype(np.uint8)
+    data[COLUNA_ALERTAS] = alertas
+    return data
+
+
+def descrever_alertas(alertas: int) -> list[str]:
+    """Descrição de cada bit ligado em `alertas`, na ordem de DESCRICAO_ALERTAS."""
+    return [descricao for bit, descricao in DESCRICAO_ALERTAS.items() if int(alertas) & bit]
+
+
+def resumo_alertas(data: pd.DataFrame) -> dict[str, int]:
+    """Quantidade de unidades com cada alerta (só os que ocorrem)."""
+    if COLUNA_ALERTAS not in data.columns:
+        return {}
+    alertas = data[COLUNA_ALERTAS].to_numpy()
+    contagens = {descricao: int(np.count_nonzero(alertas & bit)) for bit, descricao in DESCRICAO_ALERTAS.items()}
+    return {descricao: n for descricao, n in contagens.items() if n}
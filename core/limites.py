@@ -0,0 +1,153 @@
+"""Pré-processamento dos limites das regionais a partir do GeoJSON local.
+
+O arquivo original traz coordenadas com 15 casas decimais e um Z=0.0 em cada
+vértice. Aqui o Z é descartado, as coordenadas são quantizadas e os polígonos
+são simplificados em alguns níveis de tolerância pré-calculados. A
+simplificação é feita sobre a cobertura inteira, para que as divisas
+compartilhadas entre regionais continuem coincidindo. O resultado fica num
+cache em disco versionado pelo hash do arquivo de origem e pela versão do
+algoritmo.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+from core.caminhos import CAMINHO_GEOJSON_REGIONAIS, DIRETORIO_CACHE
+
+# Incrementar sempre que a forma de processar mudar, para invalidar caches antigos.
+VERSAO_ALGORITMO = 1
+
+CASAS_DECIMAIS = 5  # ~1,1 m no terreno, bem abaixo do que se enxerga no mapa
+
+# Tolerâncias em graus; 0 mantém a geometria apenas quantizada.
+NIVEIS_TOLERANCIA = {
+    "completo": 0.0,
+    "detalhado": 0.00005,
+    "medio": 0.0003,
+    "simples": 0.001,
+}
+NIVEL_PADRAO = "medio"
+
+_trava_processamento = threading.Lock()
+
+
+def hash_arquivo(caminho: Path) -> str:
+    return hashlib.sha256(Path(caminho).read_bytes()).hexdigest()
+
+
+def _arredondar(coords, casas: int):
+    if isinstance(coords[0], (int, float)):
+        return [round(coords[0], casas), round(coords[1], casas)]
+    return [_arredondar(c, casas) for c in coords]
+
+
+def geometria_para_json(geom, casas: int) -> dict:
+    geo = mapping(geom)
+    return {"type": geo["type"], "coordinates": _arredondar(geo["coordinates"], casas)}
+
+
+def simplificar_cobertura(geometrias, tolerancia: float):
+    """Simplifica preservando as divisas comuns entre os polígonos."""
+    geometrias = np.asarray(geometrias, dtype=object)
+    if tolerancia <= 0:
+        return geometrias
+    if hasattr(shapely, "coverage_simplify"):
+        return shapely.coverage_simplify(geometrias, tolerancia)
+    # GEOS antigo: simplificação por geometria, sem garantia nas divisas.
+    return shapely.simplify(geometrias, tolerancia, preserve_topology=True)
+
+
+def processar_limites(origem: Path = CAMINHO_GEOJSON_REGIONAIS, casas: int = CASAS_DECIMAIS) -> dict:
+    """Gera todos os níveis de simplificação a partir do GeoJSON de origem."""
+    with open(origem, encoding="utf-8") as f:
+        bruto = json.load(f)
+    features = bruto.get("features", [])
+    geometrias = shapely.force_2d([shape(feat["geometry"]) for feat in features])
+    geometrias = shapely.set_precision(geometrias, 10 ** -casas)
+
+    niveis = {}
+    for nome, tolerancia in NIVEIS_TOLERANCIA.items():
+        simplificadas = simplificar_cobertura(geometrias, tolerancia)
+        niveis[nome] = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": dict(feat.get("properties") or {}), "geometry": geometria_para_json(geom, casas)}
+                for feat, geom in zip(features, simplificadas)
+            ],
+        }
+    return niveis
+
+
+def versao_limites(origem: Path = CAMINHO_GEOJSON_REGIONAIS) -> str:
+    """Identifica o conteúdo processado: muda com o arquivo de origem, as tolerâncias ou o algoritmo."""
+    parametros = json.dumps({"tolerancias": NIVEIS_TOLERANCIA, "casas": CASAS_DECIMAIS}, sort_keys=True)
+    digest = hashlib.sha256((hash_arquivo(origem) + parametros).encode()).hexdigest()
+    return f"v{VERSAO_ALGORITMO}-{digest[:12]}"
+
+
+def caminho_cache(versao: str, diretorio_cache: Path = DIRETORIO_CACHE) -> Path:
+    return Path(diretorio_cache) / f"limites_{versao}.json"
+
+
+def _gravar_atomicamente(caminho: Path, conteudo: dict) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(conteudo, f, ensure_ascii=False, separators=(",", ":"))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, caminho)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _ler_cache(arquivo: Path, versao: str) -> dict | None:
+    try:
+        with open(arquivo, encoding="utf-8") as f:
+            em_cache = json.load(f)
+        if em_cache.get("versao") == versao and set(em_cache.get("niveis", {})) == set(NIVEIS_TOLERANCIA):
+            return em_cache
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def carregar_niveis(origem: Path = CAMINHO_GEOJSON_REGIONAIS, diretorio_cache: Path = DIRETORIO_CACHE) -> dict:
+    """Retorna {"versao": ..., "niveis": {nome: FeatureCollection}}, usando o cache em disco quando válido."""
+    versao = versao_limites(origem)
+    arquivo = caminho_cache(versao, diretorio_cache)
+    em_cache = _ler_cache(arquivo, versao)
+    if em_cache is not None:
+        return em_cache
+    # Chamadas simultâneas (aquecimento e primeira sessão) processam uma vez só; as outras leem o cache gravado.
+    with _trava_processamento:
+        em_cache = _ler_cache(arquivo, versao)
+        if em_cache is not None:
+            return em_cache
+        return _processar_e_gravar(origem, arquivo, versao)
+
+
+def _processar_e_gravar(origem: Path, arquivo: Path, versao: str) -> dict:
+    resultado = {"versao": versao, "niveis": processar_limites(origem)}
+    try:
+        _gravar_atomicamente(arquivo, resultado)
+    except OSError as e:
+        # Sem permissão de escrita o app continua funcionando, só recalcula no próximo processo.
+        print(f"Aviso: não foi possível gravar o cache de limites em {arquivo}: {e}")
+    return resultado
+
+
+def carregar_limites(nivel: str = NIVEL_PADRAO, origem: Path = CAMINHO_GEOJSON_REGIONAIS, diretorio_cache: Path = DIRETORIO_CACHE) -> dict:
+    """FeatureCollection das regionais no nível de simplificação pedido."""
+    if nivel not in NIVEIS_TOLERANCIA:
+        raise ValueError(f"Nível de simplificação desconhecido: {nivel!r}")
+    return carregar_niveis(origem, diretorio_cache)["niveis"][nivel]
@@ -0,0 +1,570 @@
+"""Montagem do mapa em folium: legenda, camadas de unidades, limites e os controles em JS.
+
+Sem Streamlit: o app (streamlit_app.py), a exportação estática (exportar.py)
+e os benchmarks montam o mesmo mapa daqui. É o módulo que carrega folium,
+branca e pandas, por isso o app só o importa quando vai desenhar o mapa.
+"""
+import json
+
+import folium
+import pandas as pd
+from branca.element import MacroElement, Template
+from folium import Marker
+from folium.elements import ElementAddToElement
+from folium.map import Layer
+from folium.plugins import LocateControl
+from folium.utilities import JsCode
+
+from core.assets import registro_padrao
+from core.config import (CENTRO_INICIAL_MAPA, ICONE_PADRAO_ARQUIVO, ICONES_DEFINIDOS, MAPEAMENTO_CORES, MODO_MARCADORES,
+                         PASTA_ICONES, TEXTO_BUSCA, ZOOM_INICIAL_MAPA)
+from core.densidade import NiveisDensidade
+from core.ingestao import COLUNA_LINK_INSTAGRAM
+from core.regionais import ResumoRegionais
+from core.tiles import CAMADA_LIMITES, ServidorTiles
+
+PRECISAO_COORDENADAS = 5  # casas decimais das unidades no HTML do mapa (~1 m)
+
+ESTILO_POPUP = """
+<div style="font-family: Arial, sans-serif; font-size: 12px; width: auto; max-width: min(90vw, 466px); min-width: 200px; word-break: break-word; box-sizing: border-box; padding: 8px;">
+    <h6 style="margin: 0 0 8px 0; word-break: break-word; font-size: 14px;"><b>{}</b></h6>
+    <p style="margin: 4px 0;"><b>Tipo:</b> {}</p>
+    <p style="margin: 4px 0;"><b>Regional:</b> {}</p>
+    {} </div>"""
+ESTILO_TOOLTIP = """<div style="font-family: Arial, sans-serif; font-size: 14px"><p><b>{}:</b><br>{}</p></div>"""
+
+
+def icone_data_uri(arquivo: str) -> str | None:
+    """Ícones vão embutidos no HTML do mapa, que roda num iframe onde as URLs relativas do app não valem."""
+    try:
+        return registro_padrao().data_uri(PASTA_ICONES + arquivo)
+    except KeyError as e:
+        print(f"Erro ao carregar ícone {arquivo}: {e}")
+        return None
+
+def classe_icone(num) -> str:
+    return f"pc-icone-{num if num is not None else 'padrao'}"
+
+def _com_total(texto, total):
+    return f"{texto} ({total})" if total is not None else texto
+
+def criar_legenda(geojson_data, resumo: ResumoRegionais | None = None):
+    """Legenda com classes de CSS_MAPA: os ícones reaproveitam a imagem definida uma única vez no documento."""
+    regions = []
+    if geojson_data and isinstance(geojson_data, dict) and 'features' in geojson_data:
+        for feature in geojson_data.get('features', []):
+            props = feature.get('properties', {}); regions.append({'id': props.get('id'), 'name': props.get('Name')})
+    items_legenda_regional = []
+    for region in sorted(regions, key=lambda x: x.get('id', float('inf'))):
+        regiao_colorida = MAPEAMENTO_CORES.get(region.get('id'), "#CCCCCC"); nome_regiao = region.get('name', 'N/A')
+        if nome_regiao and nome_regiao != 'N/A' and regiao_colorida:
+            items_legenda_regional.append(f"""<div class="pc-legenda-item"><div class="pc-legenda-cor" style="background: {regiao_colorida};"></div><span>{_com_total(nome_regiao, resumo.total_regional(nome_regiao) if resumo else None)}</span></div>""")
+    html_regional = f"""<div class="pc-legenda-titulo">Regionais</div>{"".join(items_legenda_regional)}""" if items_legenda_regional else ""
+    items_legenda_icones = []
+    for key, props in sorted(ICONES_DEFINIDOS.items()):
+        legenda_texto = props["label"]
+        items_legenda_icones.append(f"""<div class="pc-legenda-item"><span class="pc-icone {classe_icone(key)}" title="{legenda_texto}"></span><span>{_com_total(legenda_texto, resumo.total_tipo(key) if resumo else None)}</span></div>""")
+    html_icones = f"""<div class="pc-legenda-titulo pc-legenda-tipos">Tipos de Unidade</div>{"".join(items_legenda_icones)}""" if items_legenda_icones else ""
+    if html_regional or html_icones:
+        return folium.Element(f"""<div class="pc-legenda">{html_regional}{html_icones}</div>""")
+    return None
+
+def montar_popup(nome, tipo, regional, instagram, link_instagram) -> str:
+    """Popup do modo individual; instagram e link_instagram já vêm prontos da carga (core.ingestao)."""
+    popup_parts = []
+    if link_instagram:
+        popup_parts.append(f"<p style='margin:4px 0;'><b>Instagram:</b> <a href='{link_instagram}' target='_blank' rel='noopener noreferrer'>{instagram}</a></p>")
+    elif instagram:
+        popup_parts.append(f"<p style='margin:4px 0;'><b>Instagram:</b> {instagram}</p>")
+    return ESTILO_POPUP.format(nome, tipo, regional, "".join(popup_parts))
+
+def _coluna_texto(data, coluna, padrao='N/I'):
+    if coluna in data.columns: return data[coluna].tolist()
+    return [padrao] * len(data)
+
+def adicionar_marcadores_individuais(data, feature_groups, default_feature_group, icon_base64_cache, default_icon_base64):
+    """Modo antigo: um folium.Marker por unidade. Mantido para comparação nos benchmarks."""
+    default_group_needed = False
+    for index, row in data.iterrows():
+        lat, lon = row["lat"], row["lon"]
+        icon_num = int(row["Numeral"])
+        icon_b64_data = icon_base64_cache.get(icon_num, default_icon_base64)
+        icone_atual = folium.CustomIcon(icon_b64_data, icon_size=(25,25), icon_anchor=(0,20), popup_anchor=(0,-10)) if icon_b64_data else folium.Icon(color="green", prefix='fa', icon="leaf")
+
+        popup_content = montar_popup(row.get('Nome','N/I'), row.get('Tipo','N/I'), row.get('Regional','N/I'), row.get('Instagram', ''),
+                                     row.get(COLUNA_LINK_INSTAGRAM, ''))
+        popup = folium.Popup(popup_content, max_width=450)
+        marker = Marker(location=[lat,lon], popup=popup, icon=icone_atual, tooltip=ESTILO_TOOLTIP.format(row.get('Tipo','N/I'), row.get('Nome','N/I')))
+
+        if icon_num in feature_groups: marker.add_to(feature_groups[icon_num])
+        else: marker.add_to(default_feature_group); default_group_needed = True
+    return default_group_needed
+
+CSS_MAPA = """
+.pc-icone { display: inline-block; width: 25px; height: 25px; background: center / contain no-repeat; }
+.pc-legenda .pc-icone { width: 20px; height: 20px; margin-right: 5px; }
+.pc-popup { font-family: Arial, sans-serif; font-size: 12px; width: auto; max-width: min(90vw, 466px); min-width: 200px; word-break: break-word; box-sizing: border-box; padding: 8px; }
+.pc-popup h6 { margin: 0 0 8px 0; word-break: break-word; font-size: 14px; }
+.pc-popup p { margin: 4px 0; }
+.pc-tooltip { font-family: Arial, sans-serif; font-size: 14px; }
+.pc-legenda { position: fixed; bottom: 50px; right: 20px; z-index: 1000; background: rgba(255, 255, 255, 0.9); padding: 10px; border-radius: 5px; box-shadow: 0 2px 6px rgba(0,0,0,0.3); font-family: Arial, sans-serif; font-size: 12px; max-width: 180px; max-height: 450px; overflow-y: auto; }
+.pc-legenda-item { display: flex; align-items: center; margin: 2px 0; }
+.pc-legenda-cor { width: 20px; height: 20px; margin-right: 5px; border: 1px solid #ccc; }
+.pc-legenda-titulo { font-weight: bold; margin-bottom: 5px; }
+.pc-legenda-tipos { margin-top: 10px; }
+.pc-busca { background: rgba(255, 255, 255, 0.95); padding: 6px 8px; border-radius: 5px; box-shadow: 0 1px 5px rgba(0,0,0,0.4); font: 12px Arial, sans-serif; width: 230px; }
+.pc-busca input[type=search] { width: 100%; box-sizing: border-box; padding: 4px 6px; font-size: 13px; border: 1px solid #bbb; border-radius: 4px; }
+.pc-busca-contagem { margin: 4px 0 2px; color: #555; }
+.pc-busca summary { cursor: pointer; font-weight: bold; }
+.pc-busca label { display: flex; align-items: center; gap: 4px; margin: 2px 0; cursor: pointer; }
+.pc-busca .pc-icone { width: 18px; height: 18px; }
+.pc-agrupado { display: flex; align-items: center; justify-content: center; border-radius: 50%; background: rgba(46, 125, 50, 0.85); color: #fff; font: bold 12px Arial, sans-serif; border: 2px solid #fff; box-shadow: 0 1px 4px rgba(0,0,0,0.4); }
+"""
+
+# Modelos de popup e tooltip, definidos uma vez no documento. As features levam só os campos: n(ome), t(ipo), r(egional),
+# i(nstagram) e l(ink do Instagram), já normalizados na carga (core.ingestao).
+JS_MAPA = """
+var plantaContagem = window.plantaContagem = (function() {
+    var escapes = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"};
+    function esc(valor) { return String(valor == null ? "" : valor).replace(/[&<>"']/g, function(c) { return escapes[c]; }); }
+    function popup(p) {
+        var partes = ['<div class="pc-popup"><h6><b>' + esc(p.n) + '</b></h6>',
+            '<p><b>Tipo:</b> ' + esc(p.t) + '</p>', '<p><b>Regional:</b> ' + esc(p.r) + '</p>'];
+        if (p.l) partes.push('<p><b>Instagram:</b> <a href="' + esc(p.l) + '" target="_blank" rel="noopener noreferrer">' + esc(p.i) + '</a></p>');
+        else if (p.i) partes.push('<p><b>Instagram:</b> ' + esc(p.i) + '</p>');
+        partes.push('</div>');
+        return partes.join("");
+    }
+    function tooltip(p) { return '<div class="pc-tooltip"><p><b>' + esc(p.t) + ':</b><br>' + esc(p.n) + '</p></div>'; }
+    // Tiles GeoJSON (core.tiles): polígonos só com preenchimento, contornos como linhas; o corte no tile não aparece.
+    var CamadaTiles = L.GridLayer.extend({
+        initialize: function(url, opcoes) {
+            this._url = url;
+            this._partes = {};
+            L.GridLayer.prototype.initialize.call(this, opcoes);
+            this.on("tileunload", function(e) { this._removerParte(this._tileCoordsToKey(e.coords)); });
+        },
+        _estilo: function(feature) {
+            var cores = this.options.cores || {}, tipo = feature.geometry.type;
+            if (tipo === "LineString" || tipo === "MultiLineString") return {color: "#555555", weight: 1, fill: false};
+            return {stroke: false, fillColor: cores[feature.properties.id] || "#CCCCCC", fillOpacity: 0.35};
+        },
+        createTile: function(coords, pronto) {
+            var tile = document.createElement("div"), chave = this._tileCoordsToKey(coords), self = this;
+            fetch(L.Util.template(this._url, coords))
+                .then(function(resposta) { return resposta.status === 200 ? resposta.json() : null; })
+                .then(function(dados) {
+                    if (dados && self._map && self._tiles[chave]) {
+                        self._partes[chave] = L.geoJSON(dados, {
+                            style: function(f) { return self._estilo(f); },
+                            onEachFeature: function(f, camada) {
+                                if (f.geometry.type.indexOf("Polygon") >= 0 && f.properties.Name) camada.bindTooltip("<b>Regional:</b> " + esc(f.properties.Name), {sticky: true});
+                            }
+                        }).addTo(self._map);
+                    }
+                    pronto(null, tile);
+                }, function(erro) { pronto(erro, tile); });
+            return tile;
+        },
+        _removerParte: function(chave) {
+            if (this._partes[chave]) { this._partes[chave].remove(); delete this._partes[chave]; }
+        },
+        onRemove: function(map) {
+            for (var chave in this._partes) this._removerParte(chave);
+            L.GridLayer.prototype.onRemove.call(this, map);
+        }
+    });
+    // Busca e filtro por tipo no navegador: tokens sem acento, cada termo casa com o começo de algum token
+    // e todos os termos precisam casar (como core.busca). Unidade escondida sai da camada da sua categoria.
+    var busca = (function() {
+        var unidades = [], indice = null, ativas = {}, termos = [], ouvintes = [];
+        function tokenizar(texto) {
+            return String(texto == null ? "" : texto).normalize("NFKD").replace(/[\\u0300-\\u036f]/g, "").toLowerCase().match(/[0-9a-z]+/g) || [];
+        }
+        function montarIndice() {
+            var postagens = {};
+            unidades.forEach(function(u, posicao) {
+                var p = u.camada.feature.properties;
+                tokenizar([p.n, p.t, p.r].join(" ")).forEach(function(token) { (postagens[token] = postagens[token] || []).push(posicao); });
+            });
+            return {tokens: Object.keys(postagens).sort(), postagens: postagens};
+        }
+        function comPrefixo(termo) {
+            var tokens = indice.tokens, ini = 0, fim = tokens.length, achadas = {};
+            while (ini < fim) { var meio = (ini + fim) >> 1; if (tokens[meio] < termo) ini = meio + 1; else fim = meio; }
+            for (var i = ini; i < tokens.length && tokens[i].lastIndexOf(termo, 0) === 0; i++) {
+                indice.postagens[tokens[i]].forEach(function(posicao) { achadas[posicao] = true; });
+            }
+            return achadas;
+        }
+        function aplicar() {
+            if (termos.length && !indice) indice = montarIndice();
+            var conjuntos = termos.map(comPrefixo), visiveis = 0;
+            unidades.forEach(function(u, posicao) {
+                var mostrar = ativas[u.categoria] !== false && conjuntos.every(function(c) { return c[posicao]; });
+                if (mostrar !== u.visivel) {
+                    if (mostrar) u.grupo.addLayer(u.camada); else u.grupo.removeLayer(u.camada);
+                    u.visivel = mostrar;
+                }
+                if (mostrar) visiveis++;
+            });
+            ouvintes.forEach(function(f) { f(); });
+            return visiveis;
+        }
+        function controle(mapa, opcoes) {
+            var Controle = L.Control.extend({
+                options: {position: "topright"},
+                onAdd: function() {
+                    var div = L.DomUtil.create("div", "pc-busca"), contagem;
+                    var campo = L.DomUtil.create("input", "", div);
+                    campo.type = "search"; campo.placeholder = opcoes.texto; campo.setAttribute("aria-label", opcoes.texto);
+                    contagem = L.DomUtil.create("div", "pc-busca-contagem", div);
+                    function atualizar() {
+                        var n = aplicar();
+                        contagem.textContent = n === 1 ? "1 unidade" : n + " unidades";
+                    }
+                    campo.addEventListener("input", function() { termos = Array.from(new Set(tokenizar(campo.value))); atualizar(); });
+                    var tipos = L.DomUtil.create("details", "", div);
+                    L.DomUtil.create("summary", "", tipos).textContent = "Tipos de unidade";
+                    opcoes.categorias.forEach(function(c) {
+                        var rotulo = L.DomUtil.create("label", "", tipos), marcar = L.DomUtil.create("input", "", rotulo);
+                        marcar.type = "checkbox"; marcar.checked = true;
+                        if (c.classe) L.DomUtil.create("span", "pc-icone " + c.classe, rotulo);
+                        rotulo.appendChild(document.createTextNode(c.rotulo));
+                        marcar.addEventListener("change", function() { ativas[c.chave] = marcar.checked; atualizar(); });
+                    });
+                    L.DomEvent.disableClickPropagation(div);
+                    L.DomEvent.disableScrollPropagation(div);
+                    atualizar();
+                    return div;
+                }
+            });
+            return new Controle().addTo(mapa);
+        }
+        return {
+            registrar: function(grupo, categoria) {
+                grupo.eachLayer(function(camada) { unidades.push({camada: camada, grupo: grupo, categoria: categoria, visivel: true}); });
+                indice = null;
+            },
+            filtrar: function(consulta) { termos = Array.from(new Set(tokenizar(consulta))); return aplicar(); },
+            ativa: function(categoria) { return ativas[categoria] !== false; },
+            buscando: function() { return termos.length > 0; },
+            aoMudar: function(f) { ouvintes.push(f); },
+            controle: controle
+        };
+    })();
+    function iconeAgrupado(q) {
+        var d = Math.round(26 + 8 * Math.log10(q));
+        return L.divIcon({className: "pc-agrupado", html: "<span>" + q + "</span>", iconSize: [d, d]});
+    }
+    // Nível de detalhe (core.densidade): abaixo de zoomMarcadores, bolhas com a quantidade de unidades de cada célula
+    // no lugar das camadas de unidades, contando só os tipos visíveis. Com termos na busca, as unidades achadas aparecem.
+    // As bolhas entram no mapa depois da inicialização do st_folium, que então não trata o clique nelas como clique numa unidade.
+    var niveis = (function() {
+        var mapa = null, dados = null, camadas = [], grupos = {}, bolhas = null;
+        function visivel(categoria) {
+            return busca.ativa(categoria) && (!grupos[categoria] || grupos[categoria].some(function(g) { return mapa.hasLayer(g); }));
+        }
+        function nivelDoZoom(zoom) {
+            var zooms = Object.keys(dados.niveis).map(Number), z = Math.max(Math.floor(zoom), Math.min.apply(null, zooms));
+            return {zoom: z, celulas: dados.niveis[z] || []};
+        }
+        function bolha(celula, q, partes, zoom) {
+            var marcador = L.marker([celula[0], celula[1]], {icon: iconeAgrupado(q)});
+            marcador.bindTooltip("<b>" + q + (q === 1 ? " unidade" : " unidades") + "</b><br>" + partes.join("<br>"), {sticky: true});
+            marcador.on("click", function() { mapa.setView(marcador.getLatLng(), Math.min(zoom + 2, dados.zoomMarcadores)); });
+            return marcador;
+        }
+        function atualizar() {
+            if (!mapa) return;
+            var agregar = mapa.getZoom() < dados.zoomMarcadores && !busca.buscando();
+            camadas.forEach(function(c) {
+                if (agregar === !c.presente) return;
+                if (agregar) c.grupo.removeLayer(c.camada); else c.grupo.addLayer(c.camada);
+                c.presente = !agregar;
+            });
+            if (bolhas) { bolhas.remove(); bolhas = null; }
+            if (!agregar) return;
+            var nivel = nivelDoZoom(mapa.getZoom()), ativas = dados.categorias.map(visivel), marcadores = [];
+            nivel.celulas.forEach(function(celula) {
+                var q = 0, partes = [];
+                for (var i = 0; i < ativas.length; i++) {
+                    var n = celula[2 + i];
+                    if (ativas[i] && n) { q += n; partes.push(esc(dados.rotulos[i]) + ": " + n); }
+                }
+                if (q) marcadores.push(bolha(celula, q, partes, nivel.zoom));
+            });
+            bolhas = L.layerGroup(marcadores).addTo(mapa);
+        }
+        return {
+            registrar: function(camada, grupo, categoria) {
+                camadas.push({camada: camada, grupo: grupo, presente: true});
+                (grupos[categoria] = grupos[categoria] || []).push(grupo);
+            },
+            iniciar: function(m, d) {
+                dados = d;
+                setTimeout(function() {
+                    mapa = m;
+                    mapa.on("zoomend overlayadd overlayremove", atualizar);
+                    busca.aoMudar(atualizar);
+                    atualizar();
+                }, 0);
+            }
+        };
+    })();
+    var icones = {};
+    function icone(classe) {
+        if (!classe) return L.AwesomeMarkers.icon({icon: "leaf", prefix: "fa", markerColor: "green"});
+        return icones[classe] || (icones[classe] = L.divIcon({className: "pc-icone " + classe, iconSize: [25, 25], iconAnchor: [0, 20], popupAnchor: [0, -10]}));
+    }
+    return {
+        popup: popup,
+        tooltip: tooltip,
+        pontoParaMarcador: function(classe) {
+            var ic = icone(classe);
+            return function(feature, latlng) { return L.marker(latlng, {icon: ic}); };
+        },
+        aoCriarUnidade: function(feature, layer) {
+            layer.bindPopup(popup(feature.properties), {maxWidth: 450});
+            layer.bindTooltip(tooltip(feature.properties), {sticky: true});
+        },
+        pontoAgrupado: function(feature, latlng) { return L.marker(latlng, {icon: iconeAgrupado(feature.properties.q)}); },
+        aoCriarAgrupado: function(feature, layer) {
+            layer.bindTooltip(feature.properties.q + " unidades. Clique para aproximar.", {sticky: true});
+        },
+        camadaTiles: function(url, opcoes) { return new CamadaTiles(url, opcoes); },
+        // A posição achada pelo LocateControl vira um clique no mapa, que o st_folium devolve como last_clicked.
+        localizacaoComoClique: function(mapa, distanciaMinima) {
+            var ultima = null;
+            mapa.on("locationfound", function(e) {
+                if (ultima && ultima.distanceTo(e.latlng) < distanciaMinima) return;
+                ultima = e.latlng;
+                mapa.fire("click", {latlng: e.latlng});
+            });
+        },
+        busca: busca,
+        niveis: niveis
+    };
+})();
+"""
+
+def recursos_mapa(icones: dict) -> MacroElement:
+    """CSS (com cada ícone como data URI uma única vez) e JS compartilhados por legenda e camadas de unidades."""
+    classes_por_uri = {}
+    for num, uri in icones.items():
+        if uri: classes_por_uri.setdefault(uri, []).append(f".{classe_icone(num)}")
+    regras_icones = "".join(f'{", ".join(classes)} {{ background-image: url("{uri}"); }}\n' for uri, classes in classes_por_uri.items())
+    elemento = MacroElement()
+    elemento._template = Template("""
+        {% macro header(this, kwargs) %}<style>{{ this.css }}</style>{% endmacro %}
+        {% macro script(this, kwargs) %}{{ this.js }}{% endmacro %}
+    """)
+    elemento.css, elemento.js = CSS_MAPA + regras_icones, JS_MAPA
+    return elemento
+
+class CamadaTiles(Layer):
+    """Camada de tiles GeoJSON servidos pelo ServidorTiles, desenhada por plantaContagem.camadaTiles."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = plantaContagem.camadaTiles({{ this.url|tojson }}, {{ this.opcoes|tojson }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, url: str, opcoes: dict, name: str | None = None, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=True, control=control, show=show)
+        self._name = "CamadaTiles"
+        self.url, self.opcoes = url, opcoes
+
+    def render(self, **kwargs):
+        if self.show:
+            self.add_child(ElementAddToElement(element_name=self.get_name(), element_parent_name=self._parent.get_name()), name=self.get_name() + "_add")
+        super().render(**kwargs)
+
+def camada_limites_tiles(servidor: ServidorTiles, url_tiles: str) -> CamadaTiles:
+    """Limites das regionais em tiles; url_tiles é o endereço do servidor visto pelo navegador."""
+    camada = servidor.arquivo.metadados()["camadas"][CAMADA_LIMITES]
+    return CamadaTiles(f"{url_tiles}/{CAMADA_LIMITES}/{{z}}/{{x}}/{{y}}.geojson", {
+        "cores": MAPEAMENTO_CORES,
+        "minNativeZoom": camada["zoom_minimo"],
+        "maxNativeZoom": camada["zoom_maximo"],
+        "bounds": camada["limites"],
+    }, name='Regionais')
+
+class RegistroBusca(MacroElement):
+    """Inclui os marcadores de uma camada de unidades na busca do navegador (plantaContagem.busca)."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}plantaContagem.busca.registrar({{ this.camada.get_name() }}, {{ this.categoria|tojson }});{% endmacro %}
+    """)
+
+    def __init__(self, camada, categoria: str):
+        super().__init__()
+        self._name = "RegistroBusca"
+        self.camada, self.categoria = camada, categoria
+
+class RegistroNiveis(MacroElement):
+    """Inclui uma camada de unidades no nível de detalhe (plantaContagem.niveis): em zoom baixo, ela dá lugar às bolhas."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}plantaContagem.niveis.registrar({{ this.camada.get_name() }}, {{ this._parent.get_name() }}, {{ this.categoria|tojson }});{% endmacro %}
+    """)
+
+    def __init__(self, camada, categoria: str):
+        super().__init__()
+        self._name = "RegistroNiveis"
+        self.camada, self.categoria = camada, categoria
+
+class CamadaDensidade(MacroElement):
+    """Bolhas com a quantidade de unidades por área em zoom baixo, a partir dos agregados de core.densidade."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}plantaContagem.niveis.iniciar({{ this._parent.get_name() }}, {{ this.dados|tojson }});{% endmacro %}
+    """)
+
+    def __init__(self, densidade: NiveisDensidade):
+        super().__init__()
+        self._name = "CamadaDensidade"
+        self.dados = densidade.para_navegador()
+
+class ControleBusca(MacroElement):
+    """Caixa de busca e filtro por tipo dentro do mapa."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}plantaContagem.busca.controle({{ this._parent.get_name() }}, {{ this.opcoes|tojson }});{% endmacro %}
+    """)
+
+    def __init__(self, categorias: list):
+        super().__init__()
+        self._name = "ControleBusca"
+        self.opcoes = {"texto": TEXTO_BUSCA, "categorias": categorias}
+
+class LocalizacaoComoClique(MacroElement):
+    """Envia a posição do usuário (LocateControl) ao Python como um clique no mapa."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}plantaContagem.localizacaoComoClique({{ this._parent.get_name() }}, {{ this.distancia_minima }});{% endmacro %}
+    """)
+
+    def __init__(self, distancia_minima: float = 25):
+        super().__init__()
+        self._name = "LocalizacaoComoClique"
+        self.distancia_minima = distancia_minima
+
+def categoria_busca(num) -> str:
+    return str(num) if num is not None else "outras"
+
+def colecao_unidades(data) -> dict:
+    """FeatureCollection de pontos montada coluna a coluna, só com os campos usados nos modelos de JS_MAPA."""
+    nomes, tipos = _coluna_texto(data, 'Nome'), _coluna_texto(data, 'Tipo')
+    regionais, instagrams = _coluna_texto(data, 'Regional'), _coluna_texto(data, 'Instagram', '')
+    links = _coluna_texto(data, COLUNA_LINK_INSTAGRAM, '')
+    lats = data['lat'].to_numpy(dtype=float).round(PRECISAO_COORDENADAS)
+    lons = data['lon'].to_numpy(dtype=float).round(PRECISAO_COORDENADAS)
+    features = []
+    for nome, tipo, regional, instagram, link, lat, lon in zip(nomes, tipos, regionais, instagrams, links, lats.tolist(), lons.tolist()):
+        props = {"n": nome, "t": tipo, "r": regional}
+        if instagram: props["i"] = instagram
+        if link: props["l"] = link
+        features.append({"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": props})
+    return {"type": "FeatureCollection", "features": features}
+
+def adicionar_camadas_unidades(data, feature_groups, default_feature_group, icones, busca_navegador=False, niveis=False):
+    """Uma única camada GeoJSON por categoria de ICONES_DEFINIDOS, dentro do FeatureGroup da categoria.
+
+    Os dados vêm da carga (core.dados), sem coordenadas ou Numeral vazios. Com niveis, cada camada entra
+    no nível de detalhe (ver CamadaDensidade).
+    """
+    numerais = data['Numeral']
+    conhecidos = numerais.isin(list(feature_groups))
+    default_group_needed = bool((~conhecidos).any())
+
+    grupos = [(num, data[numerais == num]) for num in feature_groups]
+    grupos.append((None, data[~conhecidos]))
+    for num, unidades in grupos:
+        if unidades.empty: continue
+        classe = classe_icone(num) if icones.get(num) else None
+        camada = folium.GeoJson(
+            colecao_unidades(unidades),
+            control=False,
+            pointToLayer=JsCode(f"plantaContagem.pontoParaMarcador({json.dumps(classe)})"),
+            on_each_feature=JsCode("plantaContagem.aoCriarUnidade"),
+        )
+        grupo = feature_groups[num] if num is not None else default_feature_group
+        camada.add_to(grupo)
+        if busca_navegador: RegistroBusca(camada, categoria_busca(num)).add_to(grupo)
+        if niveis: RegistroNiveis(camada, categoria_busca(num)).add_to(grupo)
+    return default_group_needed
+
+def grupos_unidades(data, icones) -> list:
+    """FeatureGroups das categorias que têm unidades em data, para o modo por área visível."""
+    feature_groups = {num: folium.FeatureGroup(name=props["label"], show=True) for num, props in ICONES_DEFINIDOS.items()}
+    default_feature_group = folium.FeatureGroup(name='Outras Categorias', show=True)
+    adicionar_camadas_unidades(data, feature_groups, default_feature_group, icones)
+    return [grupo for grupo in [*feature_groups.values(), default_feature_group] if grupo._children]
+
+def grupo_agrupado(agrupados) -> folium.FeatureGroup:
+    """Uma bolha com a quantidade de unidades por célula, para zoom baixo com muitas unidades."""
+    grupo = folium.FeatureGroup(name='Unidades (agrupadas)', show=True)
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [round(lon, PRECISAO_COORDENADAS), round(lat, PRECISAO_COORDENADAS)]},
+             "properties": {"q": q}}
+            for lat, lon, q in zip(agrupados['lat'].tolist(), agrupados['lon'].tolist(), agrupados['quantidade'].tolist())
+        ]},
+        control=False,
+        pointToLayer=JsCode("plantaContagem.pontoAgrupado"),
+        on_each_feature=JsCode("plantaContagem.aoCriarAgrupado"),
+    ).add_to(grupo)
+    return grupo
+
+def icones_mapa() -> dict:
+    icones = {key: icone_data_uri(props["file"]) for key, props in ICONES_DEFINIDOS.items()}
+    icones[None] = icone_data_uri(ICONE_PADRAO_ARQUIVO)
+    return icones
+
+def criar_mapa(data, geojson_data, modo_marcadores=MODO_MARCADORES, resumo: ResumoRegionais | None = None, controle_camadas=True,
+               busca_navegador=False, camada_limites: Layer | None = None, densidade: NiveisDensidade | None = None):
+    """Mapa completo. Com busca_navegador, as categorias saem do controle de camadas e vão para a busca dentro do mapa.
+
+    camada_limites substitui o GeoJSON das regionais embutido (ex.: camada_limites_tiles). Com densidade (os
+    agregados de core.densidade dos mesmos dados), abaixo de ZOOM_MARCADORES o mapa mostra bolhas no lugar dos ícones.
+    """
+    m = folium.Map(location=CENTRO_INICIAL_MAPA, tiles="cartodbpositron", zoom_start=ZOOM_INICIAL_MAPA, control_scale=True)
+    icones = icones_mapa()
+    recursos_mapa(icones).add_to(m)
+    if camada_limites is not None:
+        camada_limites.add_to(m)
+    elif geojson_data and isinstance(geojson_data, dict) and geojson_data.get("features"):
+        folium.GeoJson( geojson_data, name='Regionais',
+            style_function=lambda x: {"fillColor": MAPEAMENTO_CORES.get(x['properties'].get('id'), "#CCCCCC"), "color": "#555555", "weight": 1, "fillOpacity": 0.35},
+            tooltip=folium.GeoJsonTooltip(fields=["Name"], aliases=["Regional:"]),
+            highlight_function=lambda x: {"weight": 2.5, "fillOpacity": 0.6, "color": "black"},
+            interactive=True, control=True, show=True).add_to(m)
+    legenda_element = criar_legenda(geojson_data, resumo)
+    if legenda_element: m.get_root().html.add_child(legenda_element)
+
+    if isinstance(data, pd.DataFrame) and not data.empty:
+        busca_navegador = busca_navegador and modo_marcadores != "individual"
+        feature_groups = {num: folium.FeatureGroup(name=props["label"], show=True, control=not busca_navegador) for num, props in ICONES_DEFINIDOS.items()}
+        default_feature_group = folium.FeatureGroup(name='Outras Categorias', show=True, control=not busca_navegador)
+        if modo_marcadores == "individual":
+            icon_base64_cache = {key: uri for key, uri in icones.items() if key is not None}
+            default_group_needed = adicionar_marcadores_individuais(data, feature_groups, default_feature_group, icon_base64_cache, icones[None])
+        else:
+            densidade = densidade if densidade is not None and densidade.niveis else None
+            default_group_needed = adicionar_camadas_unidades(data, feature_groups, default_feature_group, icones, busca_navegador,
+                                                              niveis=densidade is not None)
+            if densidade is not None: CamadaDensidade(densidade).add_to(m)
+
+        for group in feature_groups.values(): group.add_to(m)
+        if default_group_needed: default_feature_group.add_to(m)
+        if busca_navegador:
+            categorias = [{"chave": categoria_busca(num), "rotulo": props["label"], "classe": classe_icone(num)}
+                          for num, props in sorted(ICONES_DEFINIDOS.items()) if feature_groups[num]._children]
+            if default_group_needed: categorias.append({"chave": categoria_busca(None), "rotulo": "Outras Categorias", "classe": classe_icone(None)})
+            ControleBusca(categorias).add_to(m)
+
+    LocateControl(strings={"title":"Mostrar minha localização", "popup":"Você está aqui"}).add_to(m)
+    LocalizacaoComoClique().add_to(m)
+    if controle_camadas: folium.LayerControl(position='bottomleft').add_to(m)
+    return m
+
+def bytes_camadas(grupos) -> int:
+    """Tamanho aproximado das camadas dinâmicas enviadas ao st_folium: o JSON das unidades de cada camada."""
+    return sum(len(json.dumps(camada.data)) for grupo in grupos for camada in grupo._children.values() if hasattr(camada, 'data'))
+
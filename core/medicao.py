@@ -0,0 +1,93 @@
+"""Tempo de cada fase de um rerun e log de desempenho em JSON lines.
+
+Cada rerun de uma sessão gera uma MedicaoRerun: as fases (carga dos dados,
+limites, montagem do mapa, st_folium...) são medidas com `with medicao.fase(...)`
+e, no fim, uma linha JSON vai para o log, com a sessão, o motivo do rerun, as
+durações, os acertos/falhas de cache e o tamanho do que foi enviado ao
+navegador. O log é rotacionado ao passar de TAMANHO_MAXIMO_LOG.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from core.caminhos import DIRETORIO_CACHE
+
+VARIAVEL_CAMINHO_LOG = "PLANTA_LOG_DESEMPENHO"  # caminho do log; vazia desliga o log
+CAMINHO_LOG_PADRAO = DIRETORIO_CACHE / "desempenho.jsonl"
+TAMANHO_MAXIMO_LOG = 5 * 1024 * 1024
+
+
+class MedicaoRerun:
+    def __init__(self, sessao: str, causa: str, relogio=time.perf_counter):
+        self.sessao = sessao
+        self.causa = causa
+        self.fases: dict[str, float] = {}
+        self.cache: dict[str, str] = {}
+        self.valores: dict = {}
+        self._relogio = relogio
+        self._inicio = relogio()
+        self._fim = None
+
+    @contextmanager
+    def fase(self, nome: str):
+        """Soma ao tempo da fase `nome` a duração do bloco, mesmo que ele termine num st.rerun()."""
+        inicio = self._relogio()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0.0) + self._relogio() - inicio
+
+    def registrar_cache(self, nome: str, acerto: bool) -> None:
+        self.cache[nome] = "acerto" if acerto else "falha"
+
+    def anotar(self, **valores) -> None:
+        self.valores.update(valores)
+
+    def encerrar(self, desfecho: str = "completo") -> dict:
+        """Fecha a medição (só a primeira chamada conta) e retorna o registro do rerun."""
+        if self._fim is None:
+            self._fim = self._relogio()
+            self.valores.setdefault("desfecho", desfecho)
+        return self.registro()
+
+    def registro(self) -> dict:
+        fim = self._fim if self._fim is not None else self._relogio()
+        return {
+            "ts": round(time.time(), 3),
+            "sessao": self.sessao,
+            "causa": self.causa,
+            "total_ms": round((fim - self._inicio) * 1000, 2),
+            "fases_ms": {nome: round(duracao * 1000, 2) for nome, duracao in self.fases.items()},
+            "cache": dict(self.cache),
+            **self.valores,
+        }
+
+
+class LogDesempenho:
+    """Arquivo JSON lines com um registro por rerun, compartilhado pelas sessões do processo."""
+
+    def __init__(self, caminho: Path, tamanho_maximo: int = TAMANHO_MAXIMO_LOG):
+        self.caminho = Path(caminho)
+        self.tamanho_maximo = tamanho_maximo
+        self._trava = threading.Lock()
+
+    def gravar(self, registro: dict) -> None:
+        linha = json.dumps(registro, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._trava:
+            try:
+                self.caminho.parent.mkdir(parents=True, exist_ok=True)
+                if self.caminho.exists() and self.caminho.stat().st_size >= self.tamanho_maximo:
+                    os.replace(self.caminho, self.caminho.with_name(self.caminho.name + ".1"))
+                with open(self.caminho, "a", encoding="utf-8") as f:
+                    f.write(linha)
+            except OSError as e:
+                print(f"Erro ao gravar log de desempenho em {self.caminho}: {e}")
+
+
+def log_padrao() -> LogDesempenho | None:
+    """Log no caminho de PLANTA_LOG_DESEMPENHO (padrão: data/cache/desempenho.jsonl), ou None se ela estiver vazia."""
+    caminho = os.environ.get(VARIAVEL_CAMINHO_LOG, str(CAMINHO_LOG_PADRAO))
+    return LogDesempenho(Path(caminho)) if caminho else None
@@ -0,0 +1,174 @@
+"""Derivação de miniaturas das fotos para a galeria da página Saiba Mais.
+
+Cada foto de `images/fotos` ganha versões redimensionadas em algumas larguras,
+em WebP e JPEG, gravadas em `static/miniaturas/` e servidas pelo static
+serving do Streamlit. Um manifesto em disco guarda o que já foi gerado. Ele só
+é refeito para uma foto quando o hash dela (do registro de assets), as
+larguras ou a versão do pipeline mudam. Cada variante é gravada num arquivo
+temporário e só então ganha o nome final, e a limpeza só apaga o que o
+manifesto anterior registra, então vários processos podem derivar na mesma
+pasta ao mesmo tempo.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from core.assets import DIRETORIO_STATIC, URL_STATIC, RegistroAssets, registro_padrao
+
+VERSAO_PIPELINE = 1
+PASTA_MINIATURAS = "miniaturas"
+LARGURAS = (320, 640, 1280)
+FORMATOS = {
+    "webp": ("WEBP", {"quality": 78, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+}
+NOME_MANIFESTO = "manifesto.json"
+
+
+@dataclass(frozen=True)
+class Variante:
+    largura: int
+    altura: int
+    formato: str
+    arquivo: str
+    bytes: int
+
+
+@dataclass(frozen=True)
+class FotoDerivada:
+    chave: str
+    hash_origem: str
+    largura: int
+    altura: int
+    variantes: tuple[Variante, ...]
+
+    def do_formato(self, formato: str) -> list[Variante]:
+        return sorted((v for v in self.variantes if v.formato == formato), key=lambda v: v.largura)
+
+
+def _salvar_atomicamente(imagem: Image.Image, caminho: Path, formato_pil: str, opcoes: dict) -> None:
+    """Quem lê o arquivo (ou um processo que caiu no meio) nunca vê uma imagem pela metade."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            imagem.save(f, formato_pil, **opcoes)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, caminho)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def ordem_natural(chave: str):
+    """'fotos/10.jpeg' depois de 'fotos/9.jpeg'."""
+    return [int(parte) if parte.isdigit() else parte.lower() for parte in re.split(r"(\d+)", chave)]
+
+
+class PipelineMiniaturas:
+    def __init__(self, registro: RegistroAssets, destino: Path = DIRETORIO_STATIC / PASTA_MINIATURAS,
+                 url_base: str = f"{URL_STATIC}/{PASTA_MINIATURAS}", larguras=LARGURAS):
+        self.registro = registro
+        self.destino = Path(destino)
+        self.url_base = url_base.rstrip("/")
+        self.larguras = tuple(sorted(larguras))
+        self._trava = threading.Lock()
+        self.geradas = 0
+
+    def url(self, variante: Variante) -> str:
+        return f"{self.url_base}/{variante.arquivo}"
+
+    def srcset(self, foto: FotoDerivada, formato: str) -> str:
+        return ", ".join(f"{self.url(v)} {v.largura}w" for v in foto.do_formato(formato))
+
+    def _assinatura(self) -> dict:
+        return {"versao": VERSAO_PIPELINE, "larguras": list(self.larguras), "formatos": sorted(FORMATOS)}
+
+    def _ler_manifesto_bruto(self) -> dict:
+        try:
+            with open(self.destino / NOME_MANIFESTO, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _ler_manifesto(self) -> dict:
+        manifesto = self._ler_manifesto_bruto()
+        if manifesto.get("assinatura") != self._assinatura():
+            return {}
+        return manifesto.get("fotos", {})
+
+    def _gravar_manifesto(self, fotos: dict) -> None:
+        self.destino.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.destino, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"assinatura": self._assinatura(), "fotos": fotos}, f, ensure_ascii=False, indent=1)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.destino / NOME_MANIFESTO)
+
+    def _derivar(self, chave: str) -> dict:
+        asset = self.registro[chave]
+        base = os.path.splitext(chave)[0]
+        with Image.open(asset.caminho) as original:
+            imagem = ImageOps.exif_transpose(original).convert("RGB")
+        largura, altura = imagem.size
+        # Nunca amplia: larguras maiores que a original viram uma única variante do tamanho original.
+        alvos = sorted({min(l, largura) for l in self.larguras})
+        variantes = []
+        for alvo in alvos:
+            redimensionada = imagem if alvo == largura else imagem.resize((alvo, round(altura * alvo / largura)), Image.LANCZOS)
+            for formato, (formato_pil, opcoes) in FORMATOS.items():
+                arquivo = f"{base}.{asset.hash}.{alvo}.{formato}"
+                caminho = self.destino / arquivo
+                _salvar_atomicamente(redimensionada, caminho, formato_pil, opcoes)
+                variantes.append({"largura": alvo, "altura": redimensionada.size[1], "formato": formato,
+                                  "arquivo": arquivo, "bytes": caminho.stat().st_size})
+        self.geradas += 1
+        return {"hash": asset.hash, "largura": largura, "altura": altura, "variantes": variantes}
+
+    def gerar(self, chaves) -> dict[str, FotoDerivada]:
+        """Garante as variantes das fotos pedidas, reaproveitando o que o manifesto já registra."""
+        with self._trava:
+            anterior = self._ler_manifesto_bruto()
+            manifesto = self._ler_manifesto()
+            fotos, mudou = {}, False
+            for chave in chaves:
+                entrada = manifesto.get(chave)
+                valida = (entrada is not None and entrada.get("hash") == self.registro[chave].hash
+                          and all((self.destino / v["arquivo"]).exists() for v in entrada["variantes"]))
+                if not valida:
+                    entrada, mudou = self._derivar(chave), True
+                fotos[chave] = entrada
+            if mudou or set(fotos) != set(manifesto):
+                self._remover_orfaos(anterior, fotos)
+                self._gravar_manifesto(fotos)
+        return {
+            chave: FotoDerivada(chave, e["hash"], e["largura"], e["altura"], tuple(Variante(**v) for v in e["variantes"]))
+            for chave, e in fotos.items()
+        }
+
+    def _remover_orfaos(self, anterior: dict, fotos: dict) -> None:
+        """Apaga as variantes do manifesto anterior (mesmo de outra assinatura) que não estão mais em uso."""
+        em_uso = {v["arquivo"] for e in fotos.values() for v in e["variantes"]}
+        registradas = {v.get("arquivo") for e in anterior.get("fotos", {}).values() for v in e.get("variantes", [])}
+        for arquivo in registradas - em_uso - {None}:
+            (self.destino / arquivo).unlink(missing_ok=True)
+
+
+_pipeline: PipelineMiniaturas | None = None
+_trava_pipeline = threading.Lock()
+
+
+def pipeline_padrao() -> PipelineMiniaturas:
+    global _pipeline
+    if _pipeline is None:
+        with _trava_pipeline:
+            if _pipeline is None:
+                _pipeline = PipelineMiniaturas(registro_padrao())
+    return _pipeline
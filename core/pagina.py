@@ -0,0 +1,50 @@
+"""Partes de página comuns ao mapa e ao "Saiba Mais": imagens locais, logo da prefeitura e rodapé.
+
+Usa só o Streamlit e o registro de imagens (core.assets), para que a página
+"Saiba Mais" abra sem carregar as bibliotecas do mapa e dos dados.
+"""
+import html
+import os
+
+import streamlit as st
+
+from core.assets import registro_padrao
+from core.config import LOGO_PMC, PMC_PORTAL_URL, RODAPE_PAGINA
+
+ALTURA_BASE_BANNER_PX = 50
+
+
+def url_asset(chave: str) -> str:
+    """src de imagem local (ver core.assets), servida pelo static serving do Streamlit."""
+    return registro_padrao().src(chave, st.get_option("server.enableStaticServing"))
+
+
+def html_banner(url: str, nome: str, link_url: str | None, scale: float = 1.0, offset_y: int = 0) -> str:
+    """Html de um banner do rodapé, com a altura escalada e deslocamento vertical."""
+    altura = int(ALTURA_BASE_BANNER_PX * scale)
+    estilo_img = "; ".join(filter(None, [
+        "height: auto", "width: auto", "max-width: 100%", f"max-height: {altura}px", "object-fit: contain",
+        "display: block", "margin-left: auto", "margin-right: auto", f"margin-top: {offset_y}px" if offset_y else "",
+    ]))
+    estilo_caixa = "; ".join([
+        "display: flex", "justify-content: center", "align-items: center",
+        f"min-height: {altura}px", "overflow: hidden", "width: 100%", "padding: 5px",
+    ])
+    imagem = f'<img src="{html.escape(url)}" alt="Banner {html.escape(nome)}" style="{estilo_img}">'
+    if link_url:
+        return f'<div style="{estilo_caixa}"><a href="{link_url}" target="_blank" rel="noopener noreferrer">{imagem}</a></div>'
+    return f'<div style="{estilo_caixa}">{imagem}</div>'
+
+
+def exibir_logo_pmc() -> None:
+    st.markdown('<div data-testid="column-PMC-logo">', unsafe_allow_html=True)
+    st.markdown(f'<a href="{PMC_PORTAL_URL}" target="_blank"><img src="{url_asset(LOGO_PMC)}"></a>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def exibir_rodape() -> None:
+    """Uma linha de banners (RODAPE_PAGINA), cada um na sua coluna."""
+    for coluna, banner in zip(st.columns(len(RODAPE_PAGINA)), RODAPE_PAGINA):
+        with coluna:
+            st.markdown(html_banner(url_asset(banner["asset"]), os.path.basename(banner["asset"]), banner["link"],
+                                    banner.get("scale", 1.0), banner.get("offset_y", 0)), unsafe_allow_html=True)
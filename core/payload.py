@@ -0,0 +1,28 @@
+"""Medição do tamanho do HTML do mapa enviado ao navegador.
+
+O relatório separa o que costuma pesar no documento: imagens embutidas como
+data URI e os dados GeoJSON (limites e unidades). O tamanho comprimido com
+gzip dá uma ideia do que de fato trafega na rede.
+"""
+import gzip
+import re
+
+_RE_DATA_URI = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+# O folium embute cada camada GeoJSON como `<nome>_add({...});`, sempre numa única linha.
+_RE_GEOJSON = re.compile(r"_add\((\{[^\n]*\})\);")
+
+
+def relatorio_payload(html: str) -> dict:
+    bruto = html.encode("utf-8")
+    return {
+        "bytes": len(bruto),
+        "gzip": len(gzip.compress(bruto, compresslevel=6)),
+        "data_uris": sum(len(m) for m in _RE_DATA_URI.findall(html)),
+        "geojson": sum(len(m) for m in _RE_GEOJSON.findall(html)),
+    }
+
+
+def formatar_relatorio(relatorio: dict) -> str:
+    kb = {chave: valor / 1024 for chave, valor in relatorio.items()}
+    return (f"{kb['bytes']:.1f} KB ({kb['gzip']:.1f} KB gzip); "
+            f"data URIs {kb['data_uris']:.1f} KB, GeoJSON {kb['geojson']:.1f} KB")
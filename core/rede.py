@@ -0,0 +1,38 @@
+"""Sessão HTTP compartilhada, com pool de conexões e novas tentativas.
+
+Os downloads do app passam por uma `requests.Session` que mantém as conexões
+abertas entre requisições e, em falhas de conexão ou respostas 429/5xx, tenta
+de novo algumas vezes com espera exponencial e um sorteio (jitter), para que
+vários processos reiniciados juntos não batam no servidor no mesmo instante.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TENTATIVAS = 3
+FATOR_ESPERA_S = 0.5  # esperas de ~0, 1 e 2 s entre as tentativas
+JITTER_ESPERA_S = 0.3
+ESPERA_MAXIMA_S = 8
+STATUS_REPETIVEIS = (429, 500, 502, 503, 504)
+CONEXOES_POR_HOST = 8
+
+
+def politica_tentativas(tentativas: int = TENTATIVAS) -> Retry:
+    return Retry(
+        total=tentativas,
+        backoff_factor=FATOR_ESPERA_S,
+        backoff_jitter=JITTER_ESPERA_S,
+        backoff_max=ESPERA_MAXIMA_S,
+        status_forcelist=STATUS_REPETIVEIS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # Depois da última tentativa a resposta de erro é devolvida; quem chamou decide com raise_for_status().
+        raise_on_status=False,
+    )
+
+
+def sessao_http(tentativas: int = TENTATIVAS, conexoes: int = CONEXOES_POR_HOST) -> requests.Session:
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=politica_tentativas(tentativas))
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
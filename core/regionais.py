@@ -0,0 +1,92 @@
+"""Regional de cada unidade calculada pelas coordenadas, e contagens por regional.
+
+A coluna Regional da planilha é digitada à mão. Na carga, cada unidade é
+localizada nos polígonos de `regionais_contagem.geojson` (sem simplificação)
+de uma vez só: os pontos são consultados em lote numa STRtree montada sobre
+os polígonos. O valor digitado fica guardado em `Regional_planilha` e
+continua valendo para as unidades fora dos limites do município.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape
+
+from core.busca import normalizar
+
+COLUNA_PLANILHA = "Regional_planilha"
+COLUNA_ID = "id_regional"
+SEM_REGIONAL = -1
+
+
+class IndiceRegionais:
+    def __init__(self, geojson: dict):
+        features = geojson.get("features", [])
+        self.nomes = np.array([f["properties"].get("Name") for f in features], dtype=object)
+        self.ids = np.array([f["properties"].get("id", SEM_REGIONAL) for f in features], dtype=np.int64)
+        self.geometrias = np.array([shape(f["geometry"]) for f in features], dtype=object)
+        shapely.prepare(self.geometrias)
+        self._arvore = shapely.STRtree(self.geometrias)
+
+    def __len__(self) -> int:
+        return len(self.geometrias)
+
+    def localizar(self, lats, lons) -> np.ndarray:
+        """Posição (em self.nomes) da regional de cada ponto, ou -1 fora de todas.
+
+        Um ponto exatamente sobre uma divisa fica com a regional que vem primeiro no GeoJSON.
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        posicoes = np.full(len(lats), len(self), dtype=np.int64)
+        # A árvore só filtra pelos retângulos envolventes; o teste fino usa os polígonos preparados, em lote por regional.
+        idx_pontos, idx_regionais = self._arvore.query(shapely.points(lons, lats))
+        for regional in np.unique(idx_regionais):
+            candidatos = idx_pontos[idx_regionais == regional]
+            dentro = shapely.intersects_xy(self.geometrias[regional], lons[candidatos], lats[candidatos])
+            np.minimum.at(posicoes, candidatos[dentro], regional)
+        posicoes[posicoes == len(self)] = -1
+        return posicoes
+
+    def atribuir(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cópia do DataFrame com Regional e id_regional calculados pelas coordenadas."""
+        resultado = df.copy()
+        posicoes = self.localizar(df["lat"].to_numpy(dtype=float), df["lon"].to_numpy(dtype=float))
+        dentro = posicoes >= 0
+        digitada = df["Regional"] if "Regional" in df.columns else pd.Series("", index=df.index)
+        resultado[COLUNA_PLANILHA] = digitada
+        resultado["Regional"] = np.where(dentro, self.nomes[np.maximum(posicoes, 0)], digitada.to_numpy(dtype=object))
+        resultado["Regional"] = resultado["Regional"].astype(str).astype("category")
+        resultado[COLUNA_ID] = np.where(dentro, self.ids[np.maximum(posicoes, 0)], SEM_REGIONAL).astype(np.int16)
+        return resultado
+
+
+@dataclass(frozen=True)
+class ResumoRegionais:
+    """Contagens de unidades por regional e por Numeral de uma versão dos dados."""
+    contagens: pd.DataFrame  # linhas: Regional, colunas: Numeral
+    fora_dos_limites: int
+    divergentes: int  # Regional digitada diferente da calculada
+
+    def total_regional(self, regional: str) -> int:
+        return int(self.contagens.loc[regional].sum()) if regional in self.contagens.index else 0
+
+    def total_tipo(self, numeral) -> int:
+        return int(self.contagens[numeral].sum()) if numeral in self.contagens.columns else 0
+
+    def quantidade(self, regional: str, numeral) -> int:
+        if regional in self.contagens.index and numeral in self.contagens.columns:
+            return int(self.contagens.at[regional, numeral])
+        return 0
+
+
+def resumir(df: pd.DataFrame) -> ResumoRegionais:
+    contagens = pd.crosstab(df["Regional"], df["Numeral"]) if not df.empty else pd.DataFrame()
+    fora = int((df[COLUNA_ID] == SEM_REGIONAL).sum()) if COLUNA_ID in df.columns else 0
+    divergentes = 0
+    if COLUNA_PLANILHA in df.columns and COLUNA_ID in df.columns:
+        localizadas = df[df[COLUNA_ID] != SEM_REGIONAL]
+        normalizados = {valor: normalizar(valor) for valor in pd.unique(localizadas[[COLUNA_PLANILHA, "Regional"]].to_numpy().ravel())}
+        digitadas = localizadas[COLUNA_PLANILHA].map(normalizados)
+        divergentes = int(((digitadas != "") & (digitadas != localizadas["Regional"].map(normalizados))).sum())
+    return ResumoRegionais(contagens, fora, divergentes)
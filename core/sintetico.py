@@ -0,0 +1,92 @@
+"""Planilhas sintéticas de unidades para benchmarks e testes de carga.
+
+Gera linhas no mesmo formato da planilha publicada (Nome, Tipo, Regional,
+Info, Instagram, Numeral, lat, lon), com pontos sorteados dentro dos limites
+reais das regionais de `regionais_contagem.geojson`. Cada regional recebe
+unidades em proporção à sua área. Uma pequena parte das unidades divide a
+mesma coordenada com outra, como acontece na planilha real.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape
+
+from core import limites
+
+COLUNAS_PLANILHA = ['Nome', 'Tipo', 'Regional', 'Info', 'Instagram', 'Numeral', 'lat', 'lon']
+
+# Numeral -> (Tipo, peso no sorteio). O 8 não tem ícone próprio e cai em "Outras Categorias".
+TIPOS = {
+    1: ("Comunitária", 0.45),
+    2: ("Institucional", 0.28),
+    3: ("Comunitária/Institucional", 0.15),
+    4: ("Feira da Cidade", 0.04),
+    5: ("Banco de Alimentos", 0.02),
+    6: ("Restaurante Popular", 0.02),
+    8: ("Agricultor Familiar", 0.035),
+    9: ("Sede CMAUF", 0.005),
+}
+PREFIXOS = ["Horta", "Quintal Produtivo", "Pomar", "Viveiro", "Canteiro", "Horta Escolar"]
+LUGARES = ["São José", "Água Branca", "Jardim Industrial", "Nova Contagem", "Bela Vista", "Três Barras",
+           "Praia", "Colonial", "Parque São João", "Vila Pérola", "Arvoredo", "Santa Helena"]
+FRACAO_COLOCADAS = 0.02
+FRACAO_INSTAGRAM = 0.3
+
+
+def _sortear_no_poligono(geometria, quantidade: int, rng: np.random.Generator) -> np.ndarray:
+    """Pontos (lon, lat) uniformes dentro da geometria, por rejeição dentro do retângulo envolvente."""
+    oeste, sul, leste, norte = geometria.bounds
+    pontos = np.empty((0, 2))
+    while len(pontos) < quantidade:
+        faltam = quantidade - len(pontos)
+        lote = rng.uniform((oeste, sul), (leste, norte), size=(max(2 * faltam, 16), 2))
+        dentro = shapely.contains_xy(geometria, lote[:, 0], lote[:, 1])
+        pontos = np.concatenate([pontos, lote[dentro][:faltam]])
+    return pontos
+
+
+def gerar_planilha(linhas: int, semente: int = 0, geojson: dict | None = None) -> pd.DataFrame:
+    """DataFrame com `linhas` unidades sintéticas, reprodutível pela semente."""
+    rng = np.random.default_rng(semente)
+    geojson = geojson or limites.carregar_limites("completo")
+    regionais = [(f["properties"]["Name"], shape(f["geometry"])) for f in geojson["features"]]
+    areas = np.array([geometria.area for _, geometria in regionais])
+    por_regional = rng.multinomial(linhas, areas / areas.sum())
+
+    nomes_regionais, coordenadas = [], []
+    for (nome, geometria), quantidade in zip(regionais, por_regional):
+        if quantidade:
+            coordenadas.append(_sortear_no_poligono(geometria, int(quantidade), rng))
+            nomes_regionais.extend([nome] * int(quantidade))
+    coordenadas = np.concatenate(coordenadas) if coordenadas else np.empty((0, 2))
+    ordem = rng.permutation(linhas)
+    coordenadas, nomes_regionais = coordenadas[ordem], np.array(nomes_regionais, dtype=object)[ordem]
+
+    # Algumas unidades ficam no mesmo ponto de outra (ex.: horta e feira no mesmo endereço).
+    colocadas = np.flatnonzero(rng.random(linhas) < FRACAO_COLOCADAS)
+    if linhas > 1 and len(colocadas):
+        origens = rng.integers(0, linhas, size=len(colocadas))
+        coordenadas[colocadas] = coordenadas[origens]
+        nomes_regionais[colocadas] = nomes_regionais[origens]
+
+    numerais = np.array(list(TIPOS))
+    pesos = np.array([peso for _, peso in TIPOS.values()])
+    sorteados = rng.choice(numerais, size=linhas, p=pesos / pesos.sum())
+    prefixos = rng.choice(PREFIXOS, size=linhas)
+    lugares = rng.choice(LUGARES, size=linhas)
+    com_instagram = rng.random(linhas) < FRACAO_INSTAGRAM
+    return pd.DataFrame({
+        'Nome': [f"{p} {l} {i + 1}" for i, (p, l) in enumerate(zip(prefixos, lugares))],
+        'Tipo': [TIPOS[n][0] for n in sorteados.tolist()],
+        'Regional': nomes_regionais,
+        'Info': "",
+        'Instagram': [f"instagram.com/unidade{i + 1}" if tem else "" for i, tem in enumerate(com_instagram)],
+        'Numeral': sorteados,
+        'lat': coordenadas[:, 1].round(6),
+        'lon': coordenadas[:, 0].round(6),
+    }, columns=COLUNAS_PLANILHA)
+
+
+def planilha_csv(df: pd.DataFrame) -> bytes:
+    """CSV no formato exportado pelo Google Sheets."""
+    return df.to_csv(index=False).encode("utf-8")
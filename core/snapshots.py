@@ -0,0 +1,117 @@
+"""Cópias em disco (Parquet) de cada versão boa da planilha, para o processo começar sem rede.
+
+Cada versão carregada com sucesso é gravada como um arquivo Parquet com o
+hash do conteúdo, a hora da carga e os validadores HTTP (ETag/Last-Modified)
+nos metadados. Um processo novo lê o snapshot mais recente (com memory map)
+e serve esses dados na hora; a LojaDados confere a planilha em segundo plano
+logo em seguida. Ficam só os MANTER_SNAPSHOTS mais recentes, e nenhum mais
+velho que IDADE_MAXIMA_S, exceto o último.
+"""
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from core.cache_mapa import hash_dataframe
+from core.caminhos import DIRETORIO_CACHE
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # opcional: sem ele não há snapshots e a primeira carga depende da rede
+    pyarrow = pq = None
+
+VERSAO_SNAPSHOT = 2  # incrementar quando as colunas ou os tipos preparados mudarem
+DIRETORIO_SNAPSHOTS = DIRETORIO_CACHE / "snapshots"
+MANTER_SNAPSHOTS = 5
+IDADE_MAXIMA_S = 30 * 24 * 3600
+CHAVE_METADADOS = b"planta_contagem"
+_RE_NOME = re.compile(rf"unidades_v{VERSAO_SNAPSHOT}_(\d+)_([0-9a-f]+)\.parquet$")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    caminho: Path
+    dados: pd.DataFrame
+    versao: str
+    carregado_em: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class ArmazemSnapshots:
+    def __init__(self, diretorio: Path = DIRETORIO_SNAPSHOTS, manter: int = MANTER_SNAPSHOTS, idade_maxima: float = IDADE_MAXIMA_S):
+        if manter < 1:
+            raise ValueError("manter deve ser ao menos 1")
+        self.diretorio = Path(diretorio)
+        self.manter = manter
+        self.idade_maxima = idade_maxima
+        self._trava = threading.Lock()
+
+    @property
+    def disponivel(self) -> bool:
+        return pq is not None
+
+    def arquivos(self) -> list[Path]:
+        """Snapshots do formato atual, do mais recente ao mais antigo."""
+        if not self.diretorio.is_dir():
+            return []
+        encontrados = [(int(m.group(1)), caminho) for caminho in self.diretorio.iterdir() if (m := _RE_NOME.match(caminho.name))]
+        return [caminho for _, caminho in sorted(encontrados, reverse=True)]
+
+    def gravar(self, dados: pd.DataFrame, versao: str, carregado_em: float | None = None,
+               etag: str | None = None, last_modified: str | None = None) -> Path | None:
+        """Grava a versão, se ela ainda não for a do snapshot mais recente, e aplica a retenção."""
+        if not self.disponivel:
+            return None
+        carregado_em = time.time() if carregado_em is None else carregado_em
+        with self._trava:
+            existentes = self.arquivos()
+            if existentes and _RE_NOME.match(existentes[0].name).group(2) == versao[:16]:
+                return existentes[0]
+            caminho = self.diretorio / f"unidades_v{VERSAO_SNAPSHOT}_{int(carregado_em * 1000)}_{versao[:16]}.parquet"
+            tabela = pyarrow.Table.from_pandas(dados, preserve_index=True)
+            extra = {"versao": versao, "carregado_em": carregado_em, "etag": etag, "last_modified": last_modified}
+            tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), CHAVE_METADADOS: json.dumps(extra).encode()})
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            tmp = caminho.with_name(caminho.name + ".tmp")
+            try:
+                pq.write_table(tabela, tmp, compression="zstd")
+                os.replace(tmp, caminho)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            self._aplicar_retencao()
+        return caminho
+
+    def _aplicar_retencao(self) -> None:
+        agora = time.time()
+        for posicao, caminho in enumerate(self.arquivos()):
+            gravado_em = int(_RE_NOME.match(caminho.name).group(1)) / 1000
+            if posicao >= self.manter or (posicao > 0 and agora - gravado_em > self.idade_maxima):
+                caminho.unlink(missing_ok=True)
+
+    def ler(self, caminho: Path) -> Snapshot:
+        """Lê um snapshot e confere o hash do conteúdo; ValueError se ele não bate."""
+        tabela = pq.read_table(caminho, memory_map=True)
+        extra = json.loads((tabela.schema.metadata or {})[CHAVE_METADADOS])
+        dados = tabela.to_pandas()
+        if hash_dataframe(dados) != extra["versao"]:
+            raise ValueError(f"conteúdo de {caminho.name} não confere com o hash gravado")
+        return Snapshot(Path(caminho), dados, extra["versao"], extra["carregado_em"], extra.get("etag"), extra.get("last_modified"))
+
+    def mais_recente(self) -> Snapshot | None:
+        """O snapshot válido mais recente; arquivos ilegíveis ou corrompidos são pulados."""
+        if not self.disponivel:
+            return None
+        for caminho in self.arquivos():
+            try:
+                return self.ler(caminho)
+            except Exception as e:
+                print(f"Aviso: snapshot {caminho} ignorado: {e}")
+        return None
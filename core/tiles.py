@@ -0,0 +1,301 @@
+"""Camadas vetoriais cortadas em tiles por zoom, num arquivo único, e o servidor local que as entrega.
+
+As camadas (limites das regionais, unidades e, no futuro, bairros, lotes,
+cursos d'água...) são cortadas na grade de tiles XYZ da projeção Web Mercator,
+do ZOOM_MINIMO ao ZOOM_MAXIMO. Cada tile é um GeoJSON pequeno, simplificado e
+com as coordenadas arredondadas para a resolução do seu zoom, e vai
+comprimido (gzip) para um arquivo SQLite. Polígonos são gravados duas vezes:
+o preenchimento recortado (sem contorno) e o contorno como linhas, para que o
+corte na borda do tile não apareça como traço no mapa.
+
+O ServidorTiles responde `/{camada}/{z}/{x}/{y}.geojson` a partir do arquivo;
+o navegador só baixa os tiles da área visível, no detalhe do zoom atual.
+"""
+import gzip
+import json
+import math
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape
+
+from core import limites
+from core.caminhos import CAMINHO_GEOJSON_REGIONAIS, DIRETORIO_CACHE
+from core.limites import geometria_para_json, simplificar_cobertura
+
+VERSAO_FORMATO = 1  # incrementar quando o conteúdo dos tiles mudar, para invalidar arquivos antigos
+ZOOM_MINIMO = 8
+ZOOM_MAXIMO = 16
+TAMANHO_TILE_PX = 256
+BORDA_PX = 4  # margem recortada além do tile, para as linhas não terminarem exatamente na borda
+TOLERANCIA_PX = 0.5  # simplificação: meio pixel no zoom do tile
+CAMADA_LIMITES = "limites"
+CAMADA_UNIDADES = "unidades"
+MAX_AGE_TILES_S = 3600
+
+
+def graus_por_pixel(zoom: int) -> float:
+    return 360.0 / (TAMANHO_TILE_PX * 2 ** zoom)
+
+
+def casas_decimais(zoom: int) -> int:
+    """Casas suficientes para um quarto de pixel no zoom."""
+    return max(0, math.ceil(-math.log10(graus_por_pixel(zoom) / 4)))
+
+
+def tile_de(lats, lons, zoom: int) -> tuple[np.ndarray, np.ndarray]:
+    """(x, y) do tile XYZ de cada ponto."""
+    n = 2 ** zoom
+    lats = np.clip(np.asarray(lats, dtype=float), -85.05112878, 85.05112878)
+    lons = np.asarray(lons, dtype=float)
+    x = np.floor((lons + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(np.radians(lats))) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def limites_tile(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(oeste, sul, leste, norte) do tile, em graus."""
+    n = 2 ** zoom
+    oeste, leste = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    norte = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    sul = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return oeste, sul, leste, norte
+
+
+def _colecao(features: list) -> dict:
+    return {"type": "FeatureCollection", "features": features}
+
+
+def cortar_poligonos(geojson: dict, zooms=range(ZOOM_MINIMO, ZOOM_MAXIMO + 1), propriedades=("id", "Name")) -> dict:
+    """{(z, x, y): [features]} com o preenchimento e o contorno de cada polígono recortados por tile."""
+    features = geojson.get("features", [])
+    if not features:
+        return {}
+    props = [{k: (f.get("properties") or {}).get(k) for k in propriedades} for f in features]
+    originais = shapely.force_2d(np.array([shape(f["geometry"]) for f in features], dtype=object))
+    tiles = {}
+    for zoom in zooms:
+        geometrias = simplificar_cobertura(originais, TOLERANCIA_PX * graus_por_pixel(zoom))
+        contornos = shapely.boundary(geometrias)
+        casas, borda = casas_decimais(zoom), BORDA_PX * graus_por_pixel(zoom)
+        oeste, sul, leste, norte = shapely.total_bounds(geometrias)
+        x0, y0 = tile_de(norte, oeste, zoom)
+        x1, y1 = tile_de(sul, leste, zoom)
+        for x in range(int(x0), int(x1) + 1):
+            for y in range(int(y0), int(y1) + 1):
+                o, s, l, n = limites_tile(zoom, x, y)
+                caixa = (o - borda, s - borda, l + borda, n + borda)
+                preenchimentos = shapely.clip_by_rect(geometrias, *caixa)
+                linhas = shapely.clip_by_rect(contornos, *caixa)
+                saida = []
+                for p, preenchimento, linha in zip(props, preenchimentos, linhas):
+                    if not preenchimento.is_empty:
+                        saida.append({"type": "Feature", "properties": p, "geometry": geometria_para_json(preenchimento, casas)})
+                    if not linha.is_empty:
+                        saida.append({"type": "Feature", "properties": p, "geometry": geometria_para_json(linha, casas)})
+                if saida:
+                    tiles[(zoom, x, y)] = saida
+    return tiles
+
+
+def cortar_pontos(df: pd.DataFrame, zooms=range(ZOOM_MINIMO, ZOOM_MAXIMO + 1), campos: dict | None = None) -> dict:
+    """{(z, x, y): [features]} das unidades; `campos` mapeia coluna -> nome curto da propriedade."""
+    campos = campos or {"Nome": "n", "Tipo": "t", "Regional": "r", "Numeral": "c"}
+    df = df[df["lat"].notna() & df["lon"].notna()]
+    if df.empty:
+        return {}
+    lats, lons = df["lat"].to_numpy(dtype=float), df["lon"].to_numpy(dtype=float)
+    colunas = {curto: df[coluna].astype(object).where(df[coluna].notna(), None).tolist()
+               for coluna, curto in campos.items() if coluna in df.columns}
+    ids = df.index.tolist()
+    tiles = {}
+    for zoom in zooms:
+        casas = casas_decimais(zoom)
+        xs, ys = tile_de(lats, lons, zoom)
+        ordem = np.lexsort((ys, xs))
+        chaves, inicios = np.unique(np.stack([xs[ordem], ys[ordem]], axis=1), axis=0, return_index=True)
+        for (x, y), inicio, fim in zip(chaves.tolist(), inicios.tolist(), [*inicios[1:].tolist(), len(ordem)]):
+            tiles[(zoom, x, y)] = [
+                {"type": "Feature",
+                 "geometry": {"type": "Point", "coordinates": [round(float(lons[i]), casas), round(float(lats[i]), casas)]},
+                 "properties": {"id": ids[i], **{curto: valores[i] for curto, valores in colunas.items()}}}
+                for i in ordem[inicio:fim].tolist()
+            ]
+    return tiles
+
+
+class ArquivoTiles:
+    """Arquivo SQLite com os tiles de várias camadas, já comprimidos, e metadados (zooms, limites, versão)."""
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self._conexao: sqlite3.Connection | None = None
+        self._trava = threading.Lock()
+
+    @classmethod
+    def construir(cls, caminho: Path, camadas: dict[str, dict], metadados: dict | None = None) -> "ArquivoTiles":
+        """Grava as camadas ({nome: {(z, x, y): [features]}}) num arquivo novo, trocado atomicamente."""
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_name(caminho.name + ".tmp")
+        if tmp.exists():
+            tmp.unlink()
+        info = {"formato": "geojson", "versao_formato": VERSAO_FORMATO, **(metadados or {}), "camadas": {}}
+        try:
+            with sqlite3.connect(tmp) as conexao:
+                conexao.execute("CREATE TABLE metadados (nome TEXT PRIMARY KEY, valor TEXT)")
+                conexao.execute("CREATE TABLE tiles (camada TEXT, z INTEGER, x INTEGER, y INTEGER, dados BLOB, PRIMARY KEY (camada, z, x, y))")
+                for nome, tiles in camadas.items():
+                    conexao.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?, ?)", (
+                        (nome, z, x, y, gzip.compress(json.dumps(_colecao(features), ensure_ascii=False, separators=(",", ":")).encode(), mtime=0))
+                        for (z, x, y), features in tiles.items()
+                    ))
+                    info["camadas"][nome] = _resumo_camada(tiles)
+                conexao.executemany("INSERT INTO metadados VALUES (?, ?)", [(k, json.dumps(v)) for k, v in info.items()])
+            conexao.close()
+            os.replace(tmp, caminho)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+        return cls(caminho)
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True, check_same_thread=False)
+        return self._conexao
+
+    def ler(self, camada: str, z: int, x: int, y: int) -> bytes | None:
+        """GeoJSON do tile comprimido com gzip, ou None se o tile está vazio."""
+        with self._trava:
+            linha = self._conectar().execute(
+                "SELECT dados FROM tiles WHERE camada = ? AND z = ? AND x = ? AND y = ?", (camada, z, x, y)).fetchone()
+        return linha[0] if linha else None
+
+    def metadados(self) -> dict:
+        with self._trava:
+            linhas = self._conectar().execute("SELECT nome, valor FROM metadados").fetchall()
+        return {nome: json.loads(valor) for nome, valor in linhas}
+
+    def fechar(self) -> None:
+        with self._trava:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+
+def _resumo_camada(tiles: dict) -> dict:
+    if not tiles:
+        return {"tiles": 0}
+    zooms = [z for z, _, _ in tiles]
+    maior = max(zooms)
+    caixas = [limites_tile(z, x, y) for z, x, y in tiles if z == maior]
+    return {
+        "tiles": len(tiles),
+        "zoom_minimo": min(zooms),
+        "zoom_maximo": maior,
+        # [[sul, oeste], [norte, leste]], no formato de bounds do Leaflet
+        "limites": [[min(c[1] for c in caixas), min(c[0] for c in caixas)], [max(c[3] for c in caixas), max(c[2] for c in caixas)]],
+    }
+
+
+_trava_construcao = threading.Lock()
+
+
+def arquivo_limites(origem: Path = CAMINHO_GEOJSON_REGIONAIS, diretorio_cache: Path = DIRETORIO_CACHE) -> ArquivoTiles:
+    """Tiles dos limites das regionais, gerados uma vez por versão do GeoJSON de origem e guardados no cache."""
+    versao = f"{limites.versao_limites(origem)}-t{VERSAO_FORMATO}"
+    caminho = Path(diretorio_cache) / f"tiles_limites_{versao}.sqlite"
+    with _trava_construcao:
+        if not caminho.exists():
+            geojson = limites.carregar_limites("completo", origem, diretorio_cache)
+            ArquivoTiles.construir(caminho, {CAMADA_LIMITES: cortar_poligonos(geojson)}, {"versao": versao})
+    return ArquivoTiles(caminho)
+
+
+class ServidorTiles:
+    """Servidor HTTP local, numa thread, que entrega os tiles de um ArquivoTiles."""
+
+    def __init__(self, arquivo: ArquivoTiles, host: str = "127.0.0.1", porta: int = 0, max_age: int = MAX_AGE_TILES_S):
+        self.arquivo = arquivo
+        self.requisicoes = 0
+        metadados = arquivo.metadados()
+        etag_base = str(metadados.get("versao", VERSAO_FORMATO))
+        corpo_metadados = json.dumps(metadados, ensure_ascii=False).encode()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.requisicoes += 1
+                caminho = self.path.split("?", 1)[0].strip("/")
+                if caminho == "metadados.json":
+                    self._responder(200, corpo_metadados, comprimido=False)
+                    return
+                partes = caminho.removesuffix(".geojson").split("/")
+                try:
+                    camada, z, x, y = partes[0], *map(int, partes[1:])
+                except (ValueError, TypeError):
+                    self._responder(404, b"")
+                    return
+                etag = f'"{etag_base}-{camada}-{z}-{x}-{y}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._responder(304, b"", etag=etag)
+                    return
+                dados = servidor.arquivo.ler(camada, z, x, y)
+                # Tile sem nada é uma resposta vazia: o mapa não desenha nada ali.
+                self._responder(200 if dados else 204, dados or b"", etag=etag, comprimido=bool(dados))
+
+            def _responder(self, status: int, corpo: bytes, etag: str | None = None, comprimido: bool = False):
+                if comprimido and "gzip" not in self.headers.get("Accept-Encoding", ""):
+                    corpo, comprimido = gzip.decompress(corpo), False
+                self.send_response(status)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                if status in (200, 304):
+                    self.send_header("Cache-Control", f"public, max-age={max_age}")
+                if etag:
+                    self.send_header("ETag", etag)
+                if status == 200:
+                    self.send_header("Content-Type", "application/geo+json" if etag else "application/json")
+                    if comprimido:
+                        self.send_header("Content-Encoding", "gzip")
+                    self.send_header("Vary", "Accept-Encoding")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                if corpo:
+                    self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer((host, porta), Handler)
+        self._http.daemon_threads = True
+        self._thread = threading.Thread(target=self._http.serve_forever, name="servidor-tiles", daemon=True)
+
+    @property
+    def porta(self) -> int:
+        return self._http.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> "ServidorTiles":
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
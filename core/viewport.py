@@ -0,0 +1,87 @@
+"""Recorte das unidades pela área visível do mapa.
+
+Com muitas unidades, o mapa recebe só o que está na tela, mais uma margem.
+A área consultada é alinhada à grade de tiles do zoom atual, então pequenos
+arrastes do mapa caem na mesma área e não mudam as camadas enviadas. Em zoom
+baixo, quando há unidades demais na área, elas são somadas em células de
+tamanho fixo em pixels.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+MARGEM_TILES = 1  # tiles de 256 px além da área visível, em cada lado
+CELULA_AGREGACAO_PX = 80
+
+
+def graus_por_tile(zoom: float) -> float:
+    return 360.0 / (2 ** math.floor(zoom))
+
+
+@dataclass(frozen=True)
+class Viewport:
+    sul: float
+    oeste: float
+    norte: float
+    leste: float
+    zoom: int
+
+    @classmethod
+    def de_st_folium(cls, saida: dict | None, zoom_padrao: int | None = None) -> "Viewport | None":
+        """Lê `bounds` e `zoom` do retorno do st_folium; None se ainda não houver área conhecida."""
+        if not saida:
+            return None
+        limites, zoom = saida.get("bounds") or {}, saida.get("zoom") or zoom_padrao
+        try:
+            sw, ne = limites["_southWest"], limites["_northEast"]
+            valores = (float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if zoom is None or any(math.isnan(v) for v in valores):
+            return None
+        return cls(*valores, int(zoom))
+
+    @classmethod
+    def ao_redor(cls, centro, zoom: int, tiles: int = 2) -> "Viewport":
+        """Área aproximada antes de o navegador informar a real: alguns tiles em volta do centro."""
+        meia = graus_por_tile(zoom) * tiles
+        return cls(centro[0] - meia / 2, centro[1] - meia, centro[0] + meia / 2, centro[1] + meia, int(zoom))
+
+    def caixa_consulta(self, margem_tiles: int = MARGEM_TILES) -> tuple[float, float, float, float]:
+        """(sul, oeste, norte, leste) da área visível com margem, alinhada à grade de tiles do zoom."""
+        passo = graus_por_tile(self.zoom)
+        return (
+            (math.floor(self.sul / passo) - margem_tiles) * passo,
+            (math.floor(self.oeste / passo) - margem_tiles) * passo,
+            (math.floor(self.norte / passo) + 1 + margem_tiles) * passo,
+            (math.floor(self.leste / passo) + 1 + margem_tiles) * passo,
+        )
+
+
+def tamanho_celula_agregacao(zoom: int, celula_px: int = CELULA_AGREGACAO_PX) -> float:
+    return graus_por_tile(zoom) * celula_px / 256
+
+
+def agrupar_celulas(lats: np.ndarray, lons: np.ndarray, tamanho_celula: float) -> tuple[np.ndarray, np.ndarray]:
+    """Célula de cada ponto numa grade alinhada em múltiplos de tamanho_celula: (grupo de cada ponto, quantidade por grupo)."""
+    linhas = np.floor(lats / tamanho_celula).astype(np.int64)
+    colunas = np.floor(lons / tamanho_celula).astype(np.int64)
+    # Linha e coluna numa chave inteira só: np.unique em 1D é bem mais rápido que com axis=0.
+    chaves = (linhas - linhas.min()) * (int(colunas.max() - colunas.min()) + 1) + (colunas - colunas.min())
+    _, grupo, quantidades = np.unique(chaves, return_inverse=True, return_counts=True)
+    return grupo.ravel(), quantidades
+
+
+def agregar(df: pd.DataFrame, tamanho_celula: float) -> pd.DataFrame:
+    """Uma linha por célula ocupada: posição média das unidades (lat, lon) e quantidade."""
+    if df.empty:
+        return pd.DataFrame({"lat": [], "lon": [], "quantidade": []})
+    lats, lons = df["lat"].to_numpy(dtype=float), df["lon"].to_numpy(dtype=float)
+    grupo, quantidades = agrupar_celulas(lats, lons, tamanho_celula)
+    return pd.DataFrame({
+        "lat": np.bincount(grupo, weights=lats) / quantidades,
+        "lon": np.bincount(grupo, weights=lons) / quantidades,
+        "quantidade": quantidades,
+    })
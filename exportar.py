@@ -0,0 +1,120 @@
+"""Exporta o mapa público como um pacote estático (HTML, JSON das unidades, assets).
+
+O pacote pode ser servido por qualquer hospedagem estática/CDN, sem um
+processo do Streamlit por visitante. Reaproveita a carga e a montagem do mapa
+do app; só é gerado de novo o arquivo cujas entradas mudaram (ver
+core.exportacao).
+
+    python exportar.py --destino dist/mapa
+    python exportar.py --fonte planilha.csv --forcar
+"""
+import argparse
+import html
+import json
+import sys
+from pathlib import Path
+
+from branca.element import Element
+
+import streamlit_app as app
+from core import assets, config, densidade, limites, mapa
+from core.assets import RegistroAssets, registro_padrao
+from core.cache_mapa import hash_dataframe
+from core.dados import preparar_dados
+from core.exportacao import PacoteEstatico, hash_entradas
+from core.regionais import resumir
+
+VERSAO_EXPORTACAO = 1  # incrementar quando o formato do pacote mudar
+DESTINO_PADRAO = Path("dist/mapa")
+ARQUIVOS_CODIGO = [Path(mapa.__file__), Path(densidade.__file__), Path(config.__file__), Path(assets.__file__), Path(__file__)]
+
+CABECALHO_PAGINA = """
+<style>
+html, body {{ margin: 0; height: 100%; }}
+.pc-cabecalho {{ position: absolute; top: 10px; left: 55px; z-index: 1000; display: flex; align-items: center; gap: 10px;
+    background: rgba(255, 255, 255, 0.9); padding: 6px 12px; border-radius: 6px; box-shadow: 0 1px 5px rgba(0, 0, 0, 0.3);
+    font-family: Arial, sans-serif; }}
+.pc-cabecalho img {{ height: 36px; }}
+.pc-cabecalho h1 {{ font-size: 16px; margin: 0; }}
+.pc-cabecalho p {{ font-size: 12px; margin: 0; color: #555; }}
+</style>
+<div class="pc-cabecalho">
+    <a href="{portal}" target="_blank" rel="noopener"><img src="{logo}" alt="Prefeitura de Contagem"></a>
+    <div><h1>{titulo}</h1><p>{subtitulo}</p></div>
+</div>
+"""
+
+
+def _json_compacto(dados) -> bytes:
+    return json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def hash_codigo() -> str:
+    return hash_entradas(*(caminho.read_bytes() for caminho in ARQUIVOS_CODIGO))
+
+
+def hash_icones(registro: RegistroAssets) -> str:
+    """Hash dos ícones do mapa, que vão embutidos no index.html como data URI (core.mapa.icones_mapa)."""
+    arquivos = [props["file"] for props in config.ICONES_DEFINIDOS.values()] + [config.ICONE_PADRAO_ARQUIVO]
+    chaves = [config.PASTA_ICONES + arquivo for arquivo in arquivos]
+    return hash_entradas(*(f"{chave}:{registro[chave].hash if chave in registro else ''}" for chave in chaves))
+
+
+def html_mapa(df, geojson, resumo, logo_src: str) -> str:
+    m = mapa.criar_mapa(df, geojson, resumo=resumo, busca_navegador=True, densidade=densidade.calcular_niveis(df))
+    raiz = m.get_root()
+    raiz.title = config.APP_TITULO
+    raiz.html.add_child(Element(CABECALHO_PAGINA.format(
+        portal=html.escape(config.PMC_PORTAL_URL), logo=html.escape(logo_src),
+        titulo=html.escape(config.APP_TITULO), subtitulo=html.escape(config.APP_SUBTITULO))))
+    return raiz.render()
+
+
+def exportar(fonte, destino: Path, nivel: str = app.NIVEL_SIMPLIFICACAO_LIMITES, forcar: bool = False) -> dict:
+    # Direto no core.dados: um erro na carga chega ao main com a causa (app.carregar_dados só mostraria um st.error).
+    df = preparar_dados(fonte, app.indice_regionais())
+    if df.empty:
+        raise RuntimeError(f"Nenhuma unidade carregada de {fonte}")
+    versao_df, resumo = hash_dataframe(df), resumir(df)
+    geojson, versao_limites = app.carregar_geojson(nivel), app.versao_geojson(nivel)
+
+    pacote = PacoteEstatico(destino, forcar=forcar)
+    registro = registro_padrao()
+    logo = registro[config.LOGO_PMC]
+    nome_logo = f"assets/{logo.nome_publicado}"
+    pacote.copiar(nome_logo, logo.caminho, logo.hash)
+    pacote.escrever("unidades.json", hash_entradas(VERSAO_EXPORTACAO, versao_df),
+                    lambda: _json_compacto(mapa.colecao_unidades(df)))
+    pacote.escrever("regionais.geojson", hash_entradas(VERSAO_EXPORTACAO, versao_limites),
+                    lambda: _json_compacto(geojson))
+    pacote.escrever("index.html", hash_entradas(VERSAO_EXPORTACAO, hash_codigo(), versao_df, versao_limites, logo.hash,
+                                                hash_icones(registro)),
+                    lambda: html_mapa(df, geojson, resumo, nome_logo))
+    return pacote.finalizar()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Exporta o mapa público como pacote estático.")
+    parser.add_argument("--destino", type=Path, default=DESTINO_PADRAO, help=f"pasta do pacote (padrão: {DESTINO_PADRAO})")
+    parser.add_argument("--fonte", default=app.URL_PLANILHA, help="URL ou caminho do CSV da planilha (padrão: planilha publicada)")
+    parser.add_argument("--nivel", default=app.NIVEL_SIMPLIFICACAO_LIMITES, choices=sorted(limites.NIVEIS_TOLERANCIA),
+                        help="simplificação dos limites das regionais")
+    parser.add_argument("--forcar", action="store_true", help="gera todos os arquivos, mesmo os que não mudaram")
+    args = parser.parse_args(argv)
+
+    try:
+        resultado = exportar(args.fonte, args.destino, args.nivel, args.forcar)
+    except Exception as e:
+        print(f"Erro ao exportar: {e}", file=sys.stderr)
+        return 1
+    print(f"Pacote em {args.destino}: {len(resultado['gerados'])} gerado(s), "
+          f"{len(resultado['mantidos'])} sem mudança, {len(resultado['removidos'])} removido(s)")
+    for nome in resultado["gerados"]:
+        print(f"  + {nome}")
+    for nome in resultado["removidos"]:
+        print(f"  - {nome}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
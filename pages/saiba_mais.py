@@ -1,56 +1,16 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import requests
-import base64
 import html
 import os
 
+from core.assets import registro_padrao
+from core.config import DESCRICAO_CMAUF, LINK_ALIMENTA_CIDADES, LINK_CONTAGEM_SEM_FOME, LINK_PAA, PASTA_FOTOS
+from core.miniaturas import ordem_natural, pipeline_padrao
+from core.pagina import exibir_logo_pmc, exibir_rodape
 
-PMC_PORTAL_URL = "https://portal.contagem.mg.gov.br"
-BANNER_URL_BASE = "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/"
-LOGO_PMC_FILENAME = "banner_pmc.png"
 
 SAIBA_TITULO = "Conheça o CMAUF"
 SAIBA_SUBTITULO = "Centro Municipal de Agricultura Urbana e Familiar"
-SAIBA_DESC = "Prefeitura Municipal de Contagem - MG, Mapeamento feito pelo Centro Municipal de Agricultura Urbana e Familiar (CMAUF)"
-
-
-LINK_CONTAGEM_SEM_FOME = "https://portal.contagem.mg.gov.br/portal/noticias/0/3/67444/prefeitura-lanca-campanha-de-seguranca-alimentar-contagem-sem-fome"
-LINK_ALIMENTA_CIDADES = "https://www.gov.br/mds/pt-br/acoes-e-programas/promocao-da-alimentacao-adequada-e-saudavel/alimenta-cidades"
-LINK_GOVERNO_FEDERAL = "https://www.gov.br/pt-br"
-LINK_PAA = "https://www.gov.br/secom/pt-br/acesso-a-informacao/comunicabr/lista-de-acoes-e-programas/programa-de-aquisicao-de-alimentos-paa"
-
-
-FOOTER_BANNERS_DATA = [
-    {
-        "filename": "governo_federal.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/governo_federal.png",
-        "link": LINK_GOVERNO_FEDERAL,
-        "scale": 2.2,
-        "offset_y": -5
-    },
-    {
-        "filename": "alimenta_cidades.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/alimenta_cidades.png",
-        "link": LINK_ALIMENTA_CIDADES,
-        "scale": 2.5,
-        "offset_y": -25
-    },
-    {
-        "filename": "contagem_sem_fome.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/contagem_sem_fome.png",
-        "link": LINK_CONTAGEM_SEM_FOME,
-        "scale": 1.0,
-        "offset_y": 25
-    },
-    {
-        "filename": "banner_pmc.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/banner_pmc.png",
-        "link": PMC_PORTAL_URL,
-        "scale": 1.0,
-        "offset_y": 25
-    }
-]
 
 
 html_content = f"""
@@ -104,23 +64,36 @@ desenvolvimento sustentável local e a melhoria contínua da qualidade de vida d
 """
 
 
-PHOTOS_URL_BASE = "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/fotos/"
-IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.ico')
+# Largura ocupada pela foto em cada faixa de tela, para o navegador escolher a variante do srcset.
+TAMANHOS_GALERIA = "(max-width: 640px) 100vw, (max-width: 1024px) 50vw, 33vw"
+TAMANHOS_DESTAQUE = "180px"
 
 
-@st.cache_data(show_spinner=False)
-def get_image_bytes(image_url: str) -> bytes | None:
-    """
-    Carrega os bytes de uma imagem a partir de uma URL e os armazena em cache.
-    Esta função é usada para o logo do cabeçalho.
-    """
+@st.cache_resource(show_spinner="Preparando fotos...")
+def obter_fotos():
+    """Fotos da galeria com as miniaturas geradas (ou reaproveitadas do manifesto em disco)."""
+    chaves = sorted(registro_padrao().chaves(PASTA_FOTOS), key=ordem_natural)
     try:
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        return response.content
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao carregar bytes da imagem {image_url}: {e}")
-        return None
+        return pipeline_padrao().gerar(chaves)
+    except OSError as e:
+        print(f"Aviso: não foi possível gerar as miniaturas das fotos: {e}")
+        return {chave: None for chave in chaves}
+
+
+def html_foto(chave: str, foto, tamanhos: str, classe: str, carregamento: str = "lazy") -> str:
+    """<picture> com WebP/JPEG responsivos; o clique abre a foto original em outra aba."""
+    pipeline = pipeline_padrao()
+    jpeg = foto.do_formato("jpeg")
+    menor = jpeg[0]
+    alt = html.escape(f"Foto {os.path.splitext(os.path.basename(chave))[0]} do CMAUF")
+    return (
+        f'<a class="{classe}" href="{html.escape(registro_padrao().url(chave))}" target="_blank" rel="noopener noreferrer">'
+        f'<picture>'
+        f'<source type="image/webp" srcset="{pipeline.srcset(foto, "webp")}" sizes="{tamanhos}">'
+        f'<img src="{pipeline.url(menor)}" srcset="{pipeline.srcset(foto, "jpeg")}" sizes="{tamanhos}" '
+        f'width="{menor.largura}" height="{menor.altura}" loading="{carregamento}" decoding="async" alt="{alt}">'
+        f'</picture></a>'
+    )
 
 
 def main():
@@ -142,7 +115,21 @@ def main():
             box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);
             background-color: white;
         }}
-        /* Estilo para as imagens nas colunas da galeria */
+        /* Galeria de miniaturas */
+        .galeria-fotos {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(240px, 1fr));
+            gap: 10px;
+        }}
+        .galeria-fotos img {{
+            width: 100%;
+            height: 200px;
+            object-fit: contain;
+            border-radius: 8px;
+            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
+            display: block;
+        }}
+        /* Estilo para as imagens nas colunas da galeria (sem static serving) */
         .stColumn img {{
             width: 100%; /* Ocupa toda a largura da coluna */
             height: auto; /* Mantém a proporção */
@@ -160,7 +147,7 @@ def main():
             color: #666;
             margin-top: 5px;
         }}
-        /* Estilo para a imagem 1.jpg em destaque */
+        /* Estilo para a foto em destaque */
         .top-image-container {{
             width: 75%;
             display: flex;
@@ -170,8 +157,8 @@ def main():
         }}
         .top-image-container img {{
             max-width: 180px; /* Largura máxima para a imagem principal (reduzida em ~200%) */
-            width: 75%;
-            height: 75%;
+            width: 100%;
+            height: auto;
             border-radius: 10px;
             box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
         }}
@@ -189,118 +176,48 @@ def main():
                 st.switch_page("streamlit_app.py")
 
         with col2:
-            st.markdown('<div data-testid="column-PMC-logo">', unsafe_allow_html=True)
-            logo_bytes = get_image_bytes(BANNER_URL_BASE + LOGO_PMC_FILENAME)
-            if logo_bytes:
-                st.markdown(f'<a href="{PMC_PORTAL_URL}" target="_blank"><img src="data:image/png;base64,{base64.b64encode(logo_bytes).decode()}"></a>', unsafe_allow_html=True)
-            else:
-                st.markdown(f'<a href="{PMC_PORTAL_URL}" target="_blank"><img src="{BANNER_URL_BASE + LOGO_PMC_FILENAME}"></a>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            exibir_logo_pmc()
 
     st.markdown("---")
-    st.caption(SAIBA_DESC)
+    st.caption(DESCRICAO_CMAUF)
 
     # --- Conteúdo Principal (Texto) ---
     st.markdown(html_content, unsafe_allow_html=True)
 
     st.markdown("---") # Separador após o conteúdo principal
 
-    # --- Imagem 1.jpg em destaque (agora após o conteúdo principal) ---
-    st.markdown('<div class="top-image-container">', unsafe_allow_html=True)
-    st.image(PHOTOS_URL_BASE + "1.jpg", caption="Foto de Destaque") # Removido use_column_width
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    st.markdown("---") # Separador após a imagem de destaque
-
-
-    images_to_display = [
-        PHOTOS_URL_BASE + "2.JPG",
-        PHOTOS_URL_BASE + "3.jpeg",
-        PHOTOS_URL_BASE + "4.jpeg",
-        PHOTOS_URL_BASE + "5.jpeg",
-        PHOTOS_URL_BASE + "6.jpeg",
-        PHOTOS_URL_BASE + "7.jpeg",
-        PHOTOS_URL_BASE + "8.jpeg",
-        PHOTOS_URL_BASE + "9.jpeg",
-        PHOTOS_URL_BASE + "10.jpeg",
-        PHOTOS_URL_BASE + "11.jpeg",
-        PHOTOS_URL_BASE + "12.JPG",
-        PHOTOS_URL_BASE + "13.jpeg",
-    ]
-
-    if not images_to_display:
-        st.warning("Nenhuma imagem para exibir na galeria. Por favor, verifique os nomes dos arquivos.")
+    fotos = obter_fotos()
+    if not fotos:
+        st.warning("Nenhuma imagem para exibir na galeria.")
     else:
-        num_images_per_row = 3 # Retornado para 3 colunas
-        
-        for i in range(0, len(images_to_display), num_images_per_row):
-            cols = st.columns(num_images_per_row)
-            for j in range(num_images_per_row):
-                if i + j < len(images_to_display):
-                    with cols[j]:
-                        img_url = images_to_display[i + j]
-                        st.image(img_url)
-                else:
+        # A primeira foto vai em destaque; as demais formam a galeria.
+        destaque, *galeria = fotos
+        miniaturas_disponiveis = st.get_option("server.enableStaticServing") and registro_padrao().publicado \
+            and all(foto is not None for foto in fotos.values())
+
+        if miniaturas_disponiveis:
+            st.markdown(
+                f'<div class="top-image-container">'
+                f'{html_foto(destaque, fotos[destaque], TAMANHOS_DESTAQUE, "foto-destaque", carregamento="eager")}</div>',
+                unsafe_allow_html=True
+            )
+            st.markdown("---") # Separador após a imagem de destaque
+            miniaturas = "".join(html_foto(chave, fotos[chave], TAMANHOS_GALERIA, "foto-galeria") for chave in galeria)
+            st.markdown(f'<div class="galeria-fotos">{miniaturas}</div>', unsafe_allow_html=True)
+        else:
+            # Sem static serving não há URL para as variantes: exibe os arquivos originais.
+            st.image(str(registro_padrao()[destaque].caminho), caption="Foto de Destaque", width=180)
+            st.markdown("---")
+            num_images_per_row = 3
+            for i in range(0, len(galeria), num_images_per_row):
+                cols = st.columns(num_images_per_row)
+                for j, chave in enumerate(galeria[i:i + num_images_per_row]):
                     with cols[j]:
-                        st.empty() # Garante que as colunas vazias não quebrem o layout
+                        st.image(str(registro_padrao()[chave].caminho))
 
     st.markdown("---")
 
-    
-    def display_banner_html(url: str, filename: str, link_url: str | None, scale: float = 1.0, offset_y: int = 0) -> str:
-        """Gera o HTML para um banner com escala e deslocamento vertical."""
-        escaped_url = html.escape(url)
-        escaped_filename = html.escape(filename)
-
-        base_max_height_px = 50
-        scaled_max_height = int(base_max_height_px * scale)
-
-        offset_style = f"margin-top: {offset_y}px;" if offset_y != 0 else ""
-
-        
-        img_style_parts = [
-            "height: auto",
-            "width: auto",
-            "max-width: 100%",
-            f"max-height: {scaled_max_height}px",
-            "object-fit: contain",
-            "display: block",
-            "margin-left: auto",
-            "margin-right: auto",
-            offset_style
-        ]
-        img_style = "; ".join(filter(None, [s.strip() for s in img_style_parts]))
-
-        image_tag = f'<img src="{escaped_url}" alt="Banner {escaped_filename}" style="{img_style}">'
-
-        container_style_parts = [
-            "display: flex",
-            "justify-content: center",
-            "align-items: center",
-            f"min-height: {scaled_max_height}px",
-            "overflow: hidden",
-            "width: 100%",
-            "padding: 5px",
-        ]
-        container_style = "; ".join(filter(None, [s.strip() for s in container_style_parts]))
-
-        if link_url:
-            return f'<div style="{container_style}"><a href="{link_url}" target="_blank" rel="noopener noreferrer">{image_tag}</a></div>'
-        else:
-            return f'<div style="{container_style}">{image_tag}</div>'
-
-    cols_banner = st.columns(len(FOOTER_BANNERS_DATA))
-
-    for i, banner_data in enumerate(FOOTER_BANNERS_DATA):
-        with cols_banner[i]:
-            banner_html = display_banner_html(
-                url=banner_data["url"],
-                filename=banner_data["filename"],
-                link_url=banner_data["link"],
-                scale=banner_data.get("scale", 1.0),
-                offset_y=banner_data.get("offset_y", 0)
-            )
-            st.markdown(banner_html, unsafe_allow_html=True)
+    exibir_rodape()
 
 if __name__ == "__main__":
     main()
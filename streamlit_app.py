@@ -1,231 +1,532 @@
-import streamlit as st
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
-from folium import Marker
-import requests
-from folium.plugins import LocateControl
-import numpy as np
-import json
-import base64
-import html
-
-####### Configurações de ícones, base de dados, links de imagens e afins ######
-APP_TITULO = "Planta Contagem"
-APP_SUBTITULO = "Mapa das Unidades Produtivas de Contagem"
-APP_DESC = "Prefeitura Municipal de Contagem - MG, Mapeamento feito pelo Centro Municipal de Agricultura Urbana e Familiar (CMAUF)"
-ICONES_URL_BASE = "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/icones/"
-BANNER_URL_BASE = "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/"
-PMC_PORTAL_URL = "https://portal.contagem.mg.gov.br"
-
-ICONES_DEFINIDOS = {
-    1: {"file": "leaf_green.png", "label": "Comunitária"},
-    2: {"file": "leaf_blue.png", "label": "Institucional"},
-    3: {"file": "leaf_orange.png", "label": "Comunitária/Institucional"},
-    4: {"file": "feira_cidade.png", "label": "Feira da Cidade"},
-    5: {"file": "banco_alimentos.png", "label": "Banco de Alimentos"},
-    6: {"file": "restaurante_pop.png", "label": "Restaurante Popular"},
-    9: {"file": "sede_cmauf.png", "label": "Sede CMAUF"}
-}
-ICONE_PADRAO_ARQUIVO = "leaf_green.png"
-
-MAPEAMENTO_CORES = {
-    1: "#fbb4ae", 2: "#b3cde3", 3: "#ccebc5", 4: "#decbe4",
-    5: "#fed9a6", 6: "#ffffcc", 7: "#e5d8bd"
-}
-
-LOGO_PMC_FILENAME = "banner_pmc.png"
-
-LINK_GEOJSON = "https://raw.githubusercontent.com/brmodel/plantacontagem/main/data/regionais_contagem.geojson"
-LIMITE_CARACTERES = 250
+from __future__ import annotations
 
-CENTRO_INICIAL_MAPA = [-19.8888, -44.0535]
-ZOOM_INICIAL_MAPA = 12
-ZOOM_SELECIONADO_MAPA = 16
-
-LINK_CONTAGEM_SEM_FOME = "https://portal.contagem.mg.gov.br/portal/noticias/0/3/67444/prefeitura-lanca-campanha-de-seguranca-alimentar-contagem-sem-fome"
-LINK_ALIMENTA_CIDADES = "https://www.gov.br/mds/pt-br/acoes-e-programas/promocao-da-alimentacao-adequada-e-saudavel/alimenta-cidades"
-LINK_GOVERNO_FEDERAL = "https://www.gov.br/pt-br"
-
-RODAPE_PAGINA = [
-    {
-        "filename": "governo_federal.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/governo_federal.png",
-        "link": LINK_GOVERNO_FEDERAL,
-        "scale": 2.2,
-        "offset_y": -5 
-    },
-    {
-        "filename": "alimenta_cidades.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/alimenta_cidades.png",
-        "link": LINK_ALIMENTA_CIDADES,
-        "scale": 2.5,
-        "offset_y": -25
-    },
-    {
-        "filename": "contagem_sem_fome.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/contagem_sem_fome.png",
-        "link": LINK_CONTAGEM_SEM_FOME,
-        "scale": 1.0,
-        "offset_y": 25
-    },
-    {
-        "filename": "banner_pmc.png",
-        "url": "https://raw.githubusercontent.com/brmodel/plantacontagem/main/images/logos/banner_pmc.png",
-        "link": PMC_PORTAL_URL,
-        "scale": 1.0,
-        "offset_y": 25
-    }
-]
-
-####### Carregamento de imagens e database ######
-@st.cache_data(show_spinner=False)
-def buscar_imagem_base64(image_url: str) -> str | None:
-    try:
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        img_bytes = response.content
-        if not img_bytes:
-            print(f"Erro: Conteúdo da imagem vazio para {image_url}")
-            return None
-        content_type = response.headers.get('Content-Type', 'image/png')
-        return f"data:{content_type};base64,{base64.b64encode(img_bytes).decode()}"
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao carregar imagem {image_url} como Base64: {e}")
-        return None
+import importlib
+import os
+import time
+import uuid
+from collections import deque
+from functools import cache
+from typing import TYPE_CHECKING
 
-@st.cache_data(show_spinner=False)
-def get_image_bytes(image_url: str) -> bytes | None:
-    try:
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        return response.content
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao carregar bytes da imagem {image_url}: {e}")
-        return None
-
-####### Design da página da internet e dos icones do mapa #######
-ICONE_LEGENDA = {key: props["label"] for key, props in ICONES_DEFINIDOS.items()}
-ICONE_PADRAO_URL = ICONES_URL_BASE + ICONE_PADRAO_ARQUIVO
-LOGO_PMC_URL_CABECALHO = BANNER_URL_BASE + LOGO_PMC_FILENAME
+import streamlit as st
+from streamlit.logger import get_logger
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+
+from core.aquecimento import Aquecimento
+from core.assets import registro_padrao
+from core.config import (APP_SUBTITULO, APP_TITULO, CENTRO_INICIAL_MAPA, DESCRICAO_CMAUF, MODO_MARCADORES, PASTA_FOTOS,
+                         TEXTO_BUSCA, ZOOM_INICIAL_MAPA, ZOOM_SELECIONADO_MAPA)
+from core.medicao import LogDesempenho, MedicaoRerun, log_padrao
+from core.miniaturas import pipeline_padrao
+from core.pagina import exibir_logo_pmc, exibir_rodape
+from core.payload import formatar_relatorio
+
+# pandas, folium e os módulos de dados e do mapa (~1 s de import) só são carregados dentro das funções que os usam,
+# depois que o cabeçalho da página já foi enviado ao navegador.
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from core.busca import IndiceBusca
+    from core.dados import LojaDados
+    from core.densidade import NiveisDensidade
+    from core.indice_espacial import IndiceEspacial
+    from core.regionais import IndiceRegionais, ResumoRegionais
+    from core.tiles import ServidorTiles
+
+logger = get_logger(__name__)
+
+####### Configurações da base de dados e do mapa (textos, ícones e links em core.config) ######
+URL_PLANILHA = os.environ.get("PLANTA_URL_PLANILHA", "https://docs.google.com/spreadsheets/d/1qNmwcOhFnWrFHDYwkq36gHmk4Rx97b6RM0VqU94vOro/export?format=csv&gid=1832051074")
+INTERVALO_ATUALIZACAO_DADOS = 600
+NIVEL_SIMPLIFICACAO_LIMITES = "medio"  # um de core.limites.NIVEIS_TOLERANCIA
+LIMITE_CARACTERES = 250
 
-ESTILO_POPUP = """
-<div style="font-family: Arial, sans-serif; font-size: 12px; width: auto; max-width: min(90vw, 466px); min-width: 200px; word-break: break-word; box-sizing: border-box; padding: 8px;">
-    <h6 style="margin: 0 0 8px 0; word-break: break-word; font-size: 14px;"><b>{}</b></h6>
-    <p style="margin: 4px 0;"><b>Tipo:</b> {}</p>
-    <p style="margin: 4px 0;"><b>Regional:</b> {}</p>
-    {} </div>"""
-ESTILO_TOOLTIP = """<div style="font-family: Arial, sans-serif; font-size: 14px"><p><b>{}:</b><br>{}</p></div>"""
+CAPACIDADE_CACHE_MAPA = 32
+# Acima desse número de unidades o mapa só recebe as que estão na área visível (ver core.viewport).
+LIMITE_UNIDADES_SEM_VIEWPORT = 1500
+LIMITE_MARCADORES_VIEWPORT = 800  # mais que isso na área visível, abaixo de ZOOM_SELECIONADO_MAPA, vira contagem agrupada
+RAIO_CLIQUE_AGRUPADO_PX = 25
+CHAVE_MAPA = "folium_map_interactive"
+QUANTIDADE_PROXIMAS = 10
+RAIOS_PROXIMAS_M = [None, 1000, 2000, 5000, 10000]  # opções de distância máxima em "Unidades perto de mim"; None = qualquer
+# "geojson": limites inteiros no HTML do mapa; "tiles": o navegador busca só os tiles visíveis no ServidorTiles (ver core.tiles).
+MODO_LIMITES = os.environ.get("PLANTA_MODO_LIMITES", "geojson")
+# O servidor de tiles só escuta na própria máquina. Para navegadores em outras máquinas, PLANTA_HOST_TILES=0.0.0.0 e
+# PLANTA_URL_TILES com o endereço público do servidor (ou um proxy na frente dele).
+HOST_TILES = os.environ.get("PLANTA_HOST_TILES", "127.0.0.1")
+PORTA_TILES = int(os.environ.get("PLANTA_PORTA_TILES", "8765"))
+URL_TILES = os.environ.get("PLANTA_URL_TILES", f"http://{HOST_TILES if HOST_TILES != '0.0.0.0' else 'localhost'}:{PORTA_TILES}")  # visto pelo navegador
+# "navegador": busca e filtro por tipo dentro do mapa, sem rerun (só quando todas as unidades vão no mapa); "servidor": caixa de busca do Streamlit.
+MODO_BUSCA = "navegador"
+HISTORICO_MEDICOES = 20  # reruns da sessão mostrados no painel de desempenho
+PARAMETRO_DEBUG = "debug"  # ?debug=1 na URL mostra o painel de desempenho
+MODULOS_MAPA = ("core.dados", "core.mapa", "core.viewport", "core.componente_mapa")  # importados no aquecimento
 
 ####### Carregamento dos dados do mapa a partir do googledocs, do geojson com limites do município ######
-@st.cache_data(ttl=600)
-def carregar_dados():
-    url = "https://docs.google.com/spreadsheets/d/1qNmwcOhFnWrFHDYwkq36gHmk4Rx97b6RM0VqU94vOro/export?format=csv&gid=1832051074"
+def carregar_dados(fonte=URL_PLANILHA, regionais: IndiceRegionais | None = None):
+    import pandas as pd
+    from core.dados import preparar_dados
     try:
-        data = pd.read_csv(url, usecols=range(8))
-        data['Numeral'] = pd.to_numeric(data['Numeral'], errors='coerce')
-        data['lat'] = pd.to_numeric(data['lat'], errors='coerce')
-        data['lon'] = pd.to_numeric(data['lon'], errors='coerce')
-        data.dropna(subset=['Numeral', 'lat', 'lon'], inplace=True)
-        data['Numeral'] = data['Numeral'].astype('Int64')
-        for col in ['Nome', 'Tipo', 'Regional', 'Info', 'Instagram']:
-            if col in data.columns:
-                data[col] = data[col].astype(str).replace('nan', '', regex=False).replace('<NA>', '', regex=False)
-        return data
+        return preparar_dados(fonte, regionais)
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
-def carregar_geojson():
+@cache
+def indice_regionais() -> IndiceRegionais:
+    from core import limites
+    from core.regionais import IndiceRegionais
+    # Montado na primeira carga da planilha, que a LojaDados já serializa.
+    return IndiceRegionais(limites.carregar_limites("completo"))
+
+def preparar_com_regionais(fonte, log: LogDesempenho | None = None):
+    from core.dados import preparar_dados
+    from core.ingestao import resumo_alertas
+    dados = preparar_dados(fonte, indice_regionais())
+    alertas = resumo_alertas(dados)
+    if alertas:
+        logger.info("Alertas da planilha: %s", ", ".join(f"{n} com {descricao}" for descricao, n in alertas.items()))
+        if log is not None: log.gravar({"evento": "alertas_planilha", "ts": round(time.time(), 3), "alertas": alertas})
+    return dados
+
+@st.cache_resource
+def obter_loja_dados() -> LojaDados:
+    """Dados da planilha compartilhados pelo processo inteiro, atualizados em segundo plano.
+
+    Na carga a Regional de cada unidade é recalculada pelas coordenadas (ver core.regionais). Um processo
+    novo começa pelo último snapshot em disco, sem esperar a planilha (ver core.snapshots).
+    """
+    from core.dados import LojaDados
+    from core.snapshots import ArmazemSnapshots
+    log = obter_log_desempenho()
+    return LojaDados(URL_PLANILHA, intervalo=INTERVALO_ATUALIZACAO_DADOS,
+                     preparar=lambda fonte: preparar_com_regionais(fonte, log), snapshots=ArmazemSnapshots())
+
+def carregar_planilha(loja_dados: LojaDados):
+    if loja_dados.atual() is None:
+        raise loja_dados.ultimo_erro or RuntimeError("planilha indisponível")
+
+def carregar_niveis_limites():
+    from core import limites
+    limites.carregar_niveis()
+
+def carregar_modulos_mapa():
+    """Importa as bibliotecas do mapa em segundo plano; o primeiro mapa da sessão não espera por elas."""
+    for modulo in MODULOS_MAPA: importlib.import_module(modulo)
+
+def gerar_miniaturas():
+    registro = registro_padrao()
+    if registro.publicado: pipeline_padrao().gerar(registro.chaves(PASTA_FOTOS))
+
+@st.cache_resource
+def obter_aquecimento() -> Aquecimento:
+    """Cargas iniciais do processo disparadas juntas na primeira execução do script (ver core.aquecimento).
+
+    A página segue sendo montada enquanto elas rodam; a planilha, quando pedida, espera só o download já em andamento.
+    """
+    loja_dados, log = obter_loja_dados(), obter_log_desempenho()
+    return Aquecimento({
+        "planilha": lambda: carregar_planilha(loja_dados),
+        "modulos": carregar_modulos_mapa,
+        "limites": carregar_niveis_limites,
+        "assets": registro_padrao,
+        "miniaturas": gerar_miniaturas,
+    }, ao_concluir=lambda relatorio: registrar_aquecimento(log, relatorio)).iniciar()
+
+@st.cache_resource(max_entries=4)
+def obter_indice_busca(versao_df: str, _df: pd.DataFrame) -> IndiceBusca:
+    """Índice de busca montado uma vez por versão dos dados e compartilhado entre as sessões."""
+    from core.busca import IndiceBusca
+    return IndiceBusca(_df)
+
+@st.cache_resource(max_entries=4)
+def obter_indice_espacial(versao_df: str, _df: pd.DataFrame) -> IndiceEspacial:
+    """Índice espacial das unidades para resolver cliques e achar as mais próximas, um por versão dos dados."""
+    from core.indice_espacial import IndiceEspacial
+    return IndiceEspacial.de_dataframe(_df, coluna_grupo="Tipo")
+
+@st.cache_resource(max_entries=4)
+def obter_resumo_regionais(versao_df: str, _df: pd.DataFrame) -> ResumoRegionais:
+    """Contagens por regional e por tipo, calculadas uma vez por versão dos dados."""
+    from core.regionais import resumir
+    return resumir(_df)
+
+@st.cache_resource(max_entries=4)
+def obter_densidade(versao_df: str, _df: pd.DataFrame) -> NiveisDensidade:
+    """Bolhas por zoom (quantidade de unidades por área e tipo), calculadas uma vez por versão dos dados."""
+    from core.densidade import calcular_niveis
+    return calcular_niveis(_df)
+
+@st.cache_resource(ttl=3600)
+def carregar_geojson(nivel: str = NIVEL_SIMPLIFICACAO_LIMITES):
+    """Limites das regionais, um objeto só para o processo (com cache_data cada sessão guardava a sua cópia). Só é lido."""
+    from core import limites
     try:
-        response = requests.get(LINK_GEOJSON, timeout=20)
-        response.raise_for_status()
-        return response.json()
+        return limites.carregar_limites(nivel)
     except Exception as e:
         st.error(f"Erro ao carregar GeoJSON: {e}")
         return {"type": "FeatureCollection", "features": []}
 
+@st.cache_resource
+def obter_servidor_tiles() -> ServidorTiles | None:
+    """Servidor local dos tiles dos limites, iniciado uma vez por processo no modo "tiles"."""
+    from core.tiles import ServidorTiles, arquivo_limites
+    try:
+        return ServidorTiles(arquivo_limites(), host=HOST_TILES, porta=PORTA_TILES).iniciar()
+    except OSError as e:
+        logger.error("Erro ao iniciar o servidor de tiles em %s:%s: %s", HOST_TILES, PORTA_TILES, e)
+        return None
+
+def registrar_payload_mapa(log: LogDesempenho | None, chave, entrada) -> None:
+    logger.info("Mapa montado (%s): %s", chave[:12], formatar_relatorio(entrada.relatorio()))
+    if log is not None:
+        log.gravar({"evento": "mapa_montado", "ts": round(time.time(), 3), "chave": chave[:12], **entrada.relatorio()})
 
-def criar_legenda(geojson_data):
-    regions = []
-    if geojson_data and isinstance(geojson_data, dict) and 'features' in geojson_data:
-        for feature in geojson_data.get('features', []):
-            props = feature.get('properties', {}); regions.append({'id': props.get('id'), 'name': props.get('Name')})
-    items_legenda_regional = []
-    for region in sorted(regions, key=lambda x: x.get('id', float('inf'))):
-        regiao_colorida = MAPEAMENTO_CORES.get(region.get('id'), "#CCCCCC"); nome_regiao = region.get('name', 'N/A')
-        if nome_regiao and nome_regiao != 'N/A' and regiao_colorida:
-            items_legenda_regional.append(f"""<div style="display: flex; align-items: center; margin: 2px 0;"><div style="background: {regiao_colorida}; width: 20px; height: 20px; margin-right: 5px; border: 1px solid #ccc;"></div><span>{nome_regiao}</span></div>""")
-    html_regional = f"""<div style="font-weight: bold; margin-bottom: 5px;">Regionais</div>{"".join(items_legenda_regional)}""" if items_legenda_regional else ""
-    items_legenda_icones = []
-    for key, props in sorted(ICONES_DEFINIDOS.items()):
-        icone_url_completa = ICONES_URL_BASE + props["file"]
-        icone_link_html = buscar_imagem_base64(icone_url_completa) or icone_url_completa
-        legenda_texto = props["label"]
-        items_legenda_icones.append(f"""<div style="display: flex; align-items: center; margin: 2px 0;"><img src="{icone_link_html}" alt="{legenda_texto}" title="{legenda_texto}" style="width: 20px; height: 20px; margin-right: 5px; object-fit: contain;"><span>{legenda_texto}</span></div>""")
-    html_icones = f"""<div style="font-weight: bold; margin-top: 10px; margin-bottom: 5px;">Tipos de Unidade</div>{"".join(items_legenda_icones)}""" if items_legenda_icones else ""
-    if html_regional or html_icones:
-        return folium.Element(f"""<div style="position: fixed; bottom: 50px; right: 20px; z-index: 1000; background: rgba(255, 255, 255, 0.9); padding: 10px; border-radius: 5px; box-shadow: 0 2px 6px rgba(0,0,0,0.3); font-family: Arial, sans-serif; font-size: 12px; max-width: 180px; max-height: 450px; overflow-y: auto;">{html_regional}{html_icones}</div>""")
-    return None
-
-def criar_mapa(data, geojson_data):
-    m = folium.Map(location=CENTRO_INICIAL_MAPA, tiles="cartodbpositron", zoom_start=ZOOM_INICIAL_MAPA, control_scale=True)
-    if geojson_data and isinstance(geojson_data, dict) and geojson_data.get("features"):
-        folium.GeoJson( geojson_data, name='Regionais',
-            style_function=lambda x: {"fillColor": MAPEAMENTO_CORES.get(x['properties'].get('id'), "#CCCCCC"), "color": "#555555", "weight": 1, "fillOpacity": 0.35},
-            tooltip=folium.GeoJsonTooltip(fields=["Name"], aliases=["Regional:"]),
-            highlight_function=lambda x: {"weight": 2.5, "fillOpacity": 0.6, "color": "black"},
-            interactive=True, control=True, show=True).add_to(m)
-    legenda_element = criar_legenda(geojson_data)
-    if legenda_element: m.get_root().html.add_child(legenda_element)
-
-    if isinstance(data, pd.DataFrame) and not data.empty:
-        coord_precision = 6
+@st.cache_resource
+def obter_cache_mapa():
+    """Cache de mapas montados, único por processo e compartilhado entre as sessões."""
+    from core.cache_mapa import CacheMapa
+    from core.componente_mapa import argumentos_componente
+    log = obter_log_desempenho()
+    return CacheMapa(CAPACIDADE_CACHE_MAPA, ao_construir=lambda chave, entrada: registrar_payload_mapa(log, chave, entrada),
+                     derivar=argumentos_componente)
+
+@st.cache_data(ttl=3600)
+def versao_geojson(nivel: str = NIVEL_SIMPLIFICACAO_LIMITES) -> str:
+    from core import limites
+    return f"{limites.versao_limites()}:{nivel}"
+
+def criar_mapa(data, geojson_data, **kwargs):
+    """core.mapa.criar_mapa com os limites vindos do servidor de tiles no modo "tiles"."""
+    from core.mapa import camada_limites_tiles, criar_mapa
+    servidor_tiles = obter_servidor_tiles() if MODO_LIMITES == "tiles" else None
+    if servidor_tiles is not None:
+        kwargs["camada_limites"] = camada_limites_tiles(servidor_tiles, URL_TILES)
+    return criar_mapa(data, geojson_data, **kwargs)
+
+def formatar_distancia(metros: float) -> str:
+    return f"{metros:.0f} m" if metros < 1000 else f"{metros / 1000:.1f} km".replace(".", ",")
+
+def ponto_clicado_novo(map_output) -> tuple[float, float] | None:
+    """Ponto clicado fora das unidades (ou a posição do usuário) desde o último rerun; None se não mudou."""
+    ponto = (map_output or {}).get('last_clicked')
+    if not ponto or (ponto['lat'], ponto['lng']) == st.session_state.ultimo_ponto_clicado:
+        return None
+    st.session_state.ultimo_ponto_clicado = (ponto['lat'], ponto['lng'])
+    objeto = (map_output or {}).get('last_object_clicked') or {}
+    # Clique num marcador que também chega ao mapa: já é tratado como seleção.
+    if objeto and (objeto.get('lat'), objeto.get('lng')) != st.session_state.ultimo_clique:
+        return None
+    return ponto['lat'], ponto['lng']
+
+def secao_proximidade(df: pd.DataFrame, indice: IndiceEspacial, medicao: MedicaoRerun) -> None:
+    """Lista, na barra lateral, as unidades mais próximas do ponto de referência."""
+    ponto = st.session_state.ponto_proximidade
+    if ponto is None:
+        st.caption("Use o botão de localização do mapa ou clique em um ponto do mapa.")
+        return
+    tipos = st.multiselect("Tipos", list(indice.grupos.categories), key="tipos_proximidade", placeholder="Todos os tipos",
+                           on_change=marcar_causa_rerun, args=("proximidade",))
+    raio = st.selectbox("Distância máxima", RAIOS_PROXIMAS_M, key="raio_proximidade",
+                        format_func=lambda r: "Qualquer" if r is None else f"Até {formatar_distancia(r)}",
+                        on_change=marcar_causa_rerun, args=("proximidade",))
+    with medicao.fase("proximidade"):
+        proximas = indice.mais_proximos(*ponto, QUANTIDADE_PROXIMAS, raio_m=raio, grupos=tipos or None)
+    if not proximas:
+        st.caption("Nenhuma unidade encontrada.")
+    for id_unidade, distancia in proximas:
+        st.button(f"{df.at[id_unidade, 'Nome']} · {df.at[id_unidade, 'Tipo']} · {formatar_distancia(distancia)}",
+                  key=f"proxima_{id_unidade}", on_click=selecionar_unidade, args=(df, [id_unidade], "proximidade"), use_container_width=True)
+
+####### Medição de desempenho de cada rerun (ver core.medicao) ######
+@st.cache_resource
+def obter_log_desempenho() -> LogDesempenho | None:
+    return log_padrao()
+
+def registrar_aquecimento(log: LogDesempenho | None, relatorio: dict) -> None:
+    tarefas = ", ".join(f"{nome} {r['estado']} {r['ms']:.0f} ms" for nome, r in relatorio["tarefas"].items())
+    logger.info("Aquecimento concluído em %.0f ms: %s", relatorio["total_ms"], tarefas)
+    if log is not None: log.gravar(relatorio)
+
+def marcar_causa_rerun(causa: str) -> None:
+    st.session_state.causa_rerun = causa
+
+def iniciar_medicao() -> MedicaoRerun:
+    if 'id_sessao' not in st.session_state:
+        st.session_state.id_sessao = uuid.uuid4().hex[:12]
+        causa = "inicio"
+    else:
+        causa = st.session_state.pop('causa_rerun', None) or "interacao"
+    return MedicaoRerun(st.session_state.id_sessao, causa)
+
+def encerrar_medicao(medicao: MedicaoRerun, desfecho: str = "completo") -> None:
+    registro = medicao.encerrar(desfecho)
+    if 'historico_medicoes' not in st.session_state: st.session_state.historico_medicoes = deque(maxlen=HISTORICO_MEDICOES)
+    st.session_state.historico_medicoes.append(registro)
+    log = obter_log_desempenho()
+    if log is not None: log.gravar(registro)
+
+def pedir_rerun(medicao: MedicaoRerun, causa: str) -> None:
+    """st.rerun() registrando o rerun atual e o motivo do próximo."""
+    encerrar_medicao(medicao, "rerun")
+    marcar_causa_rerun(causa)
+    st.rerun()
+
+def painel_desempenho() -> None:
+    import pandas as pd
+    with st.expander("Desempenho", expanded=True):
+        linhas = [{"causa": r["causa"], "escopo": r.get("escopo"), "desfecho": r.get("desfecho"), "total_ms": r["total_ms"], **r["fases_ms"],
+                   **{f"cache_{nome}": valor for nome, valor in r["cache"].items()}, "payload_bytes": r.get("payload_bytes")}
+                  for r in reversed(st.session_state.get('historico_medicoes', []))]
+        st.caption(f"Sessão {st.session_state.id_sessao}, últimos {len(linhas)} reruns (mais recente primeiro).")
+        st.dataframe(pd.DataFrame(linhas), hide_index=True)
+        st.caption(f"Cache de mapas: {obter_cache_mapa().estatisticas()}")
+        st.caption(f"Aquecimento: {obter_aquecimento().relatorio()['tarefas']}")
+
+def em_rerun_de_fragmento() -> bool:
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+def medicao_fragmento(medicao_pagina: MedicaoRerun) -> MedicaoRerun:
+    """Medição do rerun da página inteira ou, num rerun só do fragmento, uma medição própria.
+
+    Se um callback pediu a página inteira (pedir_rerun_pagina) ou os dados mudaram de versão desde o último rerun da
+    página, o rerun do fragmento para aqui e vira um rerun completo: o outro fragmento ainda mostra a versão anterior.
+    """
+    if not em_rerun_de_fragmento():
+        return medicao_pagina
+    medicao = iniciar_medicao()
+    medicao.anotar(escopo="fragmento")
+    causa = st.session_state.pop('rerun_pagina', None)
+    versao = obter_loja_dados().versao
+    if not causa and versao is not None and versao.versao != st.session_state.get('versao_pagina'):
+        causa = "dados"
+    if causa: pedir_rerun(medicao, causa)
+    return medicao
+
+def encerrar_fragmento(medicao: MedicaoRerun, medicao_pagina: MedicaoRerun) -> None:
+    if medicao is not medicao_pagina: encerrar_medicao(medicao)
+
+def pedir_rerun_pagina(causa: str) -> None:
+    """Para callbacks de widgets dentro de fragmentos, quando a mudança aparece fora do fragmento (ex.: mapa e barra lateral)."""
+    marcar_causa_rerun(causa)
+    st.session_state.rerun_pagina = causa
+
+def dados_atuais() -> tuple[pd.DataFrame, str | None]:
+    """Versão atual dos dados na loja do processo, sem esperar a planilha (a primeira carga acontece no main)."""
+    import pandas as pd
+    versao = obter_loja_dados().versao
+    return (versao.dados, versao.versao) if versao is not None else (pd.DataFrame(), None)
+
+def selecionar_unidade(df: pd.DataFrame, candidatos: list, causa: str) -> None:
+    st.session_state.id_selecionado = candidatos[0]
+    st.session_state.candidatos_selecionados = candidatos
+    st.session_state.centro_mapa = [float(df.at[candidatos[0], 'lat']), float(df.at[candidatos[0], 'lon'])]
+    st.session_state.zoom_mapa = ZOOM_SELECIONADO_MAPA
+    pedir_rerun_pagina(causa)
+
+def ao_interagir_mapa(df: pd.DataFrame, indice_espacial: IndiceEspacial, agrupados: pd.DataFrame | None, zoom: float) -> None:
+    """Callback do st_folium: o clique é resolvido aqui, antes do rerun, em vez de num segundo rerun."""
+    from core.indice_espacial import distancia_haversine_m, metros_por_pixel
+    marcar_causa_rerun("mapa")
+    map_output = st.session_state.get(CHAVE_MAPA) or {}
+    zoom = map_output.get('zoom') or zoom
+    if st.session_state.get('proximidade_ativa'):
+        ponto = ponto_clicado_novo(map_output)
+        if ponto is not None:
+            st.session_state.ponto_proximidade = ponto
+            pedir_rerun_pagina("ponto_proximidade")
+    objeto_clicado = map_output.get('last_object_clicked')
+    if not (objeto_clicado and 'lat' in objeto_clicado and 'lng' in objeto_clicado):
+        return
+    lat_clicada, lon_clicada = objeto_clicado['lat'], objeto_clicado['lng']
+    # O componente repete o último clique a cada mudança; só um clique novo muda a seleção.
+    if (lat_clicada, lon_clicada) == st.session_state.ultimo_clique:
+        return
+    st.session_state.ultimo_clique = (lat_clicada, lon_clicada)
+    if agrupados is not None and not agrupados.empty:
+        # Clique numa bolha agrupada aproxima o mapa dela; só o fragmento do mapa muda.
+        distancias = distancia_haversine_m(lat_clicada, lon_clicada, agrupados['lat'].to_numpy(), agrupados['lon'].to_numpy())
+        mais_proxima = int(distancias.argmin())
+        if distancias[mais_proxima] <= RAIO_CLIQUE_AGRUPADO_PX * metros_por_pixel(lat_clicada, zoom):
+            st.session_state.centro_mapa = [float(agrupados['lat'].iat[mais_proxima]), float(agrupados['lon'].iat[mais_proxima])]
+            st.session_state.zoom_mapa = min(zoom + 2, ZOOM_SELECIONADO_MAPA)
+            marcar_causa_rerun("zoom_agrupado")
+        return
+    candidatos = [i for i in indice_espacial.resolver_clique(lat_clicada, lon_clicada, zoom) if i in df.index]
+    if candidatos: selecionar_unidade(df, candidatos, "selecao")
+
+@st.fragment
+def barra_lateral(medicao_pagina: MedicaoRerun) -> None:
+    """Detalhes da unidade selecionada e unidades próximas. Trocar de unidade ou fechar os detalhes roda só este fragmento."""
+    from core.busca import normalizar
+    from core.dados import detalhes_unidade
+    from core.ingestao import COLUNA_ALERTAS, COLUNA_LINK_INSTAGRAM, descrever_alertas
+    from core.regionais import COLUNA_PLANILHA
+    medicao = medicao_fragmento(medicao_pagina)
+    df_original, versao_df = dados_atuais()
+    st.header("Detalhes da Unidade")
+    info_selecao = detalhes_unidade(df_original, st.session_state.id_selecionado)
+    if info_selecao:
+        candidatos = [i for i in st.session_state.candidatos_selecionados if i in df_original.index]
+        if len(candidatos) > 1 and info_selecao['id'] in candidatos:
+            def trocar_unidade_no_local():
+                marcar_causa_rerun("troca_unidade")
+                st.session_state.id_selecionado = st.session_state.unidade_no_local_key
+            nomes_candidatos = df_original.loc[candidatos, 'Nome'].to_dict()
+            st.selectbox(f"{len(candidatos)} unidades neste local:", candidatos, index=candidatos.index(info_selecao['id']),
+                         format_func=lambda i: nomes_candidatos.get(i, 'N/I'), key="unidade_no_local_key", on_change=trocar_unidade_no_local)
+        st.subheader(info_selecao.get('Nome', 'N/I'))
+        st.write(f"**Tipo:** {info_selecao.get('Tipo', 'N/I')}")
+        regional = info_selecao.get('Regional', 'N/I')
+        st.write(f"**Regional:** {regional}")
+        resumo_regionais = obter_resumo_regionais(versao_df, df_original)
+        st.caption(f"{resumo_regionais.total_regional(regional)} unidades nesta regional, "
+                   f"{resumo_regionais.quantidade(regional, info_selecao.get('Numeral'))} do mesmo tipo.")
+        regional_planilha = info_selecao.get(COLUNA_PLANILHA, '')
+        if regional_planilha and normalizar(regional_planilha) != normalizar(regional):
+            st.caption(f"Na planilha consta a regional {regional_planilha}.")
+        redes, link_ig = info_selecao.get('Instagram', ''), info_selecao.get(COLUNA_LINK_INSTAGRAM, '')
+        if redes:
+            st.write("**Instagram:**"); st.markdown(f"[{redes}]({link_ig})" if link_ig else redes, unsafe_allow_html=True)
+
+        info_sidebar = info_selecao.get('Info', '')
+        if info_sidebar:
+            st.write("**Informações:**")
+            st.markdown(info_sidebar)
+        if st.query_params.get(PARAMETRO_DEBUG) == "1":
+            for alerta in descrever_alertas(info_selecao.get(COLUNA_ALERTAS, 0)):
+                st.caption(f"Alerta da planilha: {alerta}.")
+        def fechar_detalhes():
+            marcar_causa_rerun("fechar_detalhes")
+            st.session_state.id_selecionado = None
+            st.session_state.candidatos_selecionados = []
+        st.button("Fechar Detalhes", key="close_sidebar_btn", on_click=fechar_detalhes)
+    else:
+        st.info("Clique em um marcador no mapa para ver os detalhes aqui.")
+    st.divider()
+    st.header("Unidades perto de mim")
+    # Ligar ou desligar muda o que o mapa devolve (last_clicked), então a página inteira roda de novo.
+    if st.toggle("Mostrar as unidades mais próximas", key="proximidade_ativa", on_change=pedir_rerun_pagina, args=("proximidade",)) \
+            and not df_original.empty:
+        secao_proximidade(df_original, obter_indice_espacial(versao_df, df_original), medicao)
+    encerrar_fragmento(medicao, medicao_pagina)
+
+@st.fragment
+def mapa_interativo(medicao_pagina: MedicaoRerun) -> None:
+    """Busca e mapa. Mover o mapa, buscar ou clicar numa bolha agrupada roda só este fragmento."""
+    import folium
+    from streamlit_folium import st_folium
+
+    from core.cache_mapa import chave_mapa
+    from core.componente_mapa import exibir as exibir_mapa
+    from core.mapa import bytes_camadas, grupo_agrupado, grupos_unidades, icones_mapa
+    from core.viewport import Viewport, agregar, tamanho_celula_agregacao
+    medicao = medicao_fragmento(medicao_pagina)
+    df_original, versao_df = dados_atuais()
+    # Com todas as unidades no mapa, a busca e o filtro por tipo rodam no navegador; no modo viewport continuam no servidor.
+    busca_navegador = MODO_BUSCA == "navegador" and len(df_original) <= LIMITE_UNIDADES_SEM_VIEWPORT
+    medicao.anotar(busca="navegador" if busca_navegador else "servidor")
+    with medicao.fase("indices"):
+        resumo_regionais = obter_resumo_regionais(versao_df, df_original)
+        indice_espacial = obter_indice_espacial(versao_df, df_original)
+
+    pesquisar_unidade = ""
+    if not busca_navegador:
+        _, coluna_busca = st.columns([0.75, 0.25])
+        with coluna_busca:
+            st.markdown('<div data-testid="column-search-bar">', unsafe_allow_html=True)
+            pesquisar_unidade = st.text_input(
+                f"{TEXTO_BUSCA}:",
+                key="search_input_widget_key",
+                on_change=marcar_causa_rerun, args=("busca",),
+                value=st.session_state.valor_busca,
+                placeholder=TEXTO_BUSCA,
+                label_visibility="collapsed"
+            ).strip().lower()
+            st.session_state.valor_busca = pesquisar_unidade
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    df_filtrado = df_original
+    if pesquisar_unidade:
         try:
-            valid_coords = data[['lat', 'lon']].apply(pd.to_numeric, errors='coerce').dropna()
-            rounded_coords = list(zip(np.round(valid_coords['lat'], coord_precision), np.round(valid_coords['lon'], coord_precision)))
-            valid_data_dict = data.loc[valid_coords.index].to_dict('records')
-            st.session_state.buscar_marcador = dict(zip(rounded_coords, valid_data_dict))
+            with medicao.fase("busca"):
+                df_filtrado = df_original.loc[obter_indice_busca(versao_df, df_original).buscar(pesquisar_unidade)]
         except Exception as e:
-            st.warning(f"Erro ao criar lookup de marcadores: {e}.");
-            if 'buscar_marcador' not in st.session_state: st.session_state.buscar_marcador = {}
-
-        feature_groups = {num: folium.FeatureGroup(name=props["label"], show=True) for num, props in ICONES_DEFINIDOS.items()}
-        default_feature_group = folium.FeatureGroup(name='Outras Categorias', show=True); default_group_needed = False
-        icon_base64_cache = {key: buscar_imagem_base64(ICONES_URL_BASE + props["file"]) for key, props in ICONES_DEFINIDOS.items()}
-        default_icon_base64 = buscar_imagem_base64(ICONE_PADRAO_URL)
-
-        for index, row in data.iterrows():
-            if pd.isna(row["lat"]) or pd.isna(row["lon"]): continue
-            lat, lon = row["lat"], row["lon"]
-            icon_num = int(row["Numeral"]) if pd.notna(row["Numeral"]) else None
-            icon_b64_data = icon_base64_cache.get(icon_num, default_icon_base64)
-            icone_atual = folium.CustomIcon(icon_b64_data, icon_size=(25,25), icon_anchor=(0,20), popup_anchor=(0,-10)) if icon_b64_data else folium.Icon(color="green", prefix='fa', icon="leaf")
-            
-            popup_parts = []
-            instagram_link = row.get('Instagram', '').strip()
-            if instagram_link:
-                link_ig_safe = instagram_link if instagram_link.startswith(('http://','https://')) else 'https://'+instagram_link
-                popup_parts.append(f"<p style='margin:4px 0;'><b>Instagram:</b> <a href='{link_ig_safe}' target='_blank' rel='noopener noreferrer'>{instagram_link}</a></p>")
-            
-            popup_content = ESTILO_POPUP.format(row.get('Nome','N/I'), row.get('Tipo','N/I'), row.get('Regional','N/I'), "".join(popup_parts))
-            popup = folium.Popup(popup_content, max_width=450)
-            marker = Marker(location=[lat,lon], popup=popup, icon=icone_atual, tooltip=ESTILO_TOOLTIP.format(row.get('Tipo','N/I'), row.get('Nome','N/I')))
-            
-            if icon_num in feature_groups: marker.add_to(feature_groups[icon_num])
-            else: marker.add_to(default_feature_group); default_group_needed = True
-        
-        for group in feature_groups.values(): group.add_to(m)
-        if default_group_needed: default_feature_group.add_to(m)
-        
-    LocateControl(strings={"title":"Mostrar minha localização", "popup":"Você está aqui"}).add_to(m)
-    folium.LayerControl(position='bottomleft').add_to(m)
-    return m
+            st.error(f"Erro no filtro: {e}"); df_filtrado = df_original
+        if df_filtrado.empty:
+            st.warning(f"Nenhuma unidade encontrada com '{pesquisar_unidade}'.")
+            encerrar_fragmento(medicao, medicao_pagina)
+            return
+
+    with medicao.fase("geojson"):
+        geojson_data = carregar_geojson()
+    proximidade_ativa = st.session_state.get('proximidade_ativa', False)
+    viewport, agrupados = None, None
+    medicao.anotar(unidades=len(df_filtrado))
+    if len(df_filtrado) > LIMITE_UNIDADES_SEM_VIEWPORT:
+        with medicao.fase("mapa"):
+            # Mapa base sem unidades; as unidades da área visível vão como camadas dinâmicas do st_folium.
+            viewport = Viewport.de_st_folium(st.session_state.get(CHAVE_MAPA), st.session_state.zoom_mapa) \
+                or Viewport.ao_redor(st.session_state.centro_mapa, st.session_state.zoom_mapa)
+            caixa = viewport.caixa_consulta()
+            ids_visiveis = indice_espacial.dentro_do_retangulo(*caixa)
+            visiveis = df_filtrado.loc[df_filtrado.index.intersection(ids_visiveis, sort=False)]
+            # Montado a cada rerun (~30 ms): o st_folium pendura as camadas dinâmicas no objeto do mapa, que não pode ser compartilhado.
+            mapa = criar_mapa(None, geojson_data, resumo=resumo_regionais, controle_camadas=False)
+            if len(visiveis) > LIMITE_MARCADORES_VIEWPORT and viewport.zoom < ZOOM_SELECIONADO_MAPA:
+                # Sem busca, as células já estão calculadas para a versão dos dados; só o resultado de uma busca é agregado aqui.
+                if df_filtrado is df_original:
+                    agrupados = obter_densidade(versao_df, df_original).na_caixa(viewport.zoom, *caixa)
+                if agrupados is None:
+                    agrupados = agregar(visiveis, tamanho_celula_agregacao(viewport.zoom))
+                grupos = [grupo_agrupado(agrupados)]
+            else:
+                grupos = grupos_unidades(visiveis, icones_mapa())
+        medicao.anotar(modo="viewport", unidades_enviadas=len(visiveis), payload_bytes=bytes_camadas(grupos))
+        with medicao.fase("st_folium"):
+            st_folium(
+                mapa,
+                center=st.session_state.centro_mapa,
+                zoom=st.session_state.zoom_mapa,
+                width='100%', height=600, key=CHAVE_MAPA,
+                feature_group_to_add=grupos,
+                layer_control=folium.LayerControl(position='bottomleft'),
+                on_change=lambda: ao_interagir_mapa(df_filtrado, indice_espacial, agrupados, viewport.zoom),
+                returned_objects=['last_object_clicked', 'bounds', 'zoom'] + (['last_clicked'] if proximidade_ativa else [])
+            )
+    else:
+        # Bolhas em zoom baixo só com todas as unidades; o resultado de uma busca no servidor vai direto em ícones.
+        densidade = obter_densidade(versao_df, df_original) if df_filtrado is df_original else None
+        # A versão dos dados e os termos da busca definem df_filtrado: não é preciso calcular o hash dele a cada rerun.
+        chave = chave_mapa(versao_df, pesquisar_unidade, versao_geojson(), len((geojson_data or {}).get('features', [])), MODO_MARCADORES,
+                           MODO_LIMITES, busca_navegador, densidade is not None)
+        construidos = []
+        def construir_mapa():
+            construidos.append(chave)
+            return criar_mapa(df_filtrado, geojson_data, resumo=resumo_regionais, busca_navegador=busca_navegador, densidade=densidade)
+        with medicao.fase("mapa"):
+            entrada_mapa = obter_cache_mapa().obter(chave, construir_mapa)
+        medicao.registrar_cache("mapa", not construidos)
+        medicao.anotar(modo="completo", unidades_enviadas=len(df_filtrado), payload_bytes=entrada_mapa.relatorio()["bytes"])
+        # O mapa do cache serve todas as sessões já renderizado: cada rerun só entrega os mesmos textos ao componente.
+        with medicao.fase("st_folium"):
+            exibir_mapa(
+                entrada_mapa.componente,
+                center=st.session_state.centro_mapa,
+                zoom=st.session_state.zoom_mapa,
+                width='100%', height=600, key=CHAVE_MAPA,
+                on_change=lambda: ao_interagir_mapa(df_filtrado, indice_espacial, None, st.session_state.zoom_mapa),
+                returned_objects=['last_object_clicked'] + (['last_clicked'] if proximidade_ativa else [])
+            )
+    encerrar_fragmento(medicao, medicao_pagina)
 
 ###### Funções do streamlit para design da página e pra alocação do mapa e dos elementos do mapa #####
 def main():
     st.set_page_config(page_title=APP_TITULO, layout="wide", initial_sidebar_state="collapsed")
+    medicao = iniciar_medicao()
+    medicao.anotar(escopo="pagina")
+    st.session_state.pop('rerun_pagina', None)  # a página inteira já vai rodar
 
     
     st.markdown(
@@ -280,173 +581,61 @@ def main():
     )
 
     ###### Carregamento dos elementos na sessão do usuário quando entra na página ou qunaod recarrega streamlit #########
-    if 'info_marcador_selecionado' not in st.session_state: st.session_state.info_marcador_selecionado = None
+    # A sessão guarda só o id da unidade selecionada; os campos vêm dos dados compartilhados a cada rerun.
+    if 'id_selecionado' not in st.session_state: st.session_state.id_selecionado = None
     if 'valor_busca' not in st.session_state: st.session_state.valor_busca = ''
-    if 'buscar_marcador' not in st.session_state: st.session_state.buscar_marcador = {}
+    if 'candidatos_selecionados' not in st.session_state: st.session_state.candidatos_selecionados = []
+    if 'ultimo_clique' not in st.session_state: st.session_state.ultimo_clique = None
     if 'centro_mapa' not in st.session_state: st.session_state.centro_mapa = CENTRO_INICIAL_MAPA
     if 'zoom_mapa' not in st.session_state: st.session_state.zoom_mapa = ZOOM_INICIAL_MAPA
-    
-    if 'df' not in st.session_state or st.session_state.df.empty:
-        st.session_state.df = pd.DataFrame() 
-        st.session_state.erro_processamento = False
-        with st.spinner("Carregando dados..."):
-            df_carregado = carregar_dados()
-            if not df_carregado.empty:
-                st.session_state.df = df_carregado
-            else:
-                st.session_state.erro_processamento = True
-            st.session_state.geojson_data = carregar_geojson()
-    
+    if 'ponto_proximidade' not in st.session_state: st.session_state.ponto_proximidade = None
+    if 'ultimo_ponto_clicado' not in st.session_state: st.session_state.ultimo_ponto_clicado = None
+
     ####### Layout da página ##########
+    # O cabeçalho não depende dos dados nem das bibliotecas do mapa: é enviado antes de elas serem importadas.
     st.title(APP_TITULO)
     
-    header_col1, header_col2, header_col3 = st.columns([0.6, 0.25, 0.15])
+    header_col1, header_col2 = st.columns([0.85, 0.15])
 
     with header_col1:
         st.header(APP_SUBTITULO)
         if st.button("Saiba Mais sobre o Projeto"):
             st.switch_page("pages/saiba_mais.py")
-            
+
     with header_col2:
-        st.markdown('<div data-testid="column-search-bar">', unsafe_allow_html=True)
-        def clear_selection_on_search():
-            st.session_state.info_marcador_selecionado = None
-
-        pesquisar_unidade = st.text_input(
-            "Pesquisar por Nome, Tipo ou Regional:",
-            key="search_input_widget_key",
-            on_change=clear_selection_on_search,
-            value=st.session_state.valor_busca,
-            label_visibility="collapsed"
-        ).strip().lower()
-        st.session_state.valor_busca = pesquisar_unidade
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with header_col3:
-        st.markdown('<div data-testid="column-PMC-logo">', unsafe_allow_html=True)
-        logo_bytes = get_image_bytes(LOGO_PMC_URL_CABECALHO)
-        if logo_bytes:
-            st.markdown(f'<a href="{PMC_PORTAL_URL}" target="_blank"><img src="data:image/png;base64,{base64.b64encode(logo_bytes).decode()}"></a>', unsafe_allow_html=True)
+        exibir_logo_pmc()
+
+    obter_aquecimento()
+    # Os dados ficam na loja do processo; a sessão só guarda uma referência durante o rerun, sem cópia.
+    loja_dados = obter_loja_dados()
+    medicao.registrar_cache("dados", loja_dados.versao is not None)
+    with medicao.fase("dados"):
+        if loja_dados.versao is None:
+            with st.spinner("Carregando dados..."):
+                versao_dados = loja_dados.atual()
         else:
-            st.markdown(f'<a href="{PMC_PORTAL_URL}" target="_blank"><img src="{LOGO_PMC_URL_CABECALHO}"></a>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    
+            versao_dados = loja_dados.atual()
+    if versao_dados is None:
+        st.error(f"Erro ao carregar dados: {loja_dados.ultimo_erro}")
+    elif versao_dados.origem == "snapshot" and loja_dados.ultimo_erro is not None:
+        st.caption(f"Planilha indisponível no momento: mostrando os dados salvos em {time.strftime('%d/%m/%Y %H:%M', time.localtime(versao_dados.carregado_em))}.")
+    medicao.anotar(origem_dados=versao_dados.origem if versao_dados else None)
+    st.session_state.versao_pagina = versao_dados.versao if versao_dados else None
+    erro_processamento = versao_dados is None or versao_dados.dados.empty
+
+    # Barra lateral e mapa são fragmentos: um clique, uma busca ou um filtro roda de novo só o fragmento do widget.
     with st.sidebar:
-        st.header("Detalhes da Unidade")
-        if st.session_state.get("info_marcador_selecionado"):
-            info_selecao = st.session_state.info_marcador_selecionado
-            st.subheader(info_selecao.get('Nome', 'N/I'))
-            st.write(f"**Tipo:** {info_selecao.get('Tipo', 'N/I')}")
-            st.write(f"**Regional:** {info_selecao.get('Regional', 'N/I')}")
-            redes = info_selecao.get('Instagram', '').strip()
-            if redes:
-                link_ig = redes if redes.startswith(('http://','https://')) else 'https://'+redes
-                st.write(f"**Instagram:**"); st.markdown(f"[{redes}]({link_ig})", unsafe_allow_html=True)
-            
-            info_sidebar = info_selecao.get('Info', '').strip()
-            if info_sidebar:
-                st.write(f"**Informações:**")
-                st.markdown(info_sidebar)
-            if st.button("Fechar Detalhes", key="close_sidebar_btn"):
-                st.session_state.info_marcador_selecionado = None
-                st.rerun()
-        else:
-            st.info("Clique em um marcador no mapa para ver os detalhes aqui.")
-
-    ###### Conferir se dados existem e quebra de loop se houver falha na conexão com o googledocs ####
-    df_filtrado = pd.DataFrame()
-    if not st.session_state.erro_processamento and not st.session_state.df.empty:
-        df_original = st.session_state.df
-        if pesquisar_unidade:
-            try:
-                filtro_nome = df_original["Nome"].astype(str).str.contains(pesquisar_unidade, case=False, na=False, regex=False)
-                filtro_tipo = df_original["Tipo"].astype(str).str.contains(pesquisar_unidade, case=False, na=False, regex=False)
-                filtro_regional = df_original["Regional"].astype(str).str.contains(pesquisar_unidade, case=False, na=False, regex=False)
-                df_filtrado = df_original[filtro_nome | filtro_tipo | filtro_regional]
-                if df_filtrado.empty:
-                    st.warning(f"Nenhuma unidade encontrada com '{pesquisar_unidade}'.")
-            except Exception as e:
-                st.error(f"Erro no filtro: {e}"); df_filtrado = df_original
-        else:
-            df_filtrado = df_original
-    
-    ###### Exibicação do mapa na página ###########
-    if not df_filtrado.empty:
-        m = criar_mapa(df_filtrado, st.session_state.get('geojson_data'))
-        map_output = st_folium(
-            m,
-            center=st.session_state.centro_mapa,
-            zoom=st.session_state.zoom_mapa,
-            width='100%', height=600, key="folium_map_interactive",
-            returned_objects=['last_object_clicked']
-        )
-    ####### Loop com função de exibir dados específicos da unidade quando clicar na unidade #####    
-        if map_output and map_output.get('last_object_clicked'):
-            objeto_clicado = map_output['last_object_clicked']
-            if objeto_clicado and 'lat' in objeto_clicado and 'lng' in objeto_clicado:
-                lat_clicada = objeto_clicado['lat']; lon_clicada = objeto_clicado['lng']
-                coordenada_arredondada = (round(lat_clicada, 6), round(lon_clicada, 6))
-                found_info = st.session_state.get('buscar_marcador', {}).get(coordenada_arredondada)
-                if found_info is not None and found_info != st.session_state.info_marcador_selecionado:
-                    st.session_state.info_marcador_selecionado = found_info
-                    st.session_state.centro_mapa = [found_info['lat'], found_info['lon']]
-                    st.session_state.zoom_mapa = ZOOM_SELECIONADO_MAPA
-                    st.rerun()
-            elif st.session_state.info_marcador_selecionado is not None:
-                st.session_state.info_marcador_selecionado = None
-                st.rerun()
-                
-    elif st.session_state.erro_processamento: st.error("Falha ao carregar dados. O mapa não pode ser exibido.")
+        barra_lateral(medicao)
+
+    if not erro_processamento: mapa_interativo(medicao)
+    else: st.error("Falha ao carregar dados. O mapa não pode ser exibido.")
     
     ###### Restante da página depois do mapa ########
-    st.markdown("---"); st.caption(APP_DESC)
+    st.markdown("---"); st.caption(DESCRICAO_CMAUF)
+    exibir_rodape()
 
-    
-    def display_banner_html(url: str, filename: str, link_url: str | None, scale: float = 1.0, offset_y: int = 0) -> str:
-        """Html do banner de rodapé."""
-        escaped_url = html.escape(url)
-        escaped_filename = html.escape(filename)
-
-        base_max_height_px = 50
-        scaled_max_height = int(base_max_height_px * scale)
-
-        offset_style = f"margin-top: {offset_y}px;" if offset_y != 0 else ""
-
-        img_style_parts = [
-            "height: auto", "width: auto", "max-width: 100%",
-            f"max-height: {scaled_max_height}px", "object-fit: contain",
-            "display: block", "margin-left: auto", "margin-right: auto",
-            offset_style
-        ]
-        img_style = "; ".join(filter(None, [s.strip() for s in img_style_parts]))
-
-        image_tag = f'<img src="{escaped_url}" alt="Banner {escaped_filename}" style="{img_style}">'
-
-        container_style_parts = [
-            "display: flex", "justify-content: center", "align-items: center",
-            f"min-height: {scaled_max_height}px", "overflow: hidden",
-            "width: 100%", "padding: 5px",
-        ]
-        container_style = "; ".join(filter(None, [s.strip() for s in container_style_parts]))
-
-        if link_url:
-            return f'<div style="{container_style}"><a href="{link_url}" target="_blank" rel="noopener noreferrer">{image_tag}</a></div>'
-        else:
-            return f'<div style="{container_style}">{image_tag}</div>'
-
-    cols_banner = st.columns(len(RODAPE_PAGINA))
-
-    for i, banner_data in enumerate(RODAPE_PAGINA):
-        with cols_banner[i]:
-            banner_html = display_banner_html(
-                url=banner_data["url"],
-                filename=banner_data["filename"],
-                link_url=banner_data["link"],
-                scale=banner_data.get("scale", 1.0),
-                offset_y=banner_data.get("offset_y", 0)
-            )
-            st.markdown(banner_html, unsafe_allow_html=True)
+    encerrar_medicao(medicao)
+    if st.query_params.get(PARAMETRO_DEBUG) == "1": painel_desempenho()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,347 @@
+"""Teste de carga: várias sessões simultâneas num servidor Streamlit local, dirigidas por websocket.
+
+    python -m tests.benchmarks.carga --sessoes 20
+    python -m tests.benchmarks.carga --sessoes 50 --unidades 3000 --rampa 5 --json carga.json
+
+Sobe o app com `streamlit run` num processo à parte, apontado para uma
+planilha sintética (core.sintetico) servida por um ServidorPlanilha local e
+com o cache em disco numa pasta temporária, então o processo começa frio,
+como num deploy novo. Cada sessão abre o websocket que o navegador abriria
+e segue o ROTEIRO: abre o mapa, busca uma unidade pelo nome (só quando a
+caixa de busca está no servidor), clica nela, fecha os detalhes e vai para o "Saiba Mais".
+Os widgets são acionados como o navegador faz: o clique é o valor do
+componente do st_folium, enviado no rerun do fragmento do mapa.
+
+O relatório traz:
+
+- a latência de cada passo no cliente (p50/p95, até o fim do último rerun que ele provoca) e os bytes recebidos;
+- o total_ms dos reruns no log de desempenho do servidor, por escopo (página ou fragmento);
+- o RSS do servidor depois de uma sessão de aquecimento, com todas abertas e depois de fechadas, e o crescimento por sessão;
+- a taxa de acerto de cada cache registrado nas medições e quantas vezes a planilha foi baixada.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from core.caminhos import RAIZ_PROJETO
+
+ROTEIRO = ("abrir", "buscar", "clicar", "fechar", "saiba_mais")
+CHAVE_BUSCA = "search_input_widget_key"
+CHAVE_FECHAR = "close_sidebar_btn"
+ROTULO_SAIBA_MAIS = "Saiba Mais"
+COMPONENTE_MAPA = "streamlit_folium.st_folium"
+TEMPO_LIMITE_S = 120
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_processo(pid: int) -> int | None:
+    """RSS atual de um processo em bytes (Linux, /proc); None onde não há /proc."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def percentis(valores: list[float]) -> dict:
+    if not valores:
+        return {"n": 0}
+    ordenados = sorted(valores)
+    p95 = ordenados[min(len(ordenados) - 1, round(0.95 * (len(ordenados) - 1)))]
+    return {"n": len(ordenados), "p50": round(statistics.median(ordenados), 1), "p95": round(p95, 1), "max": round(ordenados[-1], 1)}
+
+
+def _mb(valor: int | None) -> float | None:
+    return None if valor is None else round(valor / 2**20, 1)
+
+
+class ServidorApp:
+    """`streamlit run streamlit_app.py` num subprocesso, com a planilha e o cache apontados pelas variáveis PLANTA_*."""
+
+    def __init__(self, url_planilha: str, diretorio: Path):
+        self.porta = porta_livre()
+        self.diretorio = diretorio
+        self.log_desempenho = diretorio / "desempenho.jsonl"
+        self._ambiente = dict(os.environ, PLANTA_URL_PLANILHA=url_planilha, PLANTA_DIRETORIO_CACHE=str(diretorio / "cache"),
+                              PLANTA_LOG_DESEMPENHO=str(self.log_desempenho))
+        self._processo = None
+
+    @property
+    def url_websocket(self) -> str:
+        return f"ws://127.0.0.1:{self.porta}/_stcore/stream"
+
+    def rss(self) -> int | None:
+        return rss_processo(self._processo.pid)
+
+    def __enter__(self):
+        comando = [sys.executable, "-m", "streamlit", "run", "streamlit_app.py", f"--server.port={self.porta}", "--server.address=127.0.0.1",
+                   "--server.headless=true", "--server.enableXsrfProtection=false", "--server.fileWatcherType=none",
+                   "--browser.gatherUsageStats=false"]
+        with open(self.diretorio / "servidor.log", "wb") as saida:
+            self._processo = subprocess.Popen(comando, cwd=RAIZ_PROJETO, env=self._ambiente, stdout=saida, stderr=subprocess.STDOUT)
+        limite = time.monotonic() + TEMPO_LIMITE_S
+        while time.monotonic() < limite:
+            if self._processo.poll() is not None:
+                raise RuntimeError(f"o servidor saiu com código {self._processo.returncode} (ver {self.diretorio / 'servidor.log'})")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{self.porta}/_stcore/health", timeout=1)
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise TimeoutError("o servidor não respondeu ao health check")
+
+    def __exit__(self, *exc):
+        self._processo.terminate()
+        try:
+            self._processo.wait(10)
+        except subprocess.TimeoutExpired:
+            self._processo.kill()
+
+    def registros(self) -> list[dict]:
+        if not self.log_desempenho.exists():
+            return []
+        with open(self.log_desempenho, encoding="utf-8") as f:
+            return [json.loads(linha) for linha in f if linha.strip()]
+
+
+class SessaoWs:
+    """Uma aba do navegador: guarda os widgets da página e reenvia o estado deles a cada rerun, como o frontend."""
+
+    def __init__(self, numero: int, unidades, pausa: float = 0.0):
+        self.numero = numero
+        self.tempos_ms: dict[str, float] = {}
+        self.bytes_passo: dict[str, int] = {}
+        self.erros: list[str] = []
+        self._pausa = pausa
+        self._unidade = unidades.iloc[random.Random(numero).randrange(len(unidades))]  # a que a sessão procura e clica
+        self._ws = None
+        self._widgets: dict[str, tuple[str, str, str]] = {}  # id -> (tipo do elemento, fragmento, rótulo ou componente)
+        self._estados: dict[str, tuple[str, object]] = {}  # id -> (campo do WidgetState, valor)
+        self.concluida = asyncio.Event()  # fim do roteiro, com ou sem erro
+
+    async def rerun(self, fragmento: str = "", gatilho: str | None = None) -> int:
+        """Pede um rerun e espera o último script_finished da cadeia (um fragmento pode terminar num rerun da página)."""
+        mensagem = BackMsg()
+        estado = mensagem.rerun_script
+        estado.fragment_id = fragmento
+        for id_widget, (campo, valor) in self._estados.items():
+            widget = estado.widget_states.widgets.add()
+            widget.id = id_widget
+            setattr(widget, campo, valor)
+        if gatilho is not None:
+            widget = estado.widget_states.widgets.add()
+            widget.id, widget.trigger_value = gatilho, True
+        await self._ws.send(mensagem.SerializeToString())
+        recebidos = 0
+        while True:
+            bruto = await asyncio.wait_for(self._ws.recv(), TEMPO_LIMITE_S)
+            recebidos += len(bruto)
+            mensagem = ForwardMsg()
+            mensagem.ParseFromString(bruto)
+            tipo = mensagem.WhichOneof("type")
+            if tipo == "delta" and mensagem.delta.WhichOneof("type") == "new_element":
+                self._registrar_elemento(mensagem.delta)
+            elif tipo == "session_event" and mensagem.session_event.WhichOneof("type") == "script_compilation_exception":
+                self.erros.append("erro de compilação do script")
+            elif tipo == "script_finished" and mensagem.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return recebidos
+
+    def _registrar_elemento(self, delta) -> None:
+        elemento = delta.new_element
+        tipo = elemento.WhichOneof("type")
+        if tipo == "exception":
+            self.erros.append(elemento.exception.message)
+            return
+        conteudo = getattr(elemento, tipo)
+        id_widget = getattr(conteudo, "id", "")
+        if id_widget:
+            nome = getattr(conteudo, "component_name", "") if tipo == "component_instance" else getattr(conteudo, "label", "")
+            self._widgets.pop(id_widget, None)  # o mais recente no fim
+            self._widgets[id_widget] = (tipo, delta.fragment_id, nome)
+
+    def _widget(self, tipo: str, chave: str = "", nome: str = "") -> tuple[str, str] | None:
+        """(id, fragmento) do widget desenhado por último; a chave do usuário vai no fim do id gerado pelo Streamlit."""
+        for id_widget, (tipo_widget, fragmento, nome_widget) in reversed(self._widgets.items()):
+            if tipo_widget == tipo and id_widget.endswith(chave) and nome in nome_widget:
+                return id_widget, fragmento
+        return None
+
+    async def abrir(self):
+        return await self.rerun()
+
+    async def buscar(self):
+        # Com a busca no navegador (até LIMITE_UNIDADES_SEM_VIEWPORT unidades) não há caixa de busca nem rerun.
+        widget = self._widget("text_input", CHAVE_BUSCA)
+        if widget is None:
+            return None
+        self._estados[widget[0]] = ("string_value", self._unidade["Nome"])
+        return await self.rerun(widget[1])
+
+    async def clicar(self):
+        widget = self._widget("component_instance", nome=COMPONENTE_MAPA)
+        clique = {"lat": float(self._unidade["lat"]), "lng": float(self._unidade["lon"])}
+        self._estados[widget[0]] = ("json_value", json.dumps({"last_object_clicked": clique}))
+        return await self.rerun(widget[1])
+
+    async def fechar(self):
+        widget = self._widget("button", CHAVE_FECHAR)
+        if widget is None:
+            raise LookupError("botão de fechar os detalhes não apareceu depois do clique")
+        return await self.rerun(widget[1], gatilho=widget[0])
+
+    async def saiba_mais(self):
+        widget = self._widget("button", nome=ROTULO_SAIBA_MAIS)
+        return await self.rerun(widget[1], gatilho=widget[0])
+
+    async def executar(self, url: str, liberada: asyncio.Event) -> "SessaoWs":
+        """Segue o ROTEIRO e mantém o websocket aberto (a sessão viva no servidor) até `liberada`."""
+        try:
+            async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as self._ws:
+                for nome in ROTEIRO:
+                    inicio = time.perf_counter()
+                    try:
+                        recebidos = await getattr(self, nome)()
+                    except Exception as e:
+                        self.erros.append(f"{nome}: {type(e).__name__}: {e}")
+                        break
+                    if recebidos is not None:
+                        self.tempos_ms[nome] = (time.perf_counter() - inicio) * 1000
+                        self.bytes_passo[nome] = recebidos
+                    if self._pausa:
+                        await asyncio.sleep(self._pausa)
+                self.concluida.set()
+                await liberada.wait()
+        except (OSError, websockets.WebSocketException) as e:
+            self.erros.append(f"websocket: {e}")
+        finally:
+            self.concluida.set()
+        return self
+
+
+async def _rodar_sessoes(url: str, unidades, sessoes: int, rampa: float, pausa: float, ao_concluir) -> list[SessaoWs]:
+    """Abre as sessões espalhadas em `rampa` segundos; ao_concluir() roda quando todas terminaram o roteiro, ainda conectadas."""
+    liberada = asyncio.Event()
+    abertas = [SessaoWs(numero, unidades, pausa) for numero in range(sessoes)]
+
+    async def iniciar(sessao: SessaoWs) -> SessaoWs:
+        await asyncio.sleep(rampa * sessao.numero / sessoes)
+        return await sessao.executar(url, liberada)
+
+    tarefas = [asyncio.create_task(iniciar(sessao)) for sessao in abertas]
+    await asyncio.gather(*(sessao.concluida.wait() for sessao in abertas))
+    ao_concluir()
+    liberada.set()
+    return await asyncio.gather(*tarefas)
+
+
+def resumo_cache(registros: list[dict]) -> dict:
+    """Acertos/consultas de cada cache nos registros de rerun."""
+    contagem: dict[str, list[int]] = {}
+    for registro in registros:
+        for nome, resultado in registro.get("cache", {}).items():
+            acertos, total = contagem.get(nome, [0, 0])
+            contagem[nome] = [acertos + (resultado == "acerto"), total + 1]
+    return {nome: {"acertos": acertos, "consultas": total, "taxa": round(acertos / total, 3)} for nome, (acertos, total) in sorted(contagem.items())}
+
+
+def executar_carga(sessoes: int = 20, unidades: int = 300, rampa: float = 2.0, pausa: float = 0.0) -> dict:
+    """Sobe o servidor com uma planilha sintética, roda as sessões e devolve o relatório (ver o docstring do módulo)."""
+    from core.dados import preparar_dados
+    from core.sintetico import gerar_planilha, planilha_csv
+    from tests.servidor_planilha import ServidorPlanilha
+
+    csv = planilha_csv(gerar_planilha(unidades))
+    tabela = preparar_dados(csv)
+    memoria = {}
+    with tempfile.TemporaryDirectory(prefix="carga-") as pasta, ServidorPlanilha(csv) as planilha, \
+            ServidorApp(planilha.url, Path(pasta)) as servidor:
+        # Uma sessão antes, para o RSS inicial já contar as bibliotecas e os caches do processo; os reruns dela ficam fora do relatório.
+        asyncio.run(_rodar_sessoes(servidor.url_websocket, tabela, 1, 0, 0, lambda: None))
+        descartar = len(servidor.registros())
+        memoria["inicial"] = servidor.rss()
+        inicio = time.perf_counter()
+        resultado = asyncio.run(_rodar_sessoes(servidor.url_websocket, tabela, sessoes, rampa, pausa,
+                                               lambda: memoria.__setitem__("sessoes_abertas", servidor.rss())))
+        duracao = time.perf_counter() - inicio
+        time.sleep(1)  # o servidor descarta as sessões logo depois que o websocket fecha
+        memoria["sessoes_fechadas"] = servidor.rss()
+        registros = [r for r in servidor.registros()[descartar:] if "evento" not in r]
+        downloads = planilha.requisicoes
+
+    por_escopo: dict[str, list[float]] = {}
+    for registro in registros:
+        por_escopo.setdefault(registro.get("escopo") or "?", []).append(registro["total_ms"])
+    crescimento = None
+    if memoria["inicial"] is not None and memoria["sessoes_abertas"] is not None:
+        crescimento = (memoria["sessoes_abertas"] - memoria["inicial"]) / sessoes
+    return {
+        "sessoes": sessoes,
+        "unidades": unidades,
+        "duracao_s": round(duracao, 2),
+        "passos_ms": {passo: percentis([s.tempos_ms[passo] for s in resultado if passo in s.tempos_ms]) for passo in ROTEIRO},
+        "bytes_passo": {passo: percentis([s.bytes_passo[passo] for s in resultado if passo in s.bytes_passo]) for passo in ROTEIRO},
+        "servidor_ms": {escopo: percentis(tempos) for escopo, tempos in sorted(por_escopo.items())},
+        "memoria_mb": {nome: _mb(valor) for nome, valor in memoria.items()},
+        "memoria_por_sessao_mb": None if crescimento is None else round(crescimento / 2**20, 2),
+        "cache": resumo_cache(registros),
+        "downloads_planilha": downloads,
+        "erros": [f"sessão {s.numero}: {erro}" for s in resultado for erro in s.erros],
+    }
+
+
+def formatar(relatorio: dict) -> str:
+    linhas = [f"{relatorio['sessoes']} sessões, {relatorio['unidades']} unidades, {relatorio['duracao_s']} s"]
+    linhas.append("passo         n     p50 ms    p95 ms    max ms   p50 KB")
+    for passo, tempos in relatorio["passos_ms"].items():
+        if tempos["n"]:
+            kb = relatorio["bytes_passo"][passo]["p50"] / 1024
+            linhas.append(f"{passo:<12}{tempos['n']:>3}{tempos['p50']:>11}{tempos['p95']:>10}{tempos['max']:>10}{kb:>9.1f}")
+    for escopo, tempos in relatorio["servidor_ms"].items():
+        linhas.append(f"servidor ({escopo}): {tempos['n']} reruns, p50 {tempos['p50']} ms, p95 {tempos['p95']} ms")
+    memoria = relatorio["memoria_mb"]
+    linhas.append(f"RSS do servidor: {memoria['inicial']} MB antes, {memoria['sessoes_abertas']} MB com as sessões abertas, "
+                  f"{memoria['sessoes_fechadas']} MB depois; {relatorio['memoria_por_sessao_mb']} MB por sessão")
+    linhas.append("cache: " + ", ".join(f"{nome} {c['acertos']}/{c['consultas']}" for nome, c in relatorio["cache"].items()))
+    linhas.append(f"planilha baixada {relatorio['downloads_planilha']} vez(es)")
+    linhas.extend(relatorio["erros"])
+    return "\n".join(linhas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas num servidor local.")
+    parser.add_argument("--sessoes", type=int, default=20)
+    parser.add_argument("--unidades", type=int, default=300, help="linhas da planilha sintética")
+    parser.add_argument("--rampa", type=float, default=2.0, help="segundos para abrir todas as sessões")
+    parser.add_argument("--pausa", type=float, default=0.0, help="segundos entre os passos de cada sessão")
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    args = parser.parse_args(argv)
+    relatorio = executar_carga(args.sessoes, args.unidades, args.rampa, args.pausa)
+    print(formatar(relatorio))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return 1 if relatorio["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Benchmarks do pipeline do mapa, desligados por padrão.
+
+Uso:
+    python -m pytest tests/benchmarks --benchmark
+    python -m pytest tests/benchmarks --benchmark --benchmark-linhas=1000,10000 --benchmark-json=resultado.json
+
+Cada caso mede o tempo (mínimo e mediana de algumas repetições) e o pico de
+memória alocada em Python (tracemalloc, numa execução à parte). O resultado de
+todos os casos é gravado em JSON ao final da sessão, para comparar versões.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pytest
+
+from core.caminhos import RAIZ_PROJETO
+
+LINHAS_PADRAO = "1000,10000,100000"
+
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("benchmark")
+    grupo.addoption("--benchmark", action="store_true", default=False, help="executa os benchmarks do mapa")
+    grupo.addoption("--benchmark-linhas", default=LINHAS_PADRAO, help="tamanhos das planilhas sintéticas, separados por vírgula")
+    grupo.addoption("--benchmark-json", default="benchmark.json", help="arquivo onde o resultado é gravado")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("benchmark", default=False):
+        return
+    pular = pytest.mark.skip(reason="benchmarks só rodam com --benchmark")
+    for item in items:
+        if "benchmarks" in item.nodeid:
+            item.add_marker(pular)
+
+
+def pytest_generate_tests(metafunc):
+    if "linhas" in metafunc.fixturenames:
+        texto = metafunc.config.getoption("benchmark_linhas", default=LINHAS_PADRAO)
+        metafunc.parametrize("linhas", [int(n) for n in texto.split(",") if n.strip()], scope="session")
+
+
+def medir(funcao, repeticoes: int = 3):
+    """Executa funcao() e devolve (último resultado, medidas de tempo e memória)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, {"min_s": min(tempos), "mediana_s": statistics.median(tempos), "repeticoes": repeticoes, "pico_memoria_bytes": pico}
+
+
+def repeticoes_para(linhas: int) -> int:
+    return 3 if linhas <= 10_000 else 1
+
+
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_PROJETO, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+@pytest.fixture(scope="session")
+def registrar(request):
+    resultados = []
+
+    def _registrar(caso: str, linhas: int | None = None, **medidas):
+        resultados.append({"caso": caso, "linhas": linhas, **medidas})
+
+    yield _registrar
+
+    if resultados:
+        caminho = request.config.getoption("benchmark_json")
+        relatorio = {
+            "gerado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados dos benchmarks gravados em {caminho}")
+
+
+@pytest.fixture(scope="session")
+def geojson_limites():
+    import streamlit_app
+    from core import limites
+    return limites.carregar_limites(streamlit_app.NIVEL_SIMPLIFICACAO_LIMITES)
+
+
+@pytest.fixture(scope="session")
+def planilha(linhas, tmp_path_factory):
+    """DataFrame sintético já no formato que o app usa e o CSV de origem em disco."""
+    from core.dados import preparar_dados
+    from core.sintetico import gerar_planilha, planilha_csv
+
+    caminho = tmp_path_factory.mktemp("planilha") / f"unidades_{linhas}.csv"
+    caminho.write_bytes(planilha_csv(gerar_planilha(linhas)))
+    return preparar_dados(caminho), caminho
@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+import pytest
+
+import streamlit_app
+from core import limites
+from core.busca import IndiceBusca
+from core.config import ZOOM_SELECIONADO_MAPA
+from core.densidade import calcular_niveis
+from core.indice_espacial import IndiceEspacial
+from core.mapa import criar_legenda, criar_mapa, grupo_agrupado, grupos_unidades, icones_mapa
+from core.payload import relatorio_payload
+from core.regionais import IndiceRegionais, resumir
+from core.viewport import Viewport, agregar, tamanho_celula_agregacao
+from tests.benchmarks.conftest import medir, repeticoes_para
+
+CONSULTAS = ["horta", "sao jose", "comun", "quintal vila 12", "inexistente"]
+CLIQUES = 1000
+ZOOM_CLIQUE = 16
+CONSULTAS_PROXIMIDADE = 200
+
+
+def test_carregar_dados(linhas, planilha, registrar):
+    _, caminho = planilha
+    df, medidas = medir(lambda: streamlit_app.carregar_dados(caminho), repeticoes_para(linhas))
+    assert len(df) == linhas
+    registrar("carregar_dados", linhas, csv_bytes=caminho.stat().st_size, **medidas)
+
+
+def test_atribuir_regionais(linhas, planilha, registrar):
+    df, _ = planilha
+    indice = IndiceRegionais(limites.carregar_limites("completo"))
+    atribuido, medidas = medir(lambda: indice.atribuir(df), repeticoes_para(linhas))
+    _, medidas_resumo = medir(lambda: resumir(atribuido), repeticoes_para(linhas))
+    registrar("atribuir_regionais", linhas, resumo=medidas_resumo, **medidas)
+
+
+def test_criar_legenda(geojson_limites, registrar):
+    legenda, medidas = medir(lambda: criar_legenda(geojson_limites), 5)
+    registrar("criar_legenda", None, html_bytes=len(legenda.render().encode()), **medidas)
+
+
+def test_criar_mapa(linhas, planilha, geojson_limites, registrar):
+    df, _ = planilha
+    mapa, medidas = medir(lambda: criar_mapa(df, geojson_limites), repeticoes_para(linhas))
+    html, medidas_render = medir(lambda: mapa.get_root().render(), repeticoes_para(linhas))
+    payload = relatorio_payload(html)
+    registrar("criar_mapa", linhas, **medidas, render=medidas_render, html_bytes=payload["bytes"], html_gzip_bytes=payload["gzip"])
+
+
+def test_criar_mapa_marcadores_individuais(planilha, linhas, geojson_limites, registrar):
+    if linhas > 1000:
+        pytest.skip("o modo antigo é lento demais para as planilhas grandes; serve só de referência")
+    df, _ = planilha
+    mapa, medidas = medir(lambda: criar_mapa(df, geojson_limites, modo_marcadores="individual"), 1)
+    registrar("criar_mapa_individual", linhas, **medidas, html_bytes=len(mapa.get_root().render().encode()))
+
+
+def test_busca(linhas, planilha, registrar):
+    df, _ = planilha
+    indice, medidas_indice = medir(lambda: IndiceBusca(df), repeticoes_para(linhas))
+
+    def filtrar():
+        return [len(df.loc[indice.buscar(consulta)]) for consulta in CONSULTAS]
+
+    encontrados, medidas = medir(filtrar, 5)
+    assert encontrados[0] > 0 and encontrados[-1] == 0
+    registrar("busca", linhas, indice=medidas_indice, consultas=len(CONSULTAS), por_consulta_s=medidas["mediana_s"] / len(CONSULTAS), **medidas)
+
+
+def test_clique(linhas, planilha, registrar):
+    df, _ = planilha
+    indice, medidas_indice = medir(lambda: IndiceEspacial.de_dataframe(df), repeticoes_para(linhas))
+    rng = np.random.default_rng(1)
+    alvos = df.iloc[rng.integers(0, len(df), size=CLIQUES)]
+
+    def clicar():
+        return [indice.resolver_clique(lat, lon, ZOOM_CLIQUE) for lat, lon in zip(alvos["lat"].tolist(), alvos["lon"].tolist())]
+
+    resolvidos, medidas = medir(clicar, 3)
+    assert all(resolvidos)
+    registrar("clique", linhas, indice=medidas_indice, cliques=CLIQUES, por_clique_s=medidas["mediana_s"] / CLIQUES, **medidas)
+
+
+def test_proximidade(linhas, planilha, registrar):
+    """As 10 unidades mais próximas de pontos da cidade, de todos os tipos e só do tipo mais raro."""
+    df, _ = planilha
+    indice = IndiceEspacial.de_dataframe(df, coluna_grupo="Tipo")
+    rng = np.random.default_rng(2)
+    pontos = list(zip(-19.96 + rng.random(CONSULTAS_PROXIMIDADE) * 0.12, -44.13 + rng.random(CONSULTAS_PROXIMIDADE) * 0.12))
+    for caso, grupos in {"proximidade": None, "proximidade_tipo_raro": [df["Tipo"].value_counts().index[-1]]}.items():
+        resultados, medidas = medir(lambda: [indice.mais_proximos(lat, lon, 10, grupos=grupos) for lat, lon in pontos], 3)
+        assert all(resultados)
+        registrar(caso, linhas, consultas=CONSULTAS_PROXIMIDADE, por_consulta_s=medidas["mediana_s"] / CONSULTAS_PROXIMIDADE, **medidas)
+
+
+def test_viewport(linhas, planilha, registrar):
+    """Camadas enviadas no modo por área visível: uma tela (~1200x600 px) em zoom 15 e a cidade em zoom 12."""
+    df, _ = planilha
+    indice = IndiceEspacial.de_dataframe(df)
+    densidade = calcular_niveis(df)
+    for zoom, (largura, altura) in {15: (0.026, 0.013), 12: (0.2, 0.1)}.items():
+        vista = Viewport(-19.93 - altura / 2, -44.05 - largura / 2, -19.93 + altura / 2, -44.05 + largura / 2, zoom)
+
+        def montar():
+            visiveis = df.loc[indice.dentro_do_retangulo(*vista.caixa_consulta())]
+            if len(visiveis) > streamlit_app.LIMITE_MARCADORES_VIEWPORT and zoom < ZOOM_SELECIONADO_MAPA:
+                return visiveis, [grupo_agrupado(densidade.na_caixa(zoom, *vista.caixa_consulta()))]
+            return visiveis, grupos_unidades(visiveis, icones_mapa())
+
+        (visiveis, grupos), medidas = medir(montar, repeticoes_para(linhas))
+        camadas = [camada for grupo in grupos for camada in grupo._children.values()]
+        registrar(f"viewport_zoom{zoom}", linhas, visiveis=len(visiveis), feicoes=sum(len(c.data["features"]) for c in camadas),
+                  geojson_bytes=sum(len(json.dumps(c.data)) for c in camadas), **medidas)
+
+
+def test_densidade(linhas, planilha, registrar):
+    """Agregados de todos os zooms, calculados uma vez por versão dos dados, e a agregação que eles evitam a cada rerun."""
+    df, _ = planilha
+    densidade, medidas = medir(lambda: calcular_niveis(df), repeticoes_para(linhas))
+    _, medidas_rerun = medir(lambda: agregar(df, tamanho_celula_agregacao(12)), repeticoes_para(linhas))
+    registrar("densidade", linhas, celulas={zoom: len(nivel) for zoom, nivel in densidade.niveis.items()},
+              json_bytes=len(json.dumps(densidade.para_navegador())), agregar_zoom12=medidas_rerun, **medidas)
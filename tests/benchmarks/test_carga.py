@@ -0,0 +1,12 @@
+from tests.benchmarks import carga
+
+
+def test_carga_sessoes_simultaneas(registrar):
+    relatorio = carga.executar_carga(sessoes=5, unidades=300, rampa=1.0)
+    assert relatorio["erros"] == []
+    for passo in ("abrir", "clicar", "fechar", "saiba_mais"):
+        assert relatorio["passos_ms"][passo]["n"] == 5, passo
+    # As sessões dividem os caches do processo: a planilha é baixada uma vez e o mapa montado é reaproveitado.
+    assert relatorio["downloads_planilha"] == 1
+    assert relatorio["cache"]["mapa"]["acertos"] > 0
+    registrar("carga", 300, **{chave: relatorio[chave] for chave in ("sessoes", "passos_ms", "servidor_ms", "memoria_mb", "memoria_por_sessao_mb", "cache")})
@@ -0,0 +1,70 @@
+"""Servidor HTTP local que imita o export CSV do Google Sheets nos testes."""
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorPlanilha:
+    def __init__(self, conteudo: bytes, atraso: float = 0.0):
+        self.atraso = atraso
+        self.requisicoes = 0
+        self.respostas_304 = 0
+        self.falhar = False
+        self.falhar_proximas = 0  # responde 503 a esse número de requisições e depois volta ao normal
+        self._trava = threading.Lock()
+        self.atualizar(conteudo)
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with servidor._trava:
+                    servidor.requisicoes += 1
+                    conteudo, etag, modificado = servidor._conteudo, servidor._etag, servidor._modificado
+                    falhar = servidor.falhar or servidor.falhar_proximas > 0
+                    servidor.falhar_proximas = max(servidor.falhar_proximas - 1, 0)
+                if servidor.atraso:
+                    time.sleep(servidor.atraso)
+                if falhar:
+                    self.send_error(503)
+                    return
+                if self.headers.get("If-None-Match") == etag:
+                    with servidor._trava:
+                        servidor.respostas_304 += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(conteudo)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", modificado)
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}/export?format=csv"
+
+    def atualizar(self, conteudo: bytes) -> None:
+        with self._trava:
+            self._conteudo = conteudo
+            self._etag = '"' + hashlib.sha1(conteudo).hexdigest() + '"'
+            self._modificado = formatdate(usegmt=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._http.shutdown()
+        self._http.server_close()
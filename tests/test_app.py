@@ -0,0 +1,124 @@
+"""A página no AppTest: o mapa e a barra lateral rodam como fragmentos separados.
+
+O AppTest não tem como rodar só um fragmento nem mudar o valor de um componente (st_folium). Os dois são feitos
+como o navegador faz: o rerun leva os ids dos fragmentos (RerunData.fragment_id_queue) e o estado dos widgets.
+Isso usa partes internas do AppTest (_fragment_storage, _tree, _run), por isso o Streamlit está fixado em
+requirements.txt; numa outra versão os testes são pulados em vez de falharem por causa do AppTest.
+"""
+import json
+
+import pytest
+import streamlit
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+import streamlit_app as app
+from core import componente_mapa
+from core.dados import LojaDados, preparar_dados
+from core.sintetico import gerar_planilha, planilha_csv
+from tests.servidor_planilha import ServidorPlanilha
+
+SCRIPT = "import streamlit_app\nstreamlit_app.main()\n"
+VERSAO_STREAMLIT = "1.65.0"  # a de requirements.txt
+
+pytestmark = pytest.mark.skipif(streamlit.__version__ != VERSAO_STREAMLIT,
+                                reason=f"usa partes internas do AppTest do Streamlit {VERSAO_STREAMLIT}")
+
+
+@pytest.fixture
+def pagina(monkeypatch):
+    planilha = gerar_planilha(60)
+    with ServidorPlanilha(planilha_csv(planilha)) as servidor:
+        loja = LojaDados(servidor.url, preparar=preparar_dados)
+        monkeypatch.setattr(app, "obter_loja_dados", lambda: loja)
+        monkeypatch.setattr(app, "obter_aquecimento", lambda: None)
+        monkeypatch.setattr(app, "obter_log_desempenho", lambda: None)
+
+        renderizacoes = []
+        exibir = componente_mapa.exibir  # o mapa completo (até LIMITE_UNIDADES_SEM_VIEWPORT) vai por aqui
+        def contar_mapa(*args, **kwargs):
+            renderizacoes.append(kwargs.get("key"))
+            return exibir(*args, **kwargs)
+        monkeypatch.setattr(componente_mapa, "exibir", contar_mapa)
+
+        fila = []
+        rerun_data = local_script_runner.RerunData
+        monkeypatch.setattr(local_script_runner, "RerunData", lambda **kw: rerun_data(**kw, fragment_id_queue=list(fila)))
+
+        at = AppTest.from_string(SCRIPT, default_timeout=60).run()
+        assert not at.exception
+        yield Pagina(at, fila, renderizacoes, loja, servidor, planilha)
+
+
+class Pagina:
+    def __init__(self, at, fila, renderizacoes, loja, servidor, planilha):
+        self.at, self.fila, self.renderizacoes = at, fila, renderizacoes
+        self.loja, self.servidor, self.planilha = loja, servidor, planilha
+
+    def fragmento(self, nome: str) -> str:
+        # O st.fragment guarda a função original no closure do wrapper que registra.
+        (id_fragmento,) = [i for i, f in self.at._fragment_storage._fragments.items()
+                           if any(getattr(c.cell_contents, "__name__", None) == nome for c in f.__closure__ or ())]
+        return id_fragmento
+
+    def rodar(self, fragmento: str | None = None, mapa: dict | None = None) -> AppTest:
+        """Rerun da página ou só do fragmento, opcionalmente com um novo valor devolvido pelo st_folium."""
+        estados = self.at._tree.get_widget_states()
+        if mapa is not None:
+            (componente,) = self.at.get("component_instance")  # o st_folium; a chave do elemento é um hash dele
+            estado = WidgetState(id=componente.proto.id, json_value=json.dumps(mapa))
+            outros = [w for w in estados.widgets if w.id != estado.id]
+            del estados.widgets[:]
+            estados.widgets.extend([*outros, estado])
+        self.fila[:] = [self.fragmento(fragmento)] if fragmento else []
+        try:
+            self.renderizacoes.clear()
+            self.at._run(estados)
+        finally:
+            self.fila.clear()
+        assert not self.at.exception
+        return self.at
+
+    def reruns(self) -> list[tuple[str, str]]:
+        return [(r["causa"], r["escopo"]) for r in self.at.session_state["historico_medicoes"]]
+
+    def sidebar_textos(self) -> list[str]:
+        return [e.value for e in self.at.sidebar.subheader]
+
+
+def test_clique_no_mapa_seleciona_e_atualiza_a_barra_lateral(pagina):
+    df = pagina.loja.versao.dados
+    unidade = df.index[5]
+    clique = {"last_object_clicked": {"lat": float(df.at[unidade, "lat"]), "lng": float(df.at[unidade, "lon"])}}
+    pagina.rodar("mapa_interativo", mapa=clique)
+    assert pagina.at.session_state["id_selecionado"] in pagina.at.session_state["candidatos_selecionados"]
+    assert unidade in pagina.at.session_state["candidatos_selecionados"]
+    # O callback pede a página inteira uma única vez: o fragmento para e a página roda com a seleção.
+    assert pagina.reruns()[-2:] == [("selecao", "fragmento"), ("selecao", "pagina")]
+    assert pagina.sidebar_textos() == [df.at[pagina.at.session_state["id_selecionado"], "Nome"]]
+
+
+def test_widget_da_barra_lateral_nao_roda_o_mapa(pagina):
+    df = pagina.loja.versao.dados
+    pagina.at.session_state["id_selecionado"] = df.index[0]
+    pagina.rodar()
+    assert pagina.sidebar_textos() == [df.at[df.index[0], "Nome"]] and pagina.renderizacoes == [app.CHAVE_MAPA]
+
+    pagina.at.sidebar.button(key="close_sidebar_btn").click()
+    pagina.rodar("barra_lateral")
+    assert pagina.renderizacoes == []
+    assert pagina.reruns()[-1] == ("fechar_detalhes", "fragmento")
+    assert pagina.at.session_state["id_selecionado"] is None and pagina.sidebar_textos() == []
+
+
+def test_nova_versao_dos_dados_roda_a_pagina_inteira(pagina):
+    pagina.rodar("barra_lateral")
+    assert pagina.reruns()[-1][1] == "fragmento"
+
+    pagina.servidor.atualizar(planilha_csv(pagina.planilha.head(40)))
+    assert pagina.loja.atualizar()
+    pagina.rodar("barra_lateral")
+    assert pagina.reruns()[-2:] == [("interacao", "fragmento"), ("dados", "pagina")]
+    assert pagina.renderizacoes == [app.CHAVE_MAPA]
+    assert pagina.at.session_state["versao_pagina"] == pagina.loja.versao.versao
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from core.aquecimento import Aquecimento
+
+
+def test_tarefas_rodam_juntas_e_registram_duracao():
+    todas_iniciadas = threading.Barrier(3, timeout=5)
+    relatorios = []
+
+    def tarefa():
+        todas_iniciadas.wait()  # só passa se as três estiverem rodando ao mesmo tempo
+        time.sleep(0.05)
+
+    aquecimento = Aquecimento({"a": tarefa, "b": tarefa, "c": tarefa}, ao_concluir=relatorios.append)
+    assert aquecimento.iniciar() is aquecimento
+    assert aquecimento.aguardar(timeout=5)
+    tarefas = relatorios[0]["tarefas"]
+    assert {r["estado"] for r in tarefas.values()} == {"ok"}
+    assert all(r["ms"] >= 50 for r in tarefas.values())
+    assert relatorios[0]["total_ms"] < 3 * 50 + 100
+
+
+def test_erro_de_uma_tarefa_nao_impede_as_outras():
+    def falhar():
+        raise OSError("sem disco")
+
+    aquecimento = Aquecimento({"quebrada": falhar, "ok": lambda: None}).iniciar()
+    assert aquecimento.aguardar(timeout=5)
+    tarefas = aquecimento.relatorio()["tarefas"]
+    assert tarefas["quebrada"]["estado"] == "erro" and "sem disco" in tarefas["quebrada"]["erro"]
+    assert tarefas["ok"]["estado"] == "ok"
+
+
+def test_relatorio_mostra_pendentes_e_iniciar_so_uma_vez():
+    liberar, chamadas = threading.Event(), []
+
+    def tarefa():
+        chamadas.append(1)
+        liberar.wait(5)
+
+    aquecimento = Aquecimento({"lenta": tarefa})
+    assert aquecimento.relatorio()["tarefas"] == {"lenta": {"estado": "pendente"}}
+    aquecimento.iniciar().iniciar()
+    assert not aquecimento.aguardar(timeout=0.05)
+    liberar.set()
+    assert aquecimento.aguardar(timeout=5) and chamadas == [1]
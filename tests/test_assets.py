@@ -0,0 +1,87 @@
+import base64
+import threading
+
+import pytest
+
+from core.assets import RegistroAssets
+
+
+@pytest.fixture
+def arvore(tmp_path):
+    raiz = tmp_path / "images"
+    (raiz / "icones").mkdir(parents=True)
+    (raiz / "logos").mkdir()
+    (raiz / "icones" / "leaf_green.png").write_bytes(b"\x89PNG folha")
+    (raiz / "logos" / "banner_pmc.png").write_bytes(b"\x89PNG banner")
+    (raiz / "logos" / "leiame.txt").write_text("ignorado")
+    return raiz
+
+
+def test_indexa_por_chave_e_publica_com_hash(arvore, tmp_path):
+    destino = tmp_path / "static" / "assets"
+    registro = RegistroAssets(arvore, destino)
+    assert registro.chaves() == ["icones/leaf_green.png", "logos/banner_pmc.png"]
+
+    asset = registro["logos/banner_pmc.png"]
+    assert asset.tipo_mime == "image/png" and len(asset.hash) == 12
+    url = registro.url("logos/banner_pmc.png")
+    assert url == f"app/static/assets/logos/banner_pmc.{asset.hash}.png"
+    assert (destino / asset.nome_publicado).read_bytes() == b"\x89PNG banner"
+
+
+def test_conteudo_novo_gera_url_nova_e_remove_a_antiga(arvore, tmp_path):
+    destino = tmp_path / "static" / "assets"
+    antiga = RegistroAssets(arvore, destino).url("icones/leaf_green.png")
+    (arvore / "icones" / "leaf_green.png").write_bytes(b"\x89PNG folha nova")
+    registro = RegistroAssets(arvore, destino)
+    assert registro.url("icones/leaf_green.png") != antiga
+    assert sorted(p.name for p in destino.rglob("*.png")) == sorted(
+        [registro["icones/leaf_green.png"].nome_publicado.split("/")[-1], registro["logos/banner_pmc.png"].nome_publicado.split("/")[-1]]
+    )
+
+
+
+def test_limpeza_so_apaga_o_que_o_manifesto_anterior_registra(arvore, tmp_path):
+    destino = tmp_path / "static" / "assets"
+    destino.mkdir(parents=True)
+    (destino / "de_outro_processo.png").write_bytes(b"\x89PNG")
+    RegistroAssets(arvore, destino)
+    (arvore / "logos" / "banner_pmc.png").unlink()
+    registro = RegistroAssets(arvore, destino)
+    nomes = sorted(p.relative_to(destino).as_posix() for p in destino.rglob("*.png"))
+    assert nomes == sorted(["de_outro_processo.png", registro["icones/leaf_green.png"].nome_publicado])
+
+
+def test_publicacoes_simultaneas_nao_se_atrapalham(arvore, tmp_path):
+    destino = tmp_path / "static" / "assets"
+    registros, erros = [], []
+
+    def publicar():
+        try:
+            registros.append(RegistroAssets(arvore, destino))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=publicar) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not erros and all(r.publicado for r in registros)
+    assert not list(destino.rglob("*.tmp"))
+    for chave in registros[0].chaves():
+        assert (destino / registros[0][chave].nome_publicado).exists()
+
+def test_data_uri_e_src_sem_static(arvore, tmp_path):
+    registro = RegistroAssets(arvore, tmp_path / "static", publicar=False)
+    uri = registro.data_uri("icones/leaf_green.png")
+    assert uri.startswith("data:image/png;base64,")
+    assert base64.b64decode(uri.split(",", 1)[1]) == b"\x89PNG folha"
+    # Sem publicação (ou com static serving desligado), o src cai para o data URI.
+    assert registro.src("icones/leaf_green.png") == uri
+    with pytest.raises(KeyError):
+        registro.url("icones/inexistente.png")
+
+
+def test_registro_do_repositorio_tem_os_arquivos_usados_pelas_paginas(tmp_path):
+    registro = RegistroAssets(destino=tmp_path, publicar=False)
+    for chave in ["icones/leaf_green.png", "icones/sede_cmauf.png", "logos/banner_pmc.png", "logos/governo_federal.png", "fotos/2.JPG"]:
+        assert chave in registro
@@ -0,0 +1,60 @@
+import time
+
+import pandas as pd
+
+from core.busca import IndiceBusca, normalizar, tokenizar
+
+
+def _unidades():
+    return pd.DataFrame(
+        {
+            "Nome": ["Horta Comunitária São José", "Escola Estadual", "Feira do Eldorado", "Horta da Sede"],
+            "Tipo": ["Comunitária", "Institucional", "Feira da Cidade", "Comunitária/Institucional"],
+            "Regional": ["Sede", "Ressaca", "Eldorado", "Sede"],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+
+def test_normalizacao_remove_acentos_e_caixa():
+    assert normalizar("São JOSÉ") == "sao jose"
+    assert normalizar(None) == "" and normalizar(float("nan")) == ""
+    assert tokenizar("Comunitária/Institucional") == ["comunitaria", "institucional"]
+
+
+def test_busca_sem_acento_e_por_prefixo():
+    indice = IndiceBusca(_unidades())
+    assert indice.buscar("comunitaria") == [10, 13]
+    assert indice.buscar("sao") == [10]
+    assert set(indice.buscar("instit")) == {11, 13}
+
+
+def test_varios_termos_exigem_todos():
+    indice = IndiceBusca(_unidades())
+    assert indice.buscar("horta sede") == [13, 10]
+    assert indice.buscar("escola sede") == []
+    assert indice.buscar("   ") == []
+
+
+def test_ordenacao_prioriza_nome_e_token_exato():
+    indice = IndiceBusca(_unidades())
+    # "Eldorado" está no Nome e na Regional da 12; "Sede" só aparece no Nome da 13 e na Regional da 10.
+    assert indice.buscar("sede") == [13, 10]
+    assert indice.buscar("eldorado", limite=1) == [12]
+
+
+def test_consulta_rapida_em_base_grande():
+    n = 20_000
+    df = pd.DataFrame(
+        {
+            "Nome": [f"Unidade {i} Horta" for i in range(n)],
+            "Tipo": ["Comunitária", "Institucional"] * (n // 2),
+            "Regional": ["Sede", "Eldorado", "Riacho", "Nacional"] * (n // 4),
+        }
+    )
+    indice = IndiceBusca(df)
+    inicio = time.perf_counter()
+    for _ in range(100):
+        resultado = indice.buscar("unidade 1234")
+    assert resultado[0] == 1234
+    assert (time.perf_counter() - inicio) / 100 < 0.05
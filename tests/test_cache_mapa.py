@@ -0,0 +1,105 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from core.cache_mapa import CacheMapa, chave_mapa, hash_dataframe
+
+
+class MapaFalso:
+    def __init__(self, nome):
+        self.nome = nome
+        self.renderizacoes = 0
+
+    def get_root(self):
+        return self
+
+    def render(self):
+        self.renderizacoes += 1
+        return f"<html>{self.nome}</html>"
+
+
+def _df(**kwargs):
+    base = {"Nome": ["A", "B"], "lat": [-19.9, -19.8], "lon": [-44.0, -44.1]}
+    base.update(kwargs)
+    return pd.DataFrame(base)
+
+
+def test_hash_muda_com_conteudo_e_indice():
+    assert hash_dataframe(_df()) == hash_dataframe(_df())
+    assert hash_dataframe(_df()) != hash_dataframe(_df(Nome=["A", "C"]))
+    assert hash_dataframe(_df()) != hash_dataframe(_df().iloc[[1, 0]])
+    versao = hash_dataframe(_df())
+    assert chave_mapa(versao, "", "v1") != chave_mapa(versao, "", "v2")
+    assert chave_mapa(versao, "horta") != chave_mapa(versao, "") != chave_mapa(hash_dataframe(_df(Nome=["A", "C"])), "")
+
+
+def test_acertos_falhas_e_html_renderizado_uma_vez():
+    cache = CacheMapa(capacidade=2)
+    chamadas = []
+
+    def construir():
+        chamadas.append(1)
+        return MapaFalso("a")
+
+    primeira = cache.obter("a", construir)
+    segunda = cache.obter("a", construir)
+    assert primeira is segunda and len(chamadas) == 1
+    assert primeira.html() == segunda.html() == "<html>a</html>"
+    assert primeira.componente is None
+
+
+def test_derivado_calculado_uma_vez_depois_do_html():
+    mapas = []
+
+    def derivar(mapa):
+        mapas.append(mapa)
+        return {"renderizacoes": mapa.renderizacoes}
+
+    cache = CacheMapa(capacidade=2, derivar=derivar)
+    entrada = cache.obter("a", lambda: MapaFalso("a"))
+    assert cache.obter("a", lambda: MapaFalso("a")) is entrada
+    assert len(mapas) == 1 and entrada.componente == {"renderizacoes": 1}
+    assert mapas[0].renderizacoes == 1  # as sessões seguintes não renderizam o mapa de novo
+    stats = cache.estatisticas()
+    assert (stats["acertos"], stats["falhas"], stats["taxa_acerto"]) == (1, 1, 0.5)
+
+
+def test_descarta_o_menos_usado():
+    cache = CacheMapa(capacidade=2)
+    cache.obter("a", lambda: MapaFalso("a"))
+    cache.obter("b", lambda: MapaFalso("b"))
+    cache.obter("a", lambda: MapaFalso("a"))
+    cache.obter("c", lambda: MapaFalso("c"))
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.estatisticas()["descartes"] == 1
+
+
+def test_acesso_concorrente_mantem_limite():
+    cache = CacheMapa(capacidade=4)
+
+    def trabalhar(i):
+        for j in range(50):
+            cache.obter(str((i + j) % 6), lambda: MapaFalso("x"))
+
+    threads = [threading.Thread(target=trabalhar, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.estatisticas()
+    assert len(cache) <= 4
+    assert stats["acertos"] + stats["falhas"] == 400
+
+
+def test_capacidade_invalida():
+    with pytest.raises(ValueError):
+        CacheMapa(capacidade=0)
+
+
+def test_ao_construir_so_para_entradas_novas():
+    construidas = []
+    cache = CacheMapa(capacidade=2, ao_construir=lambda chave, entrada: construidas.append((chave, entrada.relatorio()["bytes"])))
+    cache.obter("a", lambda: MapaFalso("a"))
+    cache.obter("a", lambda: MapaFalso("a"))
+    assert construidas == [("a", len("<html>a</html>"))]
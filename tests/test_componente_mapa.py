@@ -0,0 +1,41 @@
+import itertools
+
+import branca.element
+import streamlit_folium
+
+from core import sintetico
+from core.cache_mapa import EntradaMapa
+from core.componente_mapa import argumentos_componente, exibir
+from core.dados import preparar_dados
+from core.mapa import criar_mapa
+
+
+def _capturar(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(streamlit_folium, "_component_func", lambda **kwargs: chamadas.append(kwargs))
+    return chamadas
+
+
+def _mapa(monkeypatch, df):
+    # Ids de elemento em sequência: os dois mapas saem iguais e as saídas podem ser comparadas.
+    ids = itertools.count()
+    monkeypatch.setattr(branca.element.Element, "_generate_id", lambda self: f"{next(ids):032x}")
+    return criar_mapa(df, None, busca_navegador=True)
+
+
+def test_mesmos_argumentos_que_o_st_folium(monkeypatch):
+    df = preparar_dados(sintetico.planilha_csv(sintetico.gerar_planilha(40)))
+    mapa, copia = _mapa(monkeypatch, df), _mapa(monkeypatch, df)
+    chamadas = _capturar(monkeypatch)
+    parametros = dict(key="mapa", center=[-19.9, -44.05], zoom=13, width="100%", height=600,
+                      returned_objects=["last_object_clicked", "last_clicked"])
+
+    streamlit_folium.st_folium(mapa, **parametros)
+    entrada = EntradaMapa.de_mapa(copia, argumentos_componente)
+    exibir(entrada.componente, **parametros)
+    exibir(entrada.componente, **parametros)  # outro rerun: nada é renderizado de novo
+
+    esperado, cacheado, repetido = ({k: v for k, v in c.items() if k != "on_change"} for c in chamadas)
+    assert cacheado == esperado and repetido == esperado
+    assert "plantaContagem" in esperado["script"] and ".pc-icone" in esperado["header"]
+    assert "L.map" in esperado["script"] and esperado["default"].keys() == {"last_object_clicked", "last_clicked"}
@@ -0,0 +1,156 @@
+import time
+
+import pandas as pd
+import pytest
+
+from core.dados import LojaDados, detalhes_unidade, preparar_dados
+from core.ingestao import ALERTA_NUMERAL_DESCONHECIDO, COLUNA_ALERTAS
+from core.rede import sessao_http
+from core.regionais import COLUNA_PLANILHA, IndiceRegionais
+from core.snapshots import ArmazemSnapshots
+from tests.servidor_planilha import ServidorPlanilha
+
+CABECALHO = "Nome,Tipo,Regional,Info,Instagram,Numeral,lat,lon\n"
+CSV_V1 = (CABECALHO + "Horta A,Comunitária,Sede,,@horta_a,1,-19.90,-44.05\n"
+          "Sem coordenada,Comunitária,Sede,,,1,,\n"
+          "Feira B,Feira da Cidade,Eldorado,Sábados,,4,-19.93,-44.02\n").encode()
+CSV_V2 = CSV_V1 + b"Banco C,Banco de Alimentos,Riacho,,,5,-19.95,-44.06\n"
+
+
+def test_preparar_dados_padroniza_tipos():
+    df = preparar_dados(CSV_V1)
+    assert df["Nome"].tolist() == ["Horta A", "Feira B"]
+    assert str(df["Numeral"].dtype) == "Int32"
+    assert df["Info"].tolist() == ["", "Sábados"]
+    assert df["Instagram"].tolist() == ["@horta_a", ""]
+
+
+def test_numeral_grande_nao_derruba_a_carga():
+    df = preparar_dados(CSV_V1 + b"Nova D,Comunit\xc3\xa1ria,Sede,,,300,-19.91,-44.03\n"
+                        b"Fracionada,Comunit\xc3\xa1ria,Sede,,,1.5,-19.92,-44.03\n"
+                        b"Enorme,Comunit\xc3\xa1ria,Sede,,,1e12,-19.92,-44.04\n")
+    assert df["Nome"].tolist() == ["Horta A", "Feira B", "Nova D"]
+    assert df.loc[df["Nome"] == "Nova D", "Numeral"].item() == 300
+    assert df.loc[df["Nome"] == "Nova D", COLUNA_ALERTAS].item() & ALERTA_NUMERAL_DESCONHECIDO
+
+
+def test_tipos_compactos_e_detalhes_por_id():
+    df = preparar_dados(CSV_V2 + b"Feira D,Feira da Cidade,Sede,S\xc3\xa1bados,,4,-19.91,-44.03\n")
+    assert isinstance(df["Tipo"].dtype, pd.CategoricalDtype) and isinstance(df["Regional"].dtype, pd.CategoricalDtype)
+    assert df["Tipo"].cat.categories.tolist() == ["Banco de Alimentos", "Comunitária", "Feira da Cidade"]
+    # Info vazia ou repetida na maioria das linhas vira categórica; Nome é único por linha e continua texto.
+    assert isinstance(df["Info"].dtype, pd.CategoricalDtype) and not isinstance(df["Nome"].dtype, pd.CategoricalDtype)
+
+    assert detalhes_unidade(df, 2) == {"id": 2, "Nome": "Feira B", "Tipo": "Feira da Cidade", "Regional": "Eldorado",
+                                       "Info": "Sábados", "Instagram": "", "Numeral": 4, "lat": -19.93, "lon": -44.02,
+                                       "link_instagram": "", "alertas": 0}
+    assert detalhes_unidade(df, 1) is None and detalhes_unidade(df, None) is None
+
+
+
+def test_tipos_compactos_com_regionais():
+    geojson = {"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {"Name": "Sede", "id": 1},
+               "geometry": {"type": "Polygon", "coordinates": [[[-44.1, -20.0], [-44.0, -20.0], [-44.0, -19.8], [-44.1, -19.8], [-44.1, -20.0]]]}}]}
+    df = preparar_dados(CSV_V2, IndiceRegionais(geojson))
+    for col in ("Tipo", "Regional", COLUNA_PLANILHA):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    # A Regional é recalculada pelas coordenadas; a digitada fica em Regional_planilha.
+    assert df["Regional"].tolist() == ["Sede", "Sede", "Sede"]
+    assert df[COLUNA_PLANILHA].tolist() == ["Sede", "Eldorado", "Riacho"]
+
+def test_primeira_carga_e_revalidacao_condicional():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        loja = LojaDados(servidor.url, intervalo=3600)
+        primeira = loja.atual()
+        assert len(primeira.dados) == 2 and primeira.etag
+        assert loja.atual() is primeira and servidor.requisicoes == 1
+
+        assert loja.atualizar() is False
+        assert loja.versao is primeira
+        assert (servidor.respostas_304, loja.downloads, loja.nao_modificados) == (1, 1, 1)
+
+
+def test_serve_versao_antiga_enquanto_atualiza_em_segundo_plano():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        loja = LojaDados(servidor.url, intervalo=0)
+        antiga = loja.atual()
+        servidor.atualizar(CSV_V2)
+        servidor.atraso = 0.3
+
+        inicio = time.perf_counter()
+        assert loja.atual() is antiga
+        assert time.perf_counter() - inicio < 0.2
+
+        loja.aguardar_atualizacao(timeout=5)
+        nova = loja.versao
+        assert nova is not antiga and len(nova.dados) == 3
+        assert nova.versao != antiga.versao
+
+
+def test_falha_mantem_ultima_versao_boa():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        loja = LojaDados(servidor.url, intervalo=0)
+        boa = loja.atual()
+        servidor.falhar = True
+        loja._sessao = sessao_http(tentativas=0)
+        assert loja.atualizar() is False
+        assert loja.versao is boa and loja.ultimo_erro is not None
+
+
+def test_sem_versao_nao_repete_download_que_acabou_de_falhar():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        servidor.falhar = True
+        loja = LojaDados(servidor.url, intervalo_nova_tentativa=60, sessao=sessao_http(tentativas=0))
+        assert loja.atual() is None and loja.atual() is None
+        assert servidor.requisicoes == 1
+
+
+def test_erro_temporario_e_repetido_pela_sessao():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        servidor.falhar_proximas = 2
+        loja = LojaDados(servidor.url)
+        assert len(loja.atual().dados) == 2
+        assert servidor.requisicoes == 3 and loja.ultimo_erro is None
+
+
+def test_mesmo_conteudo_com_etag_novo_mantem_os_dados():
+    with ServidorPlanilha(CSV_V1) as servidor:
+        loja = LojaDados(servidor.url)
+        primeira = loja.atual()
+        servidor.atualizar(CSV_V1.replace(b"\n", b"\r\n"))
+        assert loja.atualizar() is False
+        assert loja.versao.dados is primeira.dados
+        assert loja.versao.etag != primeira.etag
+
+
+@pytest.mark.parametrize("fonte", ["bytes", "arquivo"])
+def test_preparar_dados_de_arquivo_local(tmp_path, fonte):
+    caminho = tmp_path / "unidades.csv"
+    caminho.write_bytes(CSV_V2)
+    df = preparar_dados(CSV_V2 if fonte == "bytes" else caminho)
+    pd.testing.assert_series_equal(df["lat"], pd.Series([-19.90, -19.93, -19.95], index=[0, 2, 3], name="lat"))
+
+
+def test_processo_novo_comeca_pelo_snapshot_e_confere_a_planilha(tmp_path):
+    with ServidorPlanilha(CSV_V1) as servidor:
+        primeira = LojaDados(servidor.url, snapshots=ArmazemSnapshots(tmp_path))
+        gravada = primeira.atual()
+        assert gravada.origem == "planilha" and len(ArmazemSnapshots(tmp_path).arquivos()) == 1
+
+        # Planilha fora do ar: o processo novo serve o snapshot sem esperar a rede.
+        servidor.falhar = True
+        nova = LojaDados(servidor.url, snapshots=ArmazemSnapshots(tmp_path), sessao=sessao_http(tentativas=0))
+        do_disco = nova.atual()
+        assert do_disco.origem == "snapshot" and do_disco.versao == gravada.versao
+        pd.testing.assert_frame_equal(do_disco.dados, gravada.dados)
+        nova.aguardar_atualizacao(timeout=5)
+        assert nova.versao is do_disco and nova.ultimo_erro is not None
+
+        # De volta ao ar, com conteúdo novo: a conferência troca a versão e grava outro snapshot.
+        servidor.falhar = False
+        servidor.atualizar(CSV_V2)
+        nova.intervalo = 0
+        nova.atual()
+        nova.aguardar_atualizacao(timeout=5)
+        assert nova.versao.origem == "planilha" and len(nova.versao.dados) == 3
+        assert ArmazemSnapshots(tmp_path).mais_recente().versao == nova.versao.versao
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.densidade import CATEGORIA_OUTRAS, ZOOM_MINIMO_AGREGADO, calcular_niveis, codigos_categoria
+from core.viewport import agregar, tamanho_celula_agregacao
+
+
+def _df():
+    return pd.DataFrame({
+        "lat": [-19.9001, -19.9002, -19.90015, -19.99, np.nan],
+        "lon": [-44.0001, -44.0002, -44.00015, -44.09, -44.0],
+        "Numeral": pd.array([1, 2, 99, 1, 1], dtype="Int8"),
+    })
+
+
+def test_numeral_desconhecido_fica_em_outras():
+    assert codigos_categoria(pd.array([1, 2, 99, None], dtype="Int8")).tolist() == [0, 1, 7, 7]
+
+
+def test_niveis_contam_por_categoria():
+    niveis = calcular_niveis(_df())
+    assert niveis.categorias == ("1", "2", CATEGORIA_OUTRAS)  # só as presentes nos dados
+    nivel = niveis.nivel(12).sort_values("quantidade", ignore_index=True)
+    assert nivel["quantidade"].tolist() == [1, 3]
+    assert nivel["contagens"].iloc[1].tolist() == [1, 1, 1]
+    # Mesmas células e totais da agregação do modo por área visível.
+    esperado = agregar(_df().dropna(), tamanho_celula_agregacao(12)).sort_values("quantidade", ignore_index=True)
+    assert nivel["lat"].tolist() == pytest.approx(esperado["lat"].tolist())
+
+
+def test_nivel_por_zoom():
+    niveis = calcular_niveis(_df(), zoom_marcadores=14, zoom_maximo=15)
+    assert niveis.nivel(3) is niveis.niveis[ZOOM_MINIMO_AGREGADO]
+    assert niveis.nivel(12.6) is niveis.niveis[12]
+    assert niveis.nivel(16) is None
+    assert len(niveis.na_caixa(12, -19.95, -44.05, -19.85, -43.95)) == 1
+    assert set(niveis.para_navegador()["niveis"]) == set(range(ZOOM_MINIMO_AGREGADO, 14))
+
+
+def test_sem_unidades():
+    niveis = calcular_niveis(_df().iloc[:0])
+    assert niveis.niveis == {} and niveis.nivel(12) is None
+
+
+def test_mapa_com_bolhas_em_zoom_baixo():
+    from core.mapa import criar_mapa
+
+    html = criar_mapa(_df().dropna(), {}, busca_navegador=True, densidade=calcular_niveis(_df())).get_root().render()
+    assert html.count("plantaContagem.niveis.registrar(") == 3
+    assert "plantaContagem.niveis.iniciar(" in html
+    assert "plantaContagem.niveis.iniciar(" not in criar_mapa(_df().dropna(), {}).get_root().render()
@@ -0,0 +1,79 @@
+import gzip
+import json
+
+from core import exportacao
+from core.exportacao import NOME_MANIFESTO, PacoteEstatico, comprimidos, hash_entradas
+
+
+def _exportar(destino, arquivos, forcar=False):
+    pacote = PacoteEstatico(destino, forcar=forcar)
+    chamadas = []
+    for nome, (entrada, conteudo) in arquivos.items():
+        pacote.escrever(nome, entrada, lambda c=conteudo, n=nome: chamadas.append(n) or c)
+    return pacote.finalizar(), chamadas
+
+
+def test_hash_entradas_separa_as_partes():
+    assert hash_entradas("ab", "c") != hash_entradas("a", "bc")
+    assert hash_entradas(b"x", 1) == hash_entradas(b"x", 1)
+
+
+def test_so_gera_o_que_mudou(tmp_path):
+    arquivos = {"index.html": ("v1", "<html>1</html>"), "unidades.json": ("d1", "[]")}
+    resultado, chamadas = _exportar(tmp_path, arquivos)
+    assert resultado["gerados"] == chamadas == ["index.html", "unidades.json"]
+
+    arquivos["unidades.json"] = ("d2", "[1]")
+    resultado, chamadas = _exportar(tmp_path, arquivos)
+    assert chamadas == ["unidades.json"] and resultado["mantidos"] == ["index.html"]
+    assert (tmp_path / "unidades.json").read_text() == "[1]"
+    assert gzip.decompress((tmp_path / "unidades.json.gz").read_bytes()) == b"[1]"
+
+    _, chamadas = _exportar(tmp_path, arquivos, forcar=True)
+    assert chamadas == ["index.html", "unidades.json"]
+
+
+def test_arquivo_apagado_e_gerado_de_novo(tmp_path):
+    arquivos = {"index.html": ("v1", "<html></html>")}
+    _exportar(tmp_path, arquivos)
+    (tmp_path / "index.html.gz").unlink()
+    _, chamadas = _exportar(tmp_path, arquivos)
+    assert chamadas == ["index.html"] and (tmp_path / "index.html.gz").exists()
+
+
+def test_remove_so_arquivos_de_exportacoes_anteriores(tmp_path):
+    (tmp_path / "leia-me.txt").write_text("do usuário")
+    _exportar(tmp_path, {"index.html": ("v1", "a"), "velho.json": ("v1", "{}")})
+    resultado, _ = _exportar(tmp_path, {"index.html": ("v1", "a")})
+    assert "velho.json" in resultado["removidos"] and not (tmp_path / "velho.json.gz").exists()
+    assert (tmp_path / "leia-me.txt").exists()
+    manifesto = json.loads((tmp_path / NOME_MANIFESTO).read_text())
+    assert list(manifesto["arquivos"]) == ["index.html"]
+
+
+def test_copias_comprimidas(monkeypatch):
+    assert comprimidos("logo.png", b"x") == {}
+    assert comprimidos("a.json", b"{}") == comprimidos("a.json", b"{}")  # gzip sem data: saída estável
+    monkeypatch.setattr(exportacao, "brotli", None)
+    assert list(comprimidos("a.json", b"{}")) == ["a.json.gz"]
+
+
+def test_index_depende_dos_icones_embutidos(tmp_path):
+    import exportar
+    from core.assets import RegistroAssets
+    from core.config import ICONE_PADRAO_ARQUIVO, ICONES_DEFINIDOS, PASTA_ICONES
+    icones = tmp_path / "images" / PASTA_ICONES
+    icones.mkdir(parents=True)
+    for arquivo in {props["file"] for props in ICONES_DEFINIDOS.values()} | {ICONE_PADRAO_ARQUIVO}:
+        (icones / arquivo).write_bytes(b"\x89PNG " + arquivo.encode())
+    antes = exportar.hash_icones(RegistroAssets(tmp_path / "images", publicar=False))
+    assert exportar.hash_icones(RegistroAssets(tmp_path / "images", publicar=False)) == antes
+    (icones / ICONES_DEFINIDOS[2]["file"]).write_bytes(b"\x89PNG novo")
+    assert exportar.hash_icones(RegistroAssets(tmp_path / "images", publicar=False)) != antes
+
+
+def test_erro_na_carga_chega_ao_cli(tmp_path, capsys):
+    import exportar
+    assert exportar.main(["--fonte", str(tmp_path / "sem_planilha.csv"), "--destino", str(tmp_path / "dist")]) == 1
+    assert "sem_planilha.csv" in capsys.readouterr().err
+    assert not (tmp_path / "dist").exists()
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+from core.caminhos import RAIZ_PROJETO
+
+PESADOS = ["pandas", "numpy", "folium", "branca", "shapely", "streamlit_folium"]
+
+
+@pytest.mark.parametrize("modulo", ["streamlit_app", "core.pagina", "core.config"])
+def test_importar_paginas_nao_carrega_bibliotecas_do_mapa(modulo):
+    # Processo novo: no do pytest os módulos pesados já foram importados por outros testes.
+    codigo = f"import sys, {modulo}; print(' '.join(m for m in {PESADOS!r} if m in sys.modules))"
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ_PROJETO, capture_output=True, text=True, check=True)
+    assert resultado.stdout.split() == []
+
+
+def test_mapa_montado_pelo_modulo_core():
+    from core.dados import preparar_dados
+    from core.mapa import criar_mapa
+    from core.sintetico import gerar_planilha, planilha_csv
+
+    df = preparar_dados(planilha_csv(gerar_planilha(20)))
+    html = criar_mapa(df, {"type": "FeatureCollection", "features": []}, busca_navegador=True).get_root().render()
+    assert "plantaContagem" in html and df["Nome"].iloc[0] in html
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from core.indice_espacial import IndiceEspacial, distancia_haversine_m, metros_por_pixel
+
+
+def _unidades():
+    return pd.DataFrame(
+        {
+            "lat": [-19.9000001, -19.9000001, -19.9100000, -19.8500000, np.nan],
+            "lon": [-44.0500001, -44.0500001, -44.0600000, -44.1000000, -44.0],
+        },
+        index=[7, 3, 9, 4, 5],
+    )
+
+
+def test_haversine_e_escala_do_zoom():
+    # 0,001 grau de latitude ~ 111 m
+    assert abs(distancia_haversine_m(-19.9, -44.05, np.array([-19.901]), np.array([-44.05]))[0] - 111.2) < 0.5
+    assert metros_por_pixel(-19.9, 12) > metros_por_pixel(-19.9, 16) * 15
+
+
+def test_clique_com_ultimo_digito_diferente_resolve_e_traz_colocados():
+    indice = IndiceEspacial.de_dataframe(_unidades())
+    assert len(indice) == 4
+    # Ordem estável entre as unidades no mesmo ponto: pela posição na base.
+    assert indice.resolver_clique(-19.900000, -44.050000, zoom=16) == [7, 3]
+    assert indice.resolver_clique(-19.9100004, -44.0599996, zoom=16) == [9]
+
+
+def test_clique_longe_de_tudo_nao_seleciona():
+    indice = IndiceEspacial.de_dataframe(_unidades())
+    assert indice.resolver_clique(-19.95, -44.20, zoom=16) == []
+    # No zoom baixo a tolerância em metros cresce.
+    assert indice.resolver_clique(-19.9005, -44.0505, zoom=16) == []
+    assert indice.resolver_clique(-19.9005, -44.0505, zoom=12)[:2] == [7, 3]
+
+
+def test_retangulo_e_vizinhos():
+    indice = IndiceEspacial.de_dataframe(_unidades())
+    assert indice.dentro_do_retangulo(-19.92, -44.07, -19.89, -44.04).tolist() == [7, 3, 9]
+    vizinhos = indice.vizinhos(-19.9, -44.05, 2000)
+    assert [i for i, _ in vizinhos] == [7, 3, 9]
+    assert vizinhos[0][1] < 1 < vizinhos[2][1] < 2000
+
+
+def test_concorda_com_busca_exaustiva():
+    rng = np.random.default_rng(1)
+    lats, lons = -19.95 + rng.random(5000) * 0.15, -44.15 + rng.random(5000) * 0.15
+    indice = IndiceEspacial(lats, lons, np.arange(5000))
+    for lat, lon in zip(-19.95 + rng.random(20) * 0.15, -44.15 + rng.random(20) * 0.15):
+        distancias = distancia_haversine_m(lat, lon, lats, lons)
+        esperado = np.flatnonzero(distancias <= 400)
+        assert sorted(i for i, _ in indice.vizinhos(lat, lon, 400)) == esperado.tolist()
+
+
+def test_indice_vazio():
+    indice = IndiceEspacial([], [], [])
+    assert indice.resolver_clique(-19.9, -44.0, zoom=12) == []
+    assert len(indice.dentro_do_retangulo(-20, -45, -19, -43)) == 0
+
+
+def test_mais_proximos_concorda_com_busca_exaustiva():
+    rng = np.random.default_rng(2)
+    lats, lons = -19.95 + rng.random(3000) * 0.15, -44.15 + rng.random(3000) * 0.15
+    tipos = rng.choice(["Comunitária", "Escolar", "Feira"], size=3000, p=[0.9, 0.09, 0.01])
+    indice = IndiceEspacial(lats, lons, np.arange(3000), grupos=tipos)
+    for lat, lon in zip(-19.95 + rng.random(10) * 0.15, -44.15 + rng.random(10) * 0.15):
+        distancias = distancia_haversine_m(lat, lon, lats, lons)
+        assert [i for i, _ in indice.mais_proximos(lat, lon, 5)] == np.argsort(distancias, kind="stable")[:5].tolist()
+        raras = np.flatnonzero(tipos == "Feira")
+        esperado = raras[np.argsort(distancias[raras], kind="stable")][:3]
+        assert [i for i, _ in indice.mais_proximos(lat, lon, 3, grupos=["Feira"])] == esperado.tolist()
+
+
+def test_mais_proximos_com_raio_e_fora_da_cidade():
+    indice = IndiceEspacial.de_dataframe(_unidades().assign(Tipo=["A", "A", "B", "B", "A"]), coluna_grupo="Tipo")
+    assert [i for i, _ in indice.mais_proximos(-19.9, -44.05, 10, raio_m=2000)] == [7, 3, 9]
+    assert [i for i, _ in indice.mais_proximos(-19.9, -44.05, 10, grupos=["B"])] == [9, 4]
+    assert indice.mais_proximos(-19.9, -44.05, 10, grupos=["C"]) == []
+    # Longe de tudo, sem raio máximo, ainda traz as unidades, da mais próxima à mais distante.
+    proximas = indice.mais_proximos(-21.0, -44.0, 2)
+    assert [i for i, _ in proximas] == [9, 7] and proximas[0][1] > 100_000
+    assert IndiceEspacial([], [], []).mais_proximos(-19.9, -44.0, 3) == []
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from core.ingestao import (ALERTA_COORDENADA_REPETIDA, ALERTA_COORDENADAS_TROCADAS, ALERTA_FORA_MUNICIPIO,
+                           ALERTA_INSTAGRAM_INVALIDO, ALERTA_NUMERAL_DESCONHECIDO, COLUNA_ALERTAS,
+                           COLUNA_LINK_INSTAGRAM, compilar, descrever_alertas, normalizar_instagram, resumo_alertas)
+from core.regionais import IndiceRegionais
+
+GEOJSON = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "properties": {"Name": "Oeste", "id": 1},
+     "geometry": {"type": "Polygon", "coordinates": [[[-44.1, -20.0], [-44.0, -20.0], [-44.0, -19.9], [-44.1, -19.9], [-44.1, -20.0]]]}},
+]}
+
+
+def _df():
+    return pd.DataFrame({
+        "Nome": [" A ", "B", "C", "D"],
+        "Tipo": ["Comunitária"] * 4,
+        "Regional": ["Oeste"] * 4,
+        "Info": ["", "", "", ""],
+        "Instagram": ["@horta_a", "", "minha horta!!", "instagram.com/d"],
+        "Numeral": pd.array([1, 1, 99, 1], dtype="Int64"),
+        "lat": [-19.95, -44.05, -19.0, -19.95],
+        "lon": [-44.05, -19.96, -44.0, -44.05],
+    }, index=[10, 11, 12, 13])
+
+
+def test_instagram_normalizado():
+    valores = pd.Series(["@horta_a", "instagram.com/x", "https://www.instagram.com/horta.b/?hl=pt", " perfil_c ",
+                         "hortaboa.com.br", "http://linktr.ee/x", "minha horta!!", ""])
+    exibicao, link, invalido = normalizar_instagram(valores)
+    assert exibicao.tolist() == ["@horta_a", "@x", "@horta.b", "@perfil_c", "hortaboa.com.br", "http://linktr.ee/x",
+                                 "minha horta!!", ""]
+    assert link.tolist() == ["https://www.instagram.com/horta_a/", "https://www.instagram.com/x/",
+                             "https://www.instagram.com/horta.b/", "https://www.instagram.com/perfil_c/",
+                             "https://hortaboa.com.br", "http://linktr.ee/x", "", ""]
+    assert invalido.tolist() == [False, False, False, False, True, True, True, False]
+
+
+def test_compilar_corrige_e_marca():
+    df = compilar(_df(), IndiceRegionais(GEOJSON))
+    assert df.index.tolist() == [10, 11, 12, 13]
+    assert df.loc[10, "Nome"] == "A"
+    # 11 tinha lat e lon trocadas e volta para dentro do município; 10 e 13 estão no mesmo ponto.
+    assert (df.loc[11, "lat"], df.loc[11, "lon"]) == (-19.96, -44.05)
+    alertas = df[COLUNA_ALERTAS].tolist()
+    assert alertas[0] == ALERTA_COORDENADA_REPETIDA
+    assert alertas[1] == ALERTA_COORDENADAS_TROCADAS
+    assert alertas[2] == ALERTA_FORA_MUNICIPIO | ALERTA_NUMERAL_DESCONHECIDO | ALERTA_INSTAGRAM_INVALIDO
+    assert alertas[3] == ALERTA_COORDENADA_REPETIDA
+    assert df["Instagram"].tolist() == ["@horta_a", "", "minha horta!!", "@d"]
+    assert df[COLUNA_LINK_INSTAGRAM].tolist()[3] == "https://www.instagram.com/d/"
+
+
+def test_compilar_sem_regionais_nao_mexe_nas_coordenadas():
+    df = compilar(_df())
+    assert df.loc[11, "lat"] == -44.05
+    assert not (df[COLUNA_ALERTAS] & (ALERTA_COORDENADAS_TROCADAS | ALERTA_FORA_MUNICIPIO)).any()
+
+
+def test_descricao_e_resumo():
+    df = compilar(_df(), IndiceRegionais(GEOJSON))
+    assert descrever_alertas(0) == []
+    assert len(descrever_alertas(df.loc[12, COLUNA_ALERTAS])) == 3
+    resumo = resumo_alertas(df)
+    assert sum(resumo.values()) == 6
+    assert resumo_alertas(pd.DataFrame()) == {}
@@ -0,0 +1,63 @@
+import json
+
+import shapely
+from shapely.geometry import shape
+
+from core import limites
+
+
+def _coordenadas(geometria):
+    pilha = [geometria["coordinates"]]
+    while pilha:
+        atual = pilha.pop()
+        if isinstance(atual[0], (int, float)):
+            yield atual
+        else:
+            pilha.extend(atual)
+
+
+def test_remove_z_e_quantiza(tmp_path):
+    colecao = limites.carregar_limites("completo", diretorio_cache=tmp_path)
+    assert len(colecao["features"]) == 8
+    for feature in colecao["features"]:
+        for ponto in _coordenadas(feature["geometry"]):
+            assert len(ponto) == 2
+            assert all(round(v, limites.CASAS_DECIMAIS) == v for v in ponto)
+
+
+def test_niveis_reduzem_vertices_e_mantem_validade(tmp_path):
+    niveis = limites.carregar_niveis(diretorio_cache=tmp_path)["niveis"]
+    contagens = []
+    for nome in ["completo", "detalhado", "medio", "simples"]:
+        geometrias = [shape(f["geometry"]) for f in niveis[nome]["features"]]
+        assert all(g.is_valid for g in geometrias)
+        contagens.append(sum(shapely.get_num_coordinates(g) for g in geometrias))
+    assert contagens == sorted(contagens, reverse=True)
+    assert len(json.dumps(niveis[limites.NIVEL_PADRAO])) * 8 < limites.CAMINHO_GEOJSON_REGIONAIS.stat().st_size
+
+
+def test_divisa_compartilhada_sem_buracos():
+    zigue = [(1.0, y / 10) for y in range(11)]
+    zigue = [(x + (0.00001 if i % 2 else 0), y) for i, (x, y) in enumerate(zigue)]
+    esquerda = shapely.Polygon([(0, 0)] + zigue + [(0, 1)])
+    direita = shapely.Polygon(zigue[::-1] + [(2, 0), (2, 1)])
+    a, b = limites.simplificar_cobertura([esquerda, direita], 0.01)
+    assert a.intersection(b).area < 1e-12
+    assert abs(a.union(b).area - (esquerda.area + direita.area)) < 1e-9
+
+
+def test_cache_reaproveitado_e_invalidado_pela_origem(tmp_path):
+    origem = tmp_path / "regionais.geojson"
+    origem.write_bytes(limites.CAMINHO_GEOJSON_REGIONAIS.read_bytes())
+    primeira = limites.carregar_niveis(origem, tmp_path)
+    arquivo = limites.caminho_cache(primeira["versao"], tmp_path)
+    assert arquivo.exists()
+
+    assert limites.carregar_niveis(origem, tmp_path) == primeira
+
+    bruto = json.loads(origem.read_text(encoding="utf-8"))
+    bruto["features"] = bruto["features"][:2]
+    origem.write_text(json.dumps(bruto), encoding="utf-8")
+    segunda = limites.carregar_niveis(origem, tmp_path)
+    assert segunda["versao"] != primeira["versao"]
+    assert len(segunda["niveis"]["medio"]["features"]) == 2
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from core import medicao
+from core.medicao import LogDesempenho, MedicaoRerun, log_padrao
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_fases_somam_e_registro_fecha_uma_vez():
+    relogio = Relogio()
+    m = MedicaoRerun("s1", "inicio", relogio=relogio)
+    with m.fase("mapa"):
+        relogio.agora += 0.02
+    with m.fase("mapa"):
+        relogio.agora += 0.01
+    m.registrar_cache("mapa", False)
+    m.anotar(payload_bytes=123)
+    registro = m.encerrar("rerun")
+    relogio.agora += 1
+    assert m.encerrar()["total_ms"] == 30.0 and m.encerrar()["desfecho"] == "rerun"
+    assert registro["fases_ms"] == {"mapa": 30.0} and registro["total_ms"] == 30.0
+    assert registro["cache"] == {"mapa": "falha"}
+    assert (registro["sessao"], registro["causa"], registro["desfecho"], registro["payload_bytes"]) == ("s1", "inicio", "rerun", 123)
+
+
+def test_fase_conta_mesmo_com_excecao():
+    relogio = Relogio()
+    m = MedicaoRerun("s1", "clique", relogio=relogio)
+    with pytest.raises(RuntimeError):
+        with m.fase("clique"):
+            relogio.agora += 0.005
+            raise RuntimeError("rerun")
+    assert m.registro()["fases_ms"] == {"clique": 5.0}
+
+
+def test_log_grava_linhas_e_rotaciona(tmp_path):
+    caminho = tmp_path / "logs" / "desempenho.jsonl"
+    log = LogDesempenho(caminho, tamanho_maximo=100)
+    log.gravar({"causa": "inicio", "fases_ms": {"dados": 1.5}})
+    assert json.loads(caminho.read_text()) == {"causa": "inicio", "fases_ms": {"dados": 1.5}}
+    log.gravar({"causa": "x" * 100})
+    log.gravar({"causa": "busca"})
+    assert [json.loads(linha)["causa"] for linha in caminho.read_text().splitlines()] == ["busca"]
+    assert len((tmp_path / "logs" / "desempenho.jsonl.1").read_text().splitlines()) == 2
+
+
+def test_log_padrao_pela_variavel(monkeypatch, tmp_path):
+    monkeypatch.setenv(medicao.VARIAVEL_CAMINHO_LOG, "")
+    assert log_padrao() is None
+    monkeypatch.setenv(medicao.VARIAVEL_CAMINHO_LOG, str(tmp_path / "d.jsonl"))
+    assert log_padrao().caminho == tmp_path / "d.jsonl"
+
+
+def test_eventos_do_app_vao_para_o_log(tmp_path):
+    import streamlit_app as app
+    from core.sintetico import gerar_planilha, planilha_csv
+
+    log = LogDesempenho(tmp_path / "desempenho.jsonl")
+    planilha = gerar_planilha(20)
+    planilha.loc[planilha.index[0], "Instagram"] = "minha horta!!"
+    app.preparar_com_regionais(planilha_csv(planilha), log)
+    app.registrar_aquecimento(log, {"evento": "aquecimento", "total_ms": 5.0, "tarefas": {"limites": {"estado": "ok", "ms": 5.0}}})
+    eventos = [json.loads(linha) for linha in (tmp_path / "desempenho.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [e["evento"] for e in eventos] == ["alertas_planilha", "aquecimento"]
+    assert sum(eventos[0]["alertas"].values()) >= 1
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from core.assets import RegistroAssets
+from core.miniaturas import PipelineMiniaturas, ordem_natural
+
+
+@pytest.fixture
+def fotos(tmp_path):
+    raiz = tmp_path / "images" / "fotos"
+    raiz.mkdir(parents=True)
+    Image.new("RGB", (1600, 1200), (40, 120, 40)).save(raiz / "2.JPG", "JPEG")
+    Image.new("RGB", (500, 800), (200, 80, 20)).save(raiz / "10.jpeg", "JPEG")
+    return raiz.parent
+
+
+def criar_pipeline(raiz, tmp_path):
+    registro = RegistroAssets(raiz, tmp_path / "static" / "assets")
+    return registro, PipelineMiniaturas(registro, tmp_path / "static" / "miniaturas", larguras=(320, 640, 1280))
+
+
+def test_gera_variantes_sem_ampliar(fotos, tmp_path):
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    derivadas = pipeline.gerar(["fotos/2.JPG", "fotos/10.jpeg"])
+
+    grande = derivadas["fotos/2.JPG"]
+    assert [v.largura for v in grande.do_formato("webp")] == [320, 640, 1280]
+    assert [v.altura for v in grande.do_formato("jpeg")] == [240, 480, 960]
+    # A foto de 500 px não é ampliada: 640 e 1280 viram uma única variante de 500.
+    assert [v.largura for v in derivadas["fotos/10.jpeg"].do_formato("jpeg")] == [320, 500]
+    for variante in grande.variantes:
+        assert (pipeline.destino / variante.arquivo).stat().st_size == variante.bytes
+    assert pipeline.srcset(grande, "webp").startswith(f"app/static/miniaturas/fotos/2.{grande.hash_origem}.320.webp 320w, ")
+
+
+def test_manifesto_evita_regerar_e_invalida_pelo_hash(fotos, tmp_path):
+    chaves = ["fotos/2.JPG", "fotos/10.jpeg"]
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    pipeline.gerar(chaves)
+    assert pipeline.geradas == 2
+
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    pipeline.gerar(chaves)
+    assert pipeline.geradas == 0
+
+    Image.new("RGB", (800, 600), (0, 0, 200)).save(fotos / "fotos" / "2.JPG", "JPEG")
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    derivadas = pipeline.gerar(chaves)
+    assert pipeline.geradas == 1
+    # As variantes da versão antiga são removidas.
+    em_disco = {p.relative_to(pipeline.destino).as_posix() for p in pipeline.destino.rglob("*.*") if p.suffix != ".json"}
+    assert em_disco == {v.arquivo for foto in derivadas.values() for v in foto.variantes}
+
+
+
+def test_limpeza_so_apaga_o_que_o_manifesto_anterior_registra(fotos, tmp_path):
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    pipeline.gerar(["fotos/2.JPG", "fotos/10.jpeg"])
+    # Arquivo de outro processo ainda sem manifesto (ex.: uma variante sendo gravada).
+    (pipeline.destino / "fotos" / "em_andamento.webp").write_bytes(b"RIFF")
+    _, pipeline = criar_pipeline(fotos, tmp_path)
+    derivadas = pipeline.gerar(["fotos/2.JPG"])
+    em_disco = {p.relative_to(pipeline.destino).as_posix() for p in pipeline.destino.rglob("*.*") if p.suffix != ".json"}
+    assert em_disco == {v.arquivo for v in derivadas["fotos/2.JPG"].variantes} | {"fotos/em_andamento.webp"}
+
+
+def test_derivacoes_simultaneas_nao_deixam_arquivos_pela_metade(fotos, tmp_path):
+    chaves, erros, resultados = ["fotos/2.JPG", "fotos/10.jpeg"], [], []
+
+    def gerar():
+        try:
+            resultados.append(criar_pipeline(fotos, tmp_path)[1].gerar(chaves))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gerar) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not erros and len(resultados) == 4
+    destino = tmp_path / "static" / "miniaturas"
+    assert not list(destino.rglob("*.tmp"))
+    for variante in (v for foto in resultados[-1].values() for v in foto.variantes):
+        with Image.open(destino / variante.arquivo) as imagem:
+            imagem.load()
+            assert imagem.width == variante.largura
+
+
+def test_ordem_natural():
+    assert sorted(["fotos/10.jpeg", "fotos/2.JPG", "fotos/9.jpeg"], key=ordem_natural) == ["fotos/2.JPG", "fotos/9.jpeg", "fotos/10.jpeg"]
@@ -0,0 +1,16 @@
+import base64
+
+from core.payload import formatar_relatorio, relatorio_payload
+
+
+def test_separa_data_uris_e_geojson():
+    uri = "data:image/png;base64," + base64.b64encode(b"\x89PNG" * 30).decode()
+    dados = '{"type": "FeatureCollection", "features": []}'
+    html = f'<style>.i {{ background-image: url("{uri}"); }}</style><script>\n  camada_add({dados});\n</script>'
+
+    relatorio = relatorio_payload(html)
+    assert relatorio["bytes"] == len(html.encode())
+    assert relatorio["data_uris"] == len(uri)
+    assert relatorio["geojson"] == len(dados)
+    assert 0 < relatorio["gzip"] < relatorio["bytes"]
+    assert formatar_relatorio(relatorio).startswith(f"{relatorio['bytes'] / 1024:.1f} KB")
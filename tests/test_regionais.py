@@ -0,0 +1,39 @@
+import pandas as pd
+
+from core.regionais import COLUNA_ID, COLUNA_PLANILHA, SEM_REGIONAL, IndiceRegionais, resumir
+
+# Duas regionais lado a lado, com divisa em lon = -44.0.
+GEOJSON = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "properties": {"Name": "Oeste", "id": 1},
+     "geometry": {"type": "Polygon", "coordinates": [[[-44.1, -20.0], [-44.0, -20.0], [-44.0, -19.9], [-44.1, -19.9], [-44.1, -20.0]]]}},
+    {"type": "Feature", "properties": {"Name": "Leste", "id": 2},
+     "geometry": {"type": "Polygon", "coordinates": [[[-44.0, -20.0], [-43.9, -20.0], [-43.9, -19.9], [-44.0, -19.9], [-44.0, -20.0]]]}},
+]}
+
+
+def _df():
+    return pd.DataFrame({
+        "Nome": ["A", "B", "C", "D"],
+        "Regional": ["Oeste", "oeste", "Oeste", "Longe"],
+        "Numeral": pd.array([1, 1, 2, 1], dtype="Int64"),
+        "lat": [-19.95, -19.95, -19.95, -19.0],
+        "lon": [-44.05, -44.0, -43.95, -44.0],
+    }, index=[10, 11, 12, 13])
+
+
+def test_atribui_pela_coordenada_e_guarda_o_digitado():
+    df = IndiceRegionais(GEOJSON).atribuir(_df())
+    # 11 está sobre a divisa e fica com a regional que vem primeiro; 13 está fora e mantém o digitado.
+    assert df["Regional"].tolist() == ["Oeste", "Oeste", "Leste", "Longe"]
+    assert df[COLUNA_ID].tolist() == [1, 1, 2, SEM_REGIONAL]
+    assert df[COLUNA_PLANILHA].tolist() == ["Oeste", "oeste", "Oeste", "Longe"]
+    assert df.index.tolist() == [10, 11, 12, 13]
+
+
+def test_resumo_conta_por_regional_e_tipo():
+    resumo = resumir(IndiceRegionais(GEOJSON).atribuir(_df()))
+    assert resumo.total_regional("Oeste") == 2 and resumo.quantidade("Oeste", 1) == 2
+    assert resumo.total_tipo(1) == 3 and resumo.total_tipo(7) == 0
+    assert resumo.total_regional("Inexistente") == 0
+    # "oeste" x "Oeste" não conta como divergência; o C digitado como Oeste está no Leste.
+    assert (resumo.divergentes, resumo.fora_dos_limites) == (1, 1)
@@ -0,0 +1,22 @@
+import shapely
+from shapely.geometry import shape
+
+from core import limites
+from core.dados import preparar_dados
+from core.sintetico import COLUNAS_PLANILHA, gerar_planilha, planilha_csv
+
+
+def test_planilha_reprodutivel_e_dentro_das_regionais():
+    df = gerar_planilha(500, semente=7)
+    assert df.columns.tolist() == COLUNAS_PLANILHA and len(df) == 500
+    assert df.equals(gerar_planilha(500, semente=7))
+
+    regionais = {f["properties"]["Name"]: shape(f["geometry"]) for f in limites.carregar_limites("completo")["features"]}
+    for nome, grupo in df.groupby("Regional"):
+        assert shapely.contains_xy(regionais[nome], grupo["lon"].to_numpy(), grupo["lat"].to_numpy()).all()
+    assert df.duplicated(["lat", "lon"]).any()
+
+
+def test_csv_passa_pelo_preparo_do_app():
+    df = preparar_dados(planilha_csv(gerar_planilha(50)))
+    assert len(df) == 50 and str(df["Numeral"].dtype) == "Int32"
@@ -0,0 +1,59 @@
+import time
+
+import pandas as pd
+import pytest
+
+from core.cache_mapa import hash_dataframe
+from core.dados import preparar_dados
+from core.snapshots import ArmazemSnapshots
+from core.sintetico import gerar_planilha, planilha_csv
+
+
+def _dados(linhas=50, semente=0):
+    df = preparar_dados(planilha_csv(gerar_planilha(linhas, semente=semente)))
+    return df, hash_dataframe(df)
+
+
+def test_grava_e_le_com_os_mesmos_tipos_e_hash(tmp_path):
+    armazem = ArmazemSnapshots(tmp_path)
+    df, versao = _dados()
+    caminho = armazem.gravar(df, versao, carregado_em=1000.0, etag='"abc"')
+    snapshot = armazem.mais_recente()
+    assert snapshot.caminho == caminho and snapshot.versao == versao
+    assert (snapshot.carregado_em, snapshot.etag, snapshot.last_modified) == (1000.0, '"abc"', None)
+    pd.testing.assert_frame_equal(snapshot.dados, df)
+    # A mesma versão não gera outro arquivo.
+    assert armazem.gravar(df, versao) == caminho and len(armazem.arquivos()) == 1
+
+
+def test_retencao_por_quantidade_e_idade(tmp_path):
+    armazem = ArmazemSnapshots(tmp_path, manter=2, idade_maxima=3600)
+    agora = time.time()
+    versoes = [_dados(semente=s) for s in range(4)]
+    armazem.gravar(*versoes[0], carregado_em=agora - 7200)
+    armazem.gravar(*versoes[1], carregado_em=agora - 10)
+    assert len(armazem.arquivos()) == 1  # o de duas horas atrás passou da idade máxima
+    armazem.gravar(*versoes[2], carregado_em=agora - 5)
+    armazem.gravar(*versoes[3], carregado_em=agora)
+    assert [armazem.ler(c).versao for c in armazem.arquivos()] == [versoes[3][1], versoes[2][1]]
+
+
+def test_ultimo_snapshot_e_mantido_mesmo_velho(tmp_path):
+    armazem = ArmazemSnapshots(tmp_path, idade_maxima=60)
+    df, versao = _dados()
+    armazem.gravar(df, versao, carregado_em=time.time() - 3600)
+    assert armazem.mais_recente().versao == versao
+
+
+def test_snapshot_corrompido_e_pulado(tmp_path):
+    armazem = ArmazemSnapshots(tmp_path)
+    antigo, recente = _dados(semente=1), _dados(semente=2)
+    armazem.gravar(*antigo, carregado_em=time.time() - 10)
+    armazem.gravar(*recente)
+    armazem.arquivos()[0].write_bytes(b"nao e parquet")
+    assert armazem.mais_recente().versao == antigo[1]
+
+
+def test_manter_precisa_ser_positivo(tmp_path):
+    with pytest.raises(ValueError):
+        ArmazemSnapshots(tmp_path, manter=0)
@@ -0,0 +1,106 @@
+import gzip
+import json
+
+import numpy as np
+import requests
+import shapely
+from shapely.geometry import shape
+
+from core import limites
+from core.cache_mapa import hash_dataframe
+from core.dados import preparar_dados
+from core.exportacao import hash_entradas
+from core.regionais import IndiceRegionais
+from core.sintetico import gerar_planilha, planilha_csv
+from core.tiles import (CAMADA_LIMITES, CAMADA_UNIDADES, VERSAO_FORMATO, ArquivoTiles, ServidorTiles, arquivo_limites, cortar_poligonos,
+                        cortar_pontos, limites_tile, tile_de)
+
+
+def test_tile_de_e_limites_do_tile():
+    x, y = tile_de([-19.9], [-44.05], 12)
+    oeste, sul, leste, norte = limites_tile(12, int(x[0]), int(y[0]))
+    assert oeste <= -44.05 < leste and sul <= -19.9 < norte
+    # Um tile do zoom z é dividido em exatamente quatro no zoom z + 1.
+    filhos = [limites_tile(13, 2 * int(x[0]) + dx, 2 * int(y[0]) + dy) for dx in (0, 1) for dy in (0, 1)]
+    assert min(f[0] for f in filhos) == oeste and max(f[3] for f in filhos) == norte
+
+
+def test_pontos_caem_em_um_tile_por_zoom():
+    df = preparar_dados(planilha_csv(gerar_planilha(300)))
+    tiles = cortar_pontos(df, zooms=[10, 14])
+    for zoom in (10, 14):
+        ids = [f["properties"]["id"] for (z, x, y), features in tiles.items() if z == zoom for f in features]
+        assert sorted(ids) == df.index.tolist()
+    (z, x, y), features = next((k, v) for k, v in tiles.items() if k[0] == 14)
+    oeste, sul, leste, norte = limites_tile(z, x, y)
+    lon, lat = features[0]["geometry"]["coordinates"]
+    assert oeste <= lon <= leste and sul <= lat <= norte
+    assert set(features[0]["properties"]) == {"id", "n", "t", "r", "c"}
+
+
+def test_poligonos_recortados_cobrem_as_regionais():
+    geojson = limites.carregar_limites("completo")
+    tiles = cortar_poligonos(geojson, zooms=[8, 13])
+    # No zoom 8 o município inteiro cabe num tile, com todas as regionais.
+    (chave,) = [k for k in tiles if k[0] == 8]
+    assert {f["properties"]["id"] for f in tiles[chave]} == {f["properties"]["id"] for f in geojson["features"]}
+
+    area_original = shapely.area(shapely.union_all([shape(f["geometry"]) for f in geojson["features"]]))
+    recortes = []
+    for (z, x, y), features in tiles.items():
+        if z == 13:
+            caixa = shapely.box(*limites_tile(z, x, y))
+            recortes += [shapely.intersection(shape(f["geometry"]), caixa) for f in features if "Polygon" in f["geometry"]["type"]]
+    assert abs(shapely.area(shapely.union_all(recortes)) - area_original) / area_original < 0.01
+    assert any("LineString" in f["geometry"]["type"] for features in tiles.values() for f in features)
+
+
+def test_arquivo_e_servidor(tmp_path):
+    df = preparar_dados(planilha_csv(gerar_planilha(100)))
+    arquivo = ArquivoTiles.construir(tmp_path / "tiles.sqlite", {
+        CAMADA_LIMITES: cortar_poligonos(limites.carregar_limites("completo"), zooms=[10, 11]),
+        CAMADA_UNIDADES: cortar_pontos(df, zooms=[10, 11]),
+    }, {"versao": "teste"})
+    metadados = arquivo.metadados()
+    assert metadados["versao"] == "teste" and metadados["camadas"][CAMADA_LIMITES]["zoom_maximo"] == 11
+
+    x, y = (int(v[0]) for v in tile_de(df["lat"].iloc[:1], df["lon"].iloc[:1], 11))
+    with ServidorTiles(arquivo) as servidor:
+        resposta = requests.get(f"{servidor.url}/{CAMADA_UNIDADES}/11/{x}/{y}.geojson")
+        assert resposta.status_code == 200 and resposta.headers["Content-Encoding"] == "gzip"
+        assert resposta.headers["Access-Control-Allow-Origin"] == "*"
+        assert df.index[0] in [f["properties"]["id"] for f in resposta.json()["features"]]
+
+        sem_gzip = requests.get(f"{servidor.url}/{CAMADA_UNIDADES}/11/{x}/{y}.geojson", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in sem_gzip.headers and sem_gzip.json() == resposta.json()
+
+        revalidada = requests.get(resposta.url, headers={"If-None-Match": resposta.headers["ETag"]})
+        assert revalidada.status_code == 304
+        assert requests.get(f"{servidor.url}/{CAMADA_UNIDADES}/11/0/0.geojson").status_code == 204
+        assert requests.get(f"{servidor.url}/nada").status_code == 404
+        assert requests.get(f"{servidor.url}/metadados.json").json()["versao"] == "teste"
+    arquivo.fechar()
+
+
+def test_arquivo_limites_gerado_uma_vez_por_versao(tmp_path):
+    primeiro = arquivo_limites(diretorio_cache=tmp_path)
+    modificado = primeiro.caminho.stat().st_mtime_ns
+    segundo = arquivo_limites(diretorio_cache=tmp_path)
+    assert segundo.caminho == primeiro.caminho and segundo.caminho.stat().st_mtime_ns == modificado
+    dados = segundo.ler(CAMADA_LIMITES, 8, *(int(v[0]) for v in tile_de([-19.9], [-44.05], 8)))
+    assert json.loads(gzip.decompress(dados))["features"]
+    assert np.isclose(segundo.metadados()["camadas"][CAMADA_LIMITES]["limites"][0][0], -19.99, atol=0.05)
+
+
+def test_cli_usa_os_mesmos_dados_do_app(tmp_path):
+    import tiles
+    planilha = gerar_planilha(50)
+    # A primeira unidade vem com lat e lon trocadas: o app corrige, e o arquivo de tiles tem de sair igual.
+    planilha = planilha.assign(lat=planilha["lat"].where(planilha.index != 0, planilha["lon"]),
+                               lon=planilha["lon"].where(planilha.index != 0, planilha["lat"]))
+    csv = planilha_csv(planilha)
+    arquivo = tiles.gerar(csv, tmp_path / "tiles.sqlite", zoom_minimo=10, zoom_maximo=10)
+    df = preparar_dados(csv, IndiceRegionais(limites.carregar_limites("completo")))
+    assert (df.loc[0, "lat"], df.loc[0, "lon"]) == (planilha.loc[0, "lon"], planilha.loc[0, "lat"])
+    assert arquivo.metadados()["versao"] == hash_entradas(VERSAO_FORMATO, limites.versao_limites(), 10, 10, hash_dataframe(df))
+    arquivo.fechar()
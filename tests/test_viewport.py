@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from core.viewport import Viewport, agregar, graus_por_tile, tamanho_celula_agregacao
+
+
+def _saida(s, w, n, e, zoom=14):
+    return {"bounds": {"_southWest": {"lat": s, "lng": w}, "_northEast": {"lat": n, "lng": e}}, "zoom": zoom}
+
+
+def test_le_retorno_do_st_folium():
+    assert Viewport.de_st_folium(_saida(-19.95, -44.1, -19.9, -44.0)) == Viewport(-19.95, -44.1, -19.9, -44.0, 14)
+    assert Viewport.de_st_folium(None) is None
+    assert Viewport.de_st_folium({"bounds": {"_southWest": {"lat": None, "lng": None}}, "zoom": 12}) is None
+    assert Viewport.de_st_folium({**_saida(-19.95, -44.1, -19.9, -44.0), "zoom": None}, zoom_padrao=12).zoom == 12
+
+
+def test_caixa_com_margem_e_estavel_em_pequenos_arrastes():
+    vista = Viewport(-19.95, -44.10, -19.90, -44.02, 14)
+    sul, oeste, norte, leste = vista.caixa_consulta()
+    passo = graus_por_tile(14)
+    assert sul <= vista.sul - passo and norte >= vista.norte + passo
+    assert oeste <= vista.oeste - passo and leste >= vista.leste + passo
+    # Um arraste de poucos pixels cai na mesma caixa.
+    arrastada = Viewport(-19.9501, -44.1001, -19.9001, -44.0201, 14)
+    assert arrastada.caixa_consulta() == vista.caixa_consulta()
+
+
+def test_agrega_por_celula():
+    df = pd.DataFrame({"lat": [-19.9001, -19.9002, -19.99], "lon": [-44.0001, -44.0002, -44.09]})
+    agrupados = agregar(df, tamanho_celula_agregacao(12)).sort_values("quantidade", ignore_index=True)
+    assert agrupados["quantidade"].tolist() == [1, 2]
+    assert agrupados.loc[1, "lat"] == pytest.approx(-19.90015)
+    assert agregar(df.iloc[:0], 0.01).empty
@@ -0,0 +1,72 @@
+"""Gera o arquivo de tiles dos limites e das unidades e, se pedido, serve os tiles localmente.
+
+Funciona sem internet a partir do GeoJSON das regionais e de um CSV de
+unidades no formato da planilha (ver core.tiles).
+
+    python tiles.py --unidades planilha.csv --saida data/cache/tiles.sqlite
+    python tiles.py --unidades planilha.csv --servir --porta 8765
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from core import limites
+from core.cache_mapa import hash_dataframe
+from core.caminhos import CAMINHO_GEOJSON_REGIONAIS, DIRETORIO_CACHE
+from core.dados import preparar_dados
+from core.exportacao import hash_entradas
+from core.regionais import IndiceRegionais
+from core.tiles import (CAMADA_LIMITES, CAMADA_UNIDADES, VERSAO_FORMATO, ZOOM_MAXIMO, ZOOM_MINIMO, ArquivoTiles,
+                        ServidorTiles, cortar_poligonos, cortar_pontos)
+
+SAIDA_PADRAO = DIRETORIO_CACHE / "tiles.sqlite"
+
+
+def gerar(unidades, saida: Path, origem: Path = CAMINHO_GEOJSON_REGIONAIS,
+          zoom_minimo: int = ZOOM_MINIMO, zoom_maximo: int = ZOOM_MAXIMO) -> ArquivoTiles:
+    zooms = range(zoom_minimo, zoom_maximo + 1)
+    geojson = limites.carregar_limites("completo", origem)
+    camadas = {CAMADA_LIMITES: cortar_poligonos(geojson, zooms)}
+    partes_versao = [VERSAO_FORMATO, limites.versao_limites(origem), zoom_minimo, zoom_maximo]
+    if unidades is not None:
+        # Mesma compilação da LojaDados do app (coordenadas conferidas, alertas, Regional pelas coordenadas).
+        df = preparar_dados(unidades, IndiceRegionais(geojson))
+        camadas[CAMADA_UNIDADES] = cortar_pontos(df, zooms)
+        partes_versao.append(hash_dataframe(df))
+    return ArquivoTiles.construir(saida, camadas, {"versao": hash_entradas(*partes_versao)})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera (e opcionalmente serve) os tiles vetoriais do mapa.")
+    parser.add_argument("--unidades", help="URL ou caminho do CSV das unidades (sem ele, só os limites)")
+    parser.add_argument("--saida", type=Path, default=SAIDA_PADRAO, help=f"arquivo de tiles (padrão: {SAIDA_PADRAO})")
+    parser.add_argument("--zoom-minimo", type=int, default=ZOOM_MINIMO)
+    parser.add_argument("--zoom-maximo", type=int, default=ZOOM_MAXIMO)
+    parser.add_argument("--servir", action="store_true", help="depois de gerar, serve os tiles até Ctrl+C")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    try:
+        arquivo = gerar(args.unidades, args.saida, zoom_minimo=args.zoom_minimo, zoom_maximo=args.zoom_maximo)
+    except Exception as e:
+        print(f"Erro ao gerar os tiles: {e}", file=sys.stderr)
+        return 1
+    resumo = ", ".join(f"{nome} {camada['tiles']} tiles" for nome, camada in arquivo.metadados()["camadas"].items())
+    print(f"{args.saida}: {resumo} ({args.saida.stat().st_size / 1024:.0f} KB, {time.perf_counter() - inicio:.1f} s)")
+
+    if args.servir:
+        with ServidorTiles(arquivo, args.host, args.porta) as servidor:
+            print(f"Servindo em {servidor.url}/{{camada}}/{{z}}/{{x}}/{{y}}.geojson (Ctrl+C para sair)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())